@@ -5,24 +5,47 @@ This module implements the main pipeline function that orchestrates the entire
 AI-driven software development process from requirement to deployment.
 """
 
-import asyncio
-import logging
-from typing import Dict, List, Any, Optional
+import copy
+import functools
+import inspect
+from typing import Dict, List, Any, Optional, Iterator, Tuple
 from datetime import datetime
 import json
 import os
+import threading
+import time
 
 from .modules.requirement_normalizer import normalize_requirement
-from .modules.planner import ai_plan_modules
+from .modules.planner import DevelopmentPlan, plan_development
+from .modules.replanner import replan
+from .modules.file_ownership import FileTreeIndex, WriteSetLock, get_file_tree_index, module_write_set
+from .modules.workspace import (DEFAULT_KEEP_FAILED, DEFAULT_KEEP_RELEASES, DEFAULT_LINK_MODE, DEFAULT_WORKSPACE_ROOT,
+                                RunWorkspace, new_run_id)
+from .modules.interface_extractor import DEFAULT_MAX_CONTEXT_CHARS, InterfaceRegistry, extract_interface
+from .modules.static_check import LANGUAGE_EXTENSIONS, StaticChecker, module_language
+from .modules.merkle_tree import DEFAULT_OUTPUT_STATE_PATH, MerkleTree, OutputStateStore, build_merkle_tree
+from .modules.fix_cache import DEFAULT_FIX_CACHE_PATH, FixCache, apply_patch, error_signature, make_patch
+from .modules.result_cache import (DEFAULT_TEST_CACHE_PATH, DEFAULT_TEST_CACHE_MAX_ENTRIES,
+                                    DEFAULT_TEST_CACHE_MAX_AGE_DAYS, DEFAULT_TEST_CACHE_MAX_BYTES,
+                                    TestResultCache, test_result_key)
+from .modules.duration_model import DEFAULT_TIMINGS_PATH, TimingStore, get_duration_model
 from .modules.code_generator import ai_generate_code
 from .modules.test_runner import run_tests, get_last_error
 from .modules.code_fixer import ai_fix_code
 from .modules.integrator import integrate_modules
 from .modules.e2e_tester import run_e2e_tests
+from .modules.e2e_sharding import affected_e2e_specs, discover_e2e_specs, run_sharded_e2e
 from .modules.reporter import generate_report
 from .modules.github_pusher import push_github
-from .utils.logger import setup_logger
+from .utils.logger import configure_logging, setup_logger, lazy
 from .utils.config import load_config
+from .utils.ai_gateway import AIGateway, get_ai_gateway
+from .utils.profiling import RunProfiler, profiling_options
+from .utils.work_queue import DEFAULT_MAX_ATTEMPTS, DEFAULT_POLL_INTERVAL, DEFAULT_QUEUE_PATH, RemoteStages, WorkQueue
+from .utils.events import (EventStream, PipelineEvent, StageStarted, StageFinished, ModuleStatusChanged,
+                           StepCompleted, TestResult, PipelineError, PipelineFinished)
+from .utils.scheduler import (ResourceScheduler, Step, JobSteps, JobFailed, run_with_timeout,
+                              RESOURCE_LLM, RESOURCE_CPU, RESOURCE_DISK)
 
 # Setup logging
 logger = setup_logger(__name__)
@@ -34,11 +57,16 @@ class Module:
         self.name = name
         self.description = description
         self.dependencies = dependencies or []
+        self.type = "module"
+        self.technologies = []
+        self.files = []
         self.code = ""
         self.tests = []
         self.status = "pending"
         self.error_history = []
         self.fix_attempts = 0
+        # Interfaces of the declared dependencies, sent with generate/fix requests
+        self.dependency_context = ""
         self.created_at = datetime.now()
         self.updated_at = datetime.now()
     
@@ -48,6 +76,9 @@ class Module:
             "name": self.name,
             "description": self.description,
             "dependencies": self.dependencies,
+            "type": self.type,
+            "technologies": self.technologies,
+            "files": self.files,
             "code": self.code,
             "tests": self.tests,
             "status": self.status,
@@ -60,58 +91,330 @@ class Module:
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Module':
         """Create module from dictionary."""
-        module = cls(data["name"], data["description"], data["dependencies"])
-        module.code = data["code"]
-        module.tests = data["tests"]
-        module.status = data["status"]
-        module.error_history = data["error_history"]
-        module.fix_attempts = data["fix_attempts"]
-        module.created_at = datetime.fromisoformat(data["created_at"])
-        module.updated_at = datetime.fromisoformat(data["updated_at"])
+        # Planner module dicts carry only the plan fields, so default the rest
+        module = cls(data["name"], data["description"], data.get("dependencies", []))
+        module.type = data.get("type", "module")
+        module.technologies = data.get("technologies", [])
+        module.files = data.get("files", [])
+        module.code = data.get("code", "")
+        module.tests = data.get("tests", [])
+        module.status = data.get("status", "pending")
+        module.error_history = data.get("error_history", [])
+        module.fix_attempts = data.get("fix_attempts", 0)
+        if "created_at" in data:
+            module.created_at = datetime.fromisoformat(data["created_at"])
+        if "updated_at" in data:
+            module.updated_at = datetime.fromisoformat(data["updated_at"])
         return module
 
-def save_code(module_name: str, code: str, output_dir: str = "src") -> None:
+def record_stage_timing(timing_store: Optional[TimingStore], module: Module, stage: str,
+                        seconds: float, succeeded: bool = True) -> None:
+    """Record how long a stage took for a module, for the planner's duration model."""
+    if timing_store is not None:
+        timing_store.record(module.type, module.technologies, stage, seconds,
+                            module_name=module.name, succeeded=succeeded)
+
+class PipelineStages:
+    """
+    The external stage functions the pipeline calls.
+    
+    Defaults to the real model, test, integration, report and GitHub stages;
+    pass replacements as keyword arguments to simulate or isolate them.
+    ``ai_generate_code_batch`` is an optional backend generating code for
+    several modules in one call; when set, the gateway batches small
+    generation requests through it. With run workspaces, the stages in
+    WORKSPACE_STAGES must accept a ``cwd`` keyword naming the tree to work in.
+    """
+    
+    def __init__(self, **overrides: Any):
+        self.ai_generate_code = ai_generate_code
+        self.ai_generate_code_batch = None
+        self.ai_fix_code = ai_fix_code
+        self.run_tests = run_tests
+        self.get_last_error = get_last_error
+        self.integrate_modules = integrate_modules
+        self.run_e2e_tests = run_e2e_tests
+        self.generate_report = generate_report
+        self.push_github = push_github
+        for name, func in overrides.items():
+            if not hasattr(self, name):
+                raise ValueError(f"Unknown pipeline stage: {name}")
+            setattr(self, name, func)
+
+# Stages that run against the generated tree and so must run in a run's workspace
+WORKSPACE_STAGES = ("run_tests", "integrate_modules", "run_e2e_tests")
+
+def _accepts(func: Any, name: str) -> bool:
+    try:
+        parameters = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return any(p.name == name or p.kind == inspect.Parameter.VAR_KEYWORD for p in parameters)
+
+def stages_in(stages: PipelineStages, cwd: str) -> PipelineStages:
+    """
+    Return a copy of ``stages`` whose test, integration and E2E stages run in ``cwd``.
+    
+    Raises:
+        ValueError: If one of those stages takes no ``cwd``, since it would
+            silently run against another tree
+    """
+    missing = [name for name in WORKSPACE_STAGES if not _accepts(getattr(stages, name), "cwd")]
+    if missing:
+        raise ValueError(f"Stages {', '.join(missing)} take no cwd and cannot run in a workspace")
+    bound = copy.copy(stages)
+    for name in WORKSPACE_STAGES:
+        setattr(bound, name, functools.partial(getattr(stages, name), cwd=cwd))
+    return bound
+
+def run_module_tests(tests: List[str], stages: Optional[PipelineStages] = None) -> Tuple[bool, Optional[str]]:
+    """Run a module's tests and capture the failure in the same worker."""
+    stages = stages or PipelineStages()
+    if stages.run_tests(tests):
+        return True, None
+    return False, stages.get_last_error()
+
+def module_test_steps(module: Module,
+                      timing_store: Optional[TimingStore],
+                      stages: Optional[PipelineStages] = None,
+                      test_cache: Optional[TestResultCache] = None,
+                      cache_key: Optional[str] = None) -> JobSteps:
+    """
+    Run a module's tests as a scheduler step, unless the cache already has
+    the outcome for the same code, tests and dependencies. Runs without a
+    cache key are neither looked up nor stored.
+    
+    Returns:
+        Tuple of (passed, error)
+    """
+    if test_cache is not None and cache_key is not None:
+        cached = test_cache.lookup(cache_key)
+        if cached is not None:
+            logger.info("Reusing cached test result for %s (passed=%s)", module.name, cached[0])
+            return cached
+    step = Step(RESOURCE_CPU, run_module_tests, module.tests, stages, stage="test")
+    passed, error = yield step
+    record_stage_timing(timing_store, module, "test", step.elapsed, passed)
+    if test_cache is not None and cache_key is not None:
+        test_cache.store(cache_key, passed, error, step.elapsed, module.name)
+    return passed, error
+
+def process_module(module: Module,
+                   output_dir: str,
+                   timing_store: Optional[TimingStore],
+                   errors: List[str],
+                   gateway: AIGateway,
+                   fix_cache: Optional[FixCache] = None,
+                   stages: Optional[PipelineStages] = None,
+                   interfaces: Optional[InterfaceRegistry] = None,
+                   test_cache: Optional[TestResultCache] = None,
+                   modules: Optional[Dict[str, Module]] = None,
+                   checker: Optional[StaticChecker] = None,
+                   test_tree: Optional[FileTreeIndex] = None) -> JobSteps:
+    """
+    Generate, test and fix one module as a sequence of scheduler steps.
+    
+    Model calls, test runs and file writes are yielded as steps of the
+    matching resource class; the scheduler runs them and sends back results.
+    Raises JobFailed when the module ends up failed, so the scheduler can
+    block the modules that depend on it. With an interface registry, model
+    requests carry the interfaces of the module's dependencies, and the
+    module's own interface is recorded once it completes. With a test cache,
+    test runs whose code, tests and dependency code (looked up in
+    ``modules``) match an earlier run reuse its outcome; ``test_tree``
+    indexes the output tree for the test globs of every key. With a static
+    checker, code that does not compile or imports files nobody produces
+    goes straight to the fix step without running tests.
+    """
+    logger.info("Processing module: %s", module.name)
+    # The file the code is saved to, and the checker run on it, follow the module's language
+    language = module_code_language(module)
+    
+    try:
+        # Dependencies have completed by now, so their interfaces are recorded
+        if interfaces is not None:
+            module.dependency_context = interfaces.context_for(module.dependencies)
+        
+        def cache_key(code: str) -> Optional[str]:
+            if test_cache is None:
+                return None
+            dependency_code = {name: modules[name].code for name in module.dependencies if name in (modules or {})}
+            return test_result_key(code, module.tests, dependency_code, output_dir,
+                                   [module.name, module.type, module.technologies], test_tree)
+        
+        # Generate code
+        logger.info("Generating code for %s...", module.name)
+        step = Step(RESOURCE_LLM, gateway.generate, module, stage="generate")
+        code = yield step
+        record_stage_timing(timing_store, module, "generate", step.elapsed)
+        module.code = code
+        module.status = "code_generated"
+        
+        # Save code
+        yield Step(RESOURCE_DISK, save_code, module.name, code, output_dir, language, stage="save")
+        
+        # Reject code that does not even compile, then run tests
+        error = static_errors(checker, module, code, output_dir)
+        if error:
+            passed = False
+        else:
+            logger.info("Running tests for %s...", module.name)
+            passed, error = yield from module_test_steps(module, timing_store, stages, test_cache, cache_key(code))
+        if not passed:
+            logger.warning("Tests failed for %s, attempting fix...", module.name)
+            module.error_history.append(error)
+            original_code = module.code
+            signature = error_signature(error)
+            
+            # Replay the best patch that fixed the same failure before and
+            # applies to this code; the model is only asked if it does not pass
+            if fix_cache is not None:
+                for patch in fix_cache.lookup(signature, limit=5):
+                    candidate = apply_patch(original_code, patch)
+                    if candidate is None or static_errors(checker, module, candidate, output_dir):
+                        continue
+                    logger.info("Trying cached fix %s for %s", signature[:12], module.name)
+                    yield Step(RESOURCE_DISK, save_code, module.name, candidate, output_dir, language, stage="save")
+                    passed, _ = yield from module_test_steps(
+                        module, timing_store, stages, test_cache, cache_key(candidate)
+                    )
+                    fix_cache.record_result(signature, patch, passed)
+                    if passed:
+                        module.code = candidate
+                        module.fix_attempts += 1
+                    break
+            
+            if passed:
+                logger.info("Tests passed for %s after cached fix", module.name)
+                module.status = "completed"
+            else:
+                # Fix code
+                step = Step(RESOURCE_LLM, gateway.fix, module, error, stage="fix")
+                fix = yield step
+                record_stage_timing(timing_store, module, "fix", step.elapsed)
+                module.code = fix
+                module.fix_attempts += 1
+                module.status = "fixed"
+                
+                # Save fixed code
+                yield Step(RESOURCE_DISK, save_code, module.name, fix, output_dir, language, stage="save")
+                
+                # Re-run tests
+                fix_error = static_errors(checker, module, fix, output_dir)
+                if fix_error:
+                    passed = False
+                    module.error_history.append(fix_error)
+                else:
+                    passed, _ = yield from module_test_steps(module, timing_store, stages, test_cache, cache_key(fix))
+                if not passed:
+                    logger.error("Tests still failing for %s after fix", module.name)
+                    module.status = "failed"
+                    errors.append(f"Module {module.name} failed {'static check' if fix_error else 'tests'}")
+                else:
+                    logger.info("Tests passed for %s after fix", module.name)
+                    module.status = "completed"
+                    if fix_cache is not None:
+                        fix_cache.store(signature, make_patch(original_code, fix), error)
+        else:
+            logger.info("Tests passed for %s", module.name)
+            module.status = "completed"
+        
+        module.updated_at = datetime.now()
+        if interfaces is not None and module.status == "completed":
+            interfaces.record(extract_interface(
+                module.name, module.code, module_code_path(module.name, output_dir, language), module.files, output_dir
+            ))
+        
+    except Exception as e:
+        logger.error("Error processing module %s: %s", module.name, e)
+        module.status = "error"
+        module.error_history.append(str(e))
+        errors.append(f"Module {module.name} failed: {str(e)}")
+    
+    if module.status in ("failed", "error"):
+        raise JobFailed(f"Module {module.name} {module.status}")
+
+def module_code_language(module: Module) -> Optional[str]:
+    """Language of a module's generated code, None when it cannot be told."""
+    return module_language(module.name, module.technologies, module.files)
+
+def module_code_path(module_name: str, output_dir: str = "src", language: Optional[str] = None) -> str:
+    """Return the file a module's generated code is saved to."""
+    if module_name.endswith(".py"):
+        return os.path.join(output_dir, module_name)
+    elif module_name.endswith(".tsx") or module_name.endswith(".ts"):
+        return os.path.join(output_dir, module_name)
+    elif language in LANGUAGE_EXTENSIONS:
+        return os.path.join(output_dir, module_name + LANGUAGE_EXTENSIONS[language])
+    # Default to Python file
+    return os.path.join(output_dir, f"{module_name}.py")
+
+def static_errors(checker: Optional[StaticChecker], module: Module, code: str, output_dir: str) -> Optional[str]:
+    """
+    Check a module's code as the file it is saved to.
+
+    Returns:
+        The problems found as a fix prompt, or None when there are none,
+        there is no checker or the module's language is unknown
+    """
+    language = module_code_language(module)
+    if checker is None or language is None:
+        return None
+    path = os.path.relpath(module_code_path(module.name, output_dir, language), output_dir).replace(os.sep, "/")
+    problems = checker.check(code, path, language)
+    if not problems:
+        return None
+    logger.warning("Static check failed for %s: %s", module.name, problems[0])
+    return "Static check failed:\n" + "\n".join(str(problem) for problem in problems)
+
+def module_output_hashes(modules: List[Module], tree: MerkleTree, output_dir: str) -> Dict[str, str]:
+    """Hash each module's saved code and planned files in the output tree."""
+    hashes = {}
+    for module in modules:
+        code_path = os.path.relpath(
+            module_code_path(module.name, output_dir, module_code_language(module)), output_dir
+        ).replace(os.sep, "/")
+        hashes[module.name] = tree.hash_of([code_path] + module_write_set(module))
+    return hashes
+
+def save_code(module_name: str, code: str, output_dir: str = "src", language: Optional[str] = None) -> None:
     """Save generated code to file system."""
     try:
         # Ensure output directory exists
         os.makedirs(output_dir, exist_ok=True)
         
         # Determine file path based on module name
-        if module_name.endswith(".py"):
-            file_path = os.path.join(output_dir, module_name)
-        elif module_name.endswith(".tsx") or module_name.endswith(".ts"):
-            file_path = os.path.join(output_dir, module_name)
-        else:
-            # Default to Python file
-            file_path = os.path.join(output_dir, f"{module_name}.py")
+        file_path = module_code_path(module_name, output_dir, language)
         
-        # Write code to file
-        with open(file_path, 'w', encoding='utf-8') as f:
+        # Write a new file and rename it over the old one, so a file hardlinked
+        # from the published tree into a run workspace is never modified in place
+        temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
             f.write(code)
+        os.replace(temp_path, file_path)
         
-        logger.info(f"Code saved to {file_path}")
+        logger.info("Code saved to %s", file_path)
         
     except Exception as e:
-        logger.error(f"Failed to save code for module {module_name}: {e}")
+        logger.error("Failed to save code for module %s: %s", module_name, e)
         raise
 
-def ai_autocode_pipeline(requirement: str, config_path: str = "ai/config/pipeline.json") -> Dict[str, Any]:
-    """
-    Main AI auto-code pipeline function.
-    
-    Args:
-        requirement: The development requirement in natural language
-        config_path: Path to pipeline configuration file
-        
-    Returns:
-        Dictionary containing pipeline execution results
-    """
+def _pipeline_events(requirement: str,
+                     config_path: str,
+                     previous_result: Optional[Dict[str, Any]],
+                     config: Optional[Dict[str, Any]] = None,
+                     stages: Optional[PipelineStages] = None) -> Iterator[PipelineEvent]:
+    """Run the pipeline, yielding progress events; the last event carries the result."""
     # Load configuration
-    config = load_config(config_path)
+    if config is None:
+        config = load_config(config_path)
+    stages = stages or PipelineStages()
     
     # Initialize pipeline state
     pipeline_start = datetime.now()
+    run_id = new_run_id()
     pipeline_result = {
+        "run_id": run_id,
         "requirement": requirement,
         "start_time": pipeline_start.isoformat(),
         "modules": [],
@@ -120,110 +423,395 @@ def ai_autocode_pipeline(requirement: str, config_path: str = "ai/config/pipelin
         "report": None
     }
     
+    # Progress tracking for the event stream
+    modules: List[Module] = []
+    module_status: Dict[str, str] = {}
+    stage_started: Dict[str, float] = {}
+    active_stage: Optional[str] = None
+    reported_errors = 0
+    workspace: Optional[RunWorkspace] = None
+    
+    # Profiling is opt-in; when off there is no profiler and no overhead
+    profile_options = profiling_options(config)
+    profiler = RunProfiler(**profile_options) if profile_options is not None else None
+    
+    def start_stage(stage: str) -> StageStarted:
+        nonlocal active_stage
+        active_stage = stage
+        stage_started[stage] = time.monotonic()
+        if profiler is not None and profiler.wants(stage):
+            profiler.start(stage)
+        return StageStarted(stage)
+    
+    def end_stage(stage: str, success: bool = True, **data: Any) -> StageFinished:
+        if profiler is not None and profiler.wants(stage):
+            profiler.stop(stage)
+        return StageFinished(stage, success, time.monotonic() - stage_started[stage], data)
+    
+    def progress() -> List[PipelineEvent]:
+        """Events for errors and module status changes since the last call."""
+        nonlocal reported_errors
+        events: List[PipelineEvent] = [
+            PipelineError(message, active_stage) for message in pipeline_result["errors"][reported_errors:]
+        ]
+        reported_errors = len(pipeline_result["errors"])
+        for module in modules:
+            previous = module_status.get(module.name)
+            if module.status != previous:
+                module_status[module.name] = module.status
+                events.append(ModuleStatusChanged(module.name, module.status, previous))
+        return events
+    
     try:
-        logger.info(f"Starting AI auto-code pipeline for requirement: {requirement[:100]}...")
+        if profiler is not None and profiler.stages is None:
+            profiler.start()
+        logger.info("Starting AI auto-code pipeline for requirement: %s...", requirement[:100])
+        
+        # Each run writes into its own workspace materialized from the published
+        # tree, and tests, integration and E2E run there too
+        publish_dir = output_dir = config.get("output_dir", "src")
+        workspaces = config.get("workspaces")
+        workspace_options = workspaces if isinstance(workspaces, dict) else {}
+        if workspaces:
+            workspace = RunWorkspace(
+                publish_dir,
+                workspace_options.get("root", DEFAULT_WORKSPACE_ROOT),
+                run_id,
+                workspace_options.get("link_mode", DEFAULT_LINK_MODE)
+            ).create()
+            output_dir = workspace.path
+            pipeline_result["workspace"] = workspace.path
+            stages = stages_in(stages, os.path.abspath(workspace.path))
         
         # Step 1: Normalize requirement
+        yield start_stage("normalize")
         logger.info("Step 1: Normalizing requirement...")
         spec = normalize_requirement(requirement)
-        logger.info(f"Requirement normalized: {spec}")
+        logger.info("Requirement normalized: %d fields", len(spec))
+        logger.debug("Normalized specification: %s", lazy(lambda: json.dumps(spec, ensure_ascii=False, default=str)))
+        yield end_stage("normalize")
         
         # Step 2: Generate development plan
+        yield start_stage("plan")
         logger.info("Step 2: Generating development plan...")
-        modules_data = ai_plan_modules(spec)
-        modules = [Module.from_dict(m) for m in modules_data]
-        logger.info(f"Generated {len(modules)} modules for development")
+        plan_diff = None
+        if previous_result and previous_result.get("plan"):
+            previous_plan = DevelopmentPlan.from_dict(previous_result["plan"])
+            plan, plan_diff = replan(previous_plan, spec, cache_dir=config.get("plan_cache_dir"))
+            pipeline_result["plan_diff"] = plan_diff.to_dict()
+        else:
+            plan = plan_development(spec, cache_dir=config.get("plan_cache_dir"))
+        pipeline_result["plan"] = plan.to_dict()
+        
+        # Carry over the state of modules the requirement change did not affect
+        previous_modules = {}
+        if plan_diff is not None:
+            previous_modules = {m["name"]: m for m in previous_result.get("modules", [])}
+        for planned in plan.modules:
+            if plan_diff is not None and not plan_diff.is_dirty(planned.name) and planned.name in previous_modules:
+                modules.append(Module.from_dict(previous_modules[planned.name]))
+            else:
+                modules.append(Module.from_dict(planned.to_dict()))
+        logger.info("Generated %d modules for development", len(modules))
+        
+        # Modules run concurrently unless their write sets overlap
+        conflict_map = plan.write_conflict_map(get_file_tree_index(output_dir))
+        write_locks = WriteSetLock(conflict_map)
+        pipeline_result["write_conflicts"] = conflict_map.to_dict()
+        
+        # Stage timings feed the planner's duration model
+        timing_store = None
+        if config.get("record_timings", True):
+            timing_store = TimingStore(config.get("timings_path", DEFAULT_TIMINGS_PATH))
+        yield end_stage("plan", modules=[m.name for m in modules])
+        yield from progress()
         
         # Step 3: Process each module
+        yield start_stage("modules")
         logger.info("Step 3: Processing modules...")
+        durations = plan.estimate_durations(
+            get_duration_model(timing_store.filepath) if timing_store is not None else None
+        )
+        # Model calls go through the shared gateway, which coalesces identical
+        # requests across concurrent pipelines and applies the rate limit
+        gateway = get_ai_gateway(stages.ai_generate_code, stages.ai_fix_code, config.get("ai_gateway"),
+                                 stages.ai_generate_code_batch)
+        # In distributed mode generate, test and fix steps become tasks on a
+        # shared work queue, run by workers on any host (see worker.py)
+        module_stages = stages
+        concurrency = config.get("concurrency")
+        distributed = config.get("distributed")
+        if distributed:
+            queue_options = distributed if isinstance(distributed, dict) else {}
+            remote = RemoteStages(
+                WorkQueue(queue_options.get("queue_path", DEFAULT_QUEUE_PATH)),
+                queue_options.get("poll_interval", DEFAULT_POLL_INTERVAL),
+                queue_options.get("task_timeout"),
+                queue_options.get("max_attempts", DEFAULT_MAX_ATTEMPTS),
+                queue_options.get("snapshot_dir"),
+                workspace_options.get("link_mode", DEFAULT_LINK_MODE)
+            )
+            gateway = remote
+            module_stages = copy.copy(stages)
+            # Workers test a snapshot of this run's tree, not whatever is in their cwd
+            module_stages.run_tests = functools.partial(remote.run_tests, cwd=os.path.abspath(output_dir))
+            module_stages.get_last_error = remote.get_last_error
+            # Slots now bound tasks in flight across the fleet, not local work
+            concurrency = queue_options.get("concurrency", concurrency)
+            pipeline_result["distributed"] = {"queue_path": remote.queue.filepath}
+        fix_cache = None
+        if config.get("fix_cache", True):
+            fix_cache = FixCache(config.get("fix_cache_path", DEFAULT_FIX_CACHE_PATH))
+        # Test outcomes are reused when code, tests and dependencies are unchanged
+        test_cache = None
+        test_tree = None
+        if config.get("test_cache", True):
+            test_cache = TestResultCache(
+                config.get("test_cache_path", DEFAULT_TEST_CACHE_PATH),
+                config.get("test_cache_max_entries", DEFAULT_TEST_CACHE_MAX_ENTRIES),
+                config.get("test_cache_max_age_days", DEFAULT_TEST_CACHE_MAX_AGE_DAYS),
+                config.get("test_cache_max_bytes", DEFAULT_TEST_CACHE_MAX_BYTES)
+            )
+            # One walk of the output tree serves the test globs of every cache key
+            test_tree = FileTreeIndex(output_dir)
+        # Generated code is compiled and its relative imports resolved before testing
+        checker = None
+        if config.get("static_check", True):
+            known_paths = get_file_tree_index(output_dir).files() + [
+                path for m in modules
+                for path in [os.path.relpath(module_code_path(m.name, output_dir, module_code_language(m)), output_dir)]
+                + module_write_set(m)
+            ]
+            checker = StaticChecker(known_paths, config.get("static_check_imports", True))
+        # Model requests get the exported interfaces of a module's dependencies
+        interfaces = None
+        if config.get("interface_context", True):
+            interfaces = InterfaceRegistry(config.get("interface_context_chars", DEFAULT_MAX_CONTEXT_CHARS))
+        # Dependents of a failed module are blocked, and stages or whole modules
+        # that overrun their timeout are cancelled
+        stage_timeouts = config.get("stage_timeouts", {})
+        module_timeouts = config.get("module_timeouts", {})
+        scheduler = ResourceScheduler(
+            concurrency,
+            admission=write_locks,
+            stage_timeouts=stage_timeouts,
+            fail_fast=config.get("fail_fast", True)
+        )
+        modules_by_name = {m.name: m for m in modules}
         for i, module in enumerate(modules):
-            logger.info(f"Processing module {i+1}/{len(modules)}: {module.name}")
+            if plan_diff is not None and not plan_diff.is_dirty(module.name) and module.status == "completed":
+                logger.info("Skipping unchanged module %d/%d: %s", i+1, len(modules), module.name)
+                if interfaces is not None:
+                    interfaces.record(extract_interface(
+                        module.name, module.code, module_code_path(module.name, output_dir, module_code_language(module)),
+                        module.files, output_dir
+                    ))
+                continue
             
-            try:
-                # Generate code
-                logger.info(f"Generating code for {module.name}...")
-                code = ai_generate_code(module)
-                module.code = code
-                module.status = "code_generated"
-                
-                # Save code
-                save_code(module.name, code, config.get("output_dir", "src"))
-                
-                # Run tests
-                logger.info(f"Running tests for {module.name}...")
-                if not run_tests(module.tests):
-                    logger.warning(f"Tests failed for {module.name}, attempting fix...")
-                    error = get_last_error()
-                    module.error_history.append(error)
-                    
-                    # Fix code
-                    fix = ai_fix_code(module, error)
-                    module.code = fix
-                    module.fix_attempts += 1
-                    module.status = "fixed"
-                    
-                    # Save fixed code
-                    save_code(module.name, fix, config.get("output_dir", "src"))
-                    
-                    # Re-run tests
-                    if not run_tests(module.tests):
-                        logger.error(f"Tests still failing for {module.name} after fix")
-                        module.status = "failed"
-                        pipeline_result["errors"].append(f"Module {module.name} failed tests")
-                    else:
-                        logger.info(f"Tests passed for {module.name} after fix")
-                        module.status = "completed"
-                else:
-                    logger.info(f"Tests passed for {module.name}")
-                    module.status = "completed"
-                
-                module.updated_at = datetime.now()
-                
-            except Exception as e:
-                logger.error(f"Error processing module {module.name}: {e}")
-                module.status = "error"
-                module.error_history.append(str(e))
-                pipeline_result["errors"].append(f"Module {module.name} failed: {str(e)}")
+            scheduler.add_job(
+                module.name,
+                lambda module=module: process_module(
+                    module, output_dir, timing_store, pipeline_result["errors"], gateway, fix_cache, module_stages, interfaces,
+                    test_cache, modules_by_name, checker, test_tree
+                ),
+                dependencies=module.dependencies,
+                duration=durations[module.name].mean,
+                timeout=module_timeouts.get(module.name, module_timeouts.get("default"))
+            )
+        
+        blocked = []
+        
+        def mark_blocked() -> None:
+            for module in modules:
+                job = scheduler.jobs.get(module.name)
+                if job is not None and job.status == "blocked" and module.status != "blocked":
+                    module.status = "blocked"
+                    module.error_history.append(str(job.error))
+                    blocked.append(module.name)
+                    pipeline_result["errors"].append(f"Module {module.name} blocked: {job.error}")
+        
+        for job, step in scheduler.iter_run():
+            if step is not None:
+                yield StepCompleted(job.name, step.name, step.resource_class, step.elapsed, step.queue_delay, step.error is None)
+            if step is not None and step.name == "test":
+                passed, error = step.result if step.error is None else (False, str(step.error))
+                yield TestResult(job.name, passed, step.elapsed, error)
+            mark_blocked()
+            yield from progress()
+        mark_blocked()
+        if blocked:
+            pipeline_result["blocked_modules"] = blocked
+            logger.warning("Skipped %d modules with failed dependencies: %s", len(blocked), ', '.join(blocked))
+        if test_cache is not None:
+            pipeline_result["test_cache"] = test_cache.stats()
+        yield from progress()
+        yield end_stage(
+            "modules",
+            success=all(m.status == "completed" for m in modules),
+            statuses={m.name: m.status for m in modules}
+        )
+        
+        # Hashes of the output tree decide whether integration and E2E must run again
+        output_state = None
+        if config.get("incremental_integration", True):
+            output_state = OutputStateStore(config.get("output_state_path", DEFAULT_OUTPUT_STATE_PATH))
+        incremental = pipeline_result["incremental"] = {}
+        tree = None
         
         # Step 4: Integrate modules
+        yield start_stage("integrate")
         logger.info("Step 4: Integrating modules...")
         try:
-            integrate_modules(modules)
-            logger.info("Modules integrated successfully")
+            to_integrate = modules
+            if output_state is not None:
+                integrated = output_state.get(publish_dir, "integration")
+                previous_tree = MerkleTree.from_dict(integrated["tree"]) if integrated else None
+                tree = build_merkle_tree(output_dir, previous_tree)
+                incremental["changed_files"] = tree.changed_files(previous_tree)
+                if integrated and integrated["root_hash"] == tree.root_hash:
+                    to_integrate = []
+                elif integrated:
+                    # Only modules whose code or files changed; all of them if the
+                    # change is outside every module's files
+                    hashes = module_output_hashes(modules, tree, output_dir)
+                    to_integrate = [m for m in modules if integrated["modules"].get(m.name) != hashes[m.name]] or modules
+            
+            if to_integrate:
+                run_with_timeout(stages.integrate_modules, stage_timeouts.get("integrate"), to_integrate, stage="integrate")
+                logger.info("Integrated %d/%d modules successfully", len(to_integrate), len(modules))
+                if output_state is not None:
+                    # Integration may write files itself, so record the tree it left behind
+                    tree = build_merkle_tree(output_dir, tree)
+                    output_state.put(publish_dir, "integration", {
+                        "root_hash": tree.root_hash,
+                        "tree": tree.to_dict(),
+                        "modules": module_output_hashes(modules, tree, output_dir)
+                    })
+            else:
+                logger.info("Output tree unchanged since last integration, skipping")
+            incremental["integrated"] = [m.name for m in to_integrate]
+            success = True
         except Exception as e:
-            logger.error(f"Module integration failed: {e}")
+            logger.error("Module integration failed: %s", e)
             pipeline_result["errors"].append(f"Integration failed: {str(e)}")
+            success = False
+        yield from progress()
+        yield end_stage("integrate", success, integrated=incremental.get("integrated"))
         
         # Step 5: Run end-to-end tests
+        yield start_stage("e2e")
         logger.info("Step 5: Running end-to-end tests...")
         try:
-            e2e_results = run_e2e_tests()
-            logger.info(f"End-to-end tests completed: {e2e_results}")
+            e2e_state = None
+            if output_state is not None:
+                tree = build_merkle_tree(output_dir, tree)
+                e2e_state = output_state.get(publish_dir, "e2e")
+            sharding = config.get("e2e_sharding")
+            shard_options = dict(sharding) if isinstance(sharding, dict) else {}
+            shard_options.setdefault("root", output_dir)
+            # Only the specs covering the files changed since the suite last
+            # passed run again; None runs the whole suite
+            specs = None
+            if e2e_state and e2e_state["root_hash"] != tree.root_hash and e2e_state.get("tree"):
+                specs = affected_e2e_specs(
+                    tree.changed_files(MerkleTree.from_dict(e2e_state["tree"])),
+                    shard_options.get("specs") or discover_e2e_specs(shard_options["root"], shard_options.get("spec_dirs")),
+                    config.get("e2e_spec_map")
+                )
+                if specs is not None and not sharding and not _accepts(stages.run_e2e_tests, "specs"):
+                    logger.info("E2E stage cannot run a subset of specs, running the whole suite")
+                    specs = None
+            if e2e_state and (e2e_state["root_hash"] == tree.root_hash or specs == []):
+                logger.info("Nothing the E2E specs cover changed since the last passing run, skipping")
+                e2e_results = e2e_state["results"]
+                incremental["e2e_skipped"] = True
+                if e2e_state["root_hash"] != tree.root_hash:
+                    output_state.put(publish_dir, "e2e", dict(e2e_state, root_hash=tree.root_hash, tree=tree.to_dict()))
+                yield TestResult(None, True, 0.0, details=e2e_results)
+            else:
+                spec_options = {"specs": specs} if specs is not None else {}
+                if specs is not None:
+                    logger.info("Running %d affected E2E specs", len(specs))
+                if sharding:
+                    # Split the suite across worker processes balanced by spec durations,
+                    # run against this run's output tree
+                    e2e_results = run_with_timeout(run_sharded_e2e, stage_timeouts.get("e2e"), stage="e2e",
+                                                   **dict(shard_options, **spec_options))
+                else:
+                    e2e_results = run_with_timeout(stages.run_e2e_tests, stage_timeouts.get("e2e"), stage="e2e",
+                                                   **spec_options)
+                logger.info("End-to-end tests completed")
+                logger.debug("End-to-end results: %s", lazy(lambda: json.dumps(e2e_results, default=str)))
+                passed = e2e_results.get("passed") if isinstance(e2e_results, dict) else bool(e2e_results)
+                skipped = isinstance(e2e_results, dict) and e2e_results.get("skipped")
+                yield TestResult(None, passed, time.monotonic() - stage_started["e2e"], details=e2e_results)
+                # Only a suite that actually ran and passed lets later runs skip E2E;
+                # after a passing subset the rest of the suite still passes on this tree
+                if passed and not skipped and output_state is not None:
+                    output_state.put(publish_dir, "e2e", {
+                        "root_hash": tree.root_hash,
+                        "tree": tree.to_dict(),
+                        "results": e2e_results
+                    })
+                incremental["e2e_skipped"] = False
+                incremental["e2e_specs"] = specs
+            pipeline_result["e2e"] = e2e_results
+            success = True
         except Exception as e:
-            logger.error(f"End-to-end tests failed: {e}")
+            logger.error("End-to-end tests failed: %s", e)
             pipeline_result["errors"].append(f"E2E tests failed: {str(e)}")
+            yield TestResult(None, False, time.monotonic() - stage_started["e2e"], str(e))
+            success = False
+        yield from progress()
+        yield end_stage("e2e", success)
         
         # Step 6: Generate report
+        yield start_stage("report")
         logger.info("Step 6: Generating report...")
         try:
-            report = generate_report(modules, pipeline_result)
+            report = stages.generate_report(modules, pipeline_result)
             pipeline_result["report"] = report
             logger.info("Report generated successfully")
+            success = True
         except Exception as e:
-            logger.error(f"Report generation failed: {e}")
+            logger.error("Report generation failed: %s", e)
             pipeline_result["errors"].append(f"Report generation failed: {str(e)}")
+            success = False
+        yield from progress()
+        yield end_stage("report", success)
+        
+        # Step 6b: Publish the workspace; failed runs keep theirs for inspection
+        if workspace is not None:
+            yield start_stage("publish")
+            success = False
+            if not pipeline_result["errors"]:
+                try:
+                    pipeline_result["workspace"] = workspace.promote(
+                        workspace_options.get("keep", DEFAULT_KEEP_RELEASES)
+                    )
+                    success = True
+                except Exception as e:
+                    logger.error("Publishing workspace failed: %s", e)
+                    pipeline_result["errors"].append(f"Publish failed: {str(e)}")
+            yield from progress()
+            yield end_stage("publish", success, workspace=workspace.path)
         
         # Step 7: Push to GitHub (if configured)
+        yield start_stage("push")
         logger.info("Step 7: Pushing to GitHub...")
         try:
             if config.get("auto_push", False):
-                push_github()
+                stages.push_github()
                 logger.info("Changes pushed to GitHub successfully")
             else:
                 logger.info("GitHub push skipped (auto_push disabled)")
+            success = True
         except Exception as e:
-            logger.error(f"GitHub push failed: {e}")
+            logger.error("GitHub push failed: %s", e)
             pipeline_result["errors"].append(f"GitHub push failed: {str(e)}")
+            success = False
+        yield from progress()
+        yield end_stage("push", success)
         
         # Update pipeline result
         pipeline_result["modules"] = [m.to_dict() for m in modules]
@@ -233,38 +821,120 @@ def ai_autocode_pipeline(requirement: str, config_path: str = "ai/config/pipelin
         logger.info("AI auto-code pipeline completed successfully")
         
     except Exception as e:
-        logger.error(f"Pipeline failed: {e}")
+        logger.error("Pipeline failed: %s", e)
         pipeline_result["errors"].append(f"Pipeline failed: {str(e)}")
         pipeline_result["end_time"] = datetime.now().isoformat()
+        yield from progress()
+    
+    # Failed runs keep their workspace, a few at a time, for inspection
+    if workspace is not None and not workspace.published:
+        try:
+            pipeline_result["workspace"] = workspace.fail(workspace_options.get("keep_failed", DEFAULT_KEEP_FAILED))
+            logger.warning("Run %s failed, workspace kept at %s", run_id, workspace.path)
+        except OSError as e:
+            logger.error("Failed to set aside workspace %s: %s", workspace.path, e)
     
     # Save pipeline result
     try:
-        result_file = os.path.join(config.get("output_dir", "docs"), f"pipeline_result_{pipeline_start.strftime('%Y%m%d_%H%M%S')}.json")
+        result_dir = workspace.path if workspace is not None else config.get("output_dir", "docs")
+        result_file = os.path.join(result_dir, f"pipeline_result_{run_id}.json")
+        if profiler is not None:
+            # Profiles go next to the result file, which references them
+            try:
+                pipeline_result["profile"] = profiler.write(result_dir, run_id)
+            except Exception as e:
+                logger.error("Failed to write profiles: %s", e)
+                profiler.close()
         with open(result_file, 'w', encoding='utf-8') as f:
             json.dump(pipeline_result, f, indent=2, ensure_ascii=False)
-        logger.info(f"Pipeline result saved to {result_file}")
+        logger.info("Pipeline result saved to %s", result_file)
     except Exception as e:
-        logger.error(f"Failed to save pipeline result: {e}")
+        logger.error("Failed to save pipeline result: %s", e)
     
-    return pipeline_result
+    yield PipelineFinished(pipeline_result)
 
-async def ai_autocode_pipeline_async(requirement: str, config_path: str = "ai/config/pipeline.json") -> Dict[str, Any]:
+def iter_pipeline_events(requirement: str,
+                         config_path: str = "ai/config/pipeline.json",
+                         previous_result: Optional[Dict[str, Any]] = None,
+                         config: Optional[Dict[str, Any]] = None,
+                         stages: Optional[PipelineStages] = None) -> EventStream:
     """
-    Async version of the AI auto-code pipeline.
+    Run the pipeline as a stream of progress events.
+    
+    The stream yields StageStarted/StageFinished around every step,
+    ModuleStatusChanged whenever a module changes status, StepCompleted for
+    every scheduled generate/save/test/fix step, TestResult for
+    module and end-to-end test runs, PipelineError for every recorded error
+    and finally PipelineFinished with the pipeline result. Use ``for`` to run
+    the pipeline in the current thread, or ``async for`` inside an event loop.
     
     Args:
         requirement: The development requirement in natural language
         config_path: Path to pipeline configuration file
+        previous_result: Result of an earlier run to replan incrementally against
+        config: Configuration to use instead of loading config_path
+        stages: Replacement stage functions, e.g. for simulation
+    
+    Returns:
+        EventStream of PipelineEvent objects
+    """
+    return EventStream(lambda: _pipeline_events(requirement, config_path, previous_result, config, stages))
+
+def ai_autocode_pipeline(requirement: str,
+                         config_path: str = "ai/config/pipeline.json",
+                         previous_result: Optional[Dict[str, Any]] = None,
+                         config: Optional[Dict[str, Any]] = None,
+                         stages: Optional[PipelineStages] = None) -> Dict[str, Any]:
+    """
+    Main AI auto-code pipeline function.
+    
+    Args:
+        requirement: The development requirement in natural language
+        config_path: Path to pipeline configuration file
+        previous_result: Result of an earlier run; when it contains a plan, only
+            the modules affected by the requirement change are reprocessed
+        config: Configuration to use instead of loading config_path
+        stages: Replacement stage functions, e.g. for simulation
         
     Returns:
         Dictionary containing pipeline execution results
     """
-    # Run the pipeline in a thread pool to avoid blocking
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, ai_autocode_pipeline, requirement, config_path)
+    result = None
+    for event in iter_pipeline_events(requirement, config_path, previous_result, config, stages):
+        if isinstance(event, PipelineFinished):
+            result = event.result
+    return result
+
+async def ai_autocode_pipeline_async(requirement: str,
+                                     config_path: str = "ai/config/pipeline.json",
+                                     previous_result: Optional[Dict[str, Any]] = None,
+                                     config: Optional[Dict[str, Any]] = None,
+                                     stages: Optional[PipelineStages] = None) -> Dict[str, Any]:
+    """
+    Async version of the AI auto-code pipeline.
+    
+    Args:
+        requirement: The development requirement in natural language
+        config_path: Path to pipeline configuration file
+        previous_result: Result of an earlier run to replan incrementally against
+        config: Configuration to use instead of loading config_path
+        stages: Replacement stage functions, e.g. for simulation
+    
+    Returns:
+        Dictionary containing pipeline execution results
+    """
+    # The event stream runs the pipeline on a worker thread to avoid blocking
+    result = None
+    async for event in iter_pipeline_events(requirement, config_path, previous_result, config, stages):
+        if isinstance(event, PipelineFinished):
+            result = event.result
+    return result
 
 if __name__ == "__main__":
+    import sys
+    
     # Example usage
+    configure_logging()
     if len(sys.argv) > 1:
         requirement = " ".join(sys.argv[1:])
         result = ai_autocode_pipeline(requirement)
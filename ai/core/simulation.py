@@ -0,0 +1,406 @@
+"""
+Pipeline Simulation Module
+
+This module load-tests the pipeline orchestration without calling real
+models, test runners or git. Every external stage is replaced by a local
+stand-in with configurable latency and failure distributions. Hundreds of
+synthetic runs can then go through the real planner, scheduler, gateway and
+caches concurrently. The report covers throughput, queueing delay per
+resource class, stage timings and process resource usage.
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional
+
+from .pipeline import PipelineStages, iter_pipeline_events, module_code_language
+from .modules.planner import get_plan_cache
+from .utils.ai_gateway import get_ai_gateway
+from .utils.events import StageFinished, StepCompleted, PipelineFinished
+from .utils.logger import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# Latency in seconds before time scaling, and failure probability, per stage
+DEFAULT_PROFILE = {
+    "ai_generate_code": {"latency": {"dist": "lognormal", "mean": 20.0, "sigma": 0.5}, "failure_rate": 0.01},
+    "ai_generate_code_batch": {"latency": {"dist": "lognormal", "mean": 30.0, "sigma": 0.5}, "failure_rate": 0.01},
+    "ai_fix_code": {"latency": {"dist": "lognormal", "mean": 25.0, "sigma": 0.5}, "failure_rate": 0.01},
+    "run_tests": {"latency": {"dist": "uniform", "low": 5.0, "high": 30.0}, "failure_rate": 0.3},
+    "integrate_modules": {"latency": {"dist": "constant", "value": 10.0}, "failure_rate": 0.0},
+    "run_e2e_tests": {"latency": {"dist": "uniform", "low": 60.0, "high": 180.0}, "failure_rate": 0.05},
+    "generate_report": {"latency": {"dist": "constant", "value": 1.0}, "failure_rate": 0.0},
+    "push_github": {"latency": {"dist": "constant", "value": 3.0}, "failure_rate": 0.0}
+}
+
+DEFAULT_REQUIREMENTS = [
+    "Build a web app with Next.js, user login and database storage",
+    "Create a REST API for managing maritime services with authentication",
+    "Build a dashboard web app showing map layers with search",
+    "Create a Python library for parsing S-100 datasets",
+    "Build a mobile app for browsing maritime services offline"
+]
+
+# Test failures drawn from a small set, so repeated signatures reach the fix cache
+SIMULATED_ERRORS = [
+    "TypeError: Cannot read properties of undefined (reading 'map') at src/components/List.tsx:12:5",
+    "Error: Cannot find module './db' from src/lib/auth.ts",
+    "AssertionError: expected 200 but received 500 at tests/unit/api.test.ts:40:7",
+    "SyntaxError: Unexpected token '}' at src/pages/index.tsx:88:1",
+    "ReferenceError: fetch is not defined at src/lib/client.ts:3:10"
+]
+
+def sample_seconds(spec: Any, rng: random.Random) -> float:
+    """
+    Draw a duration from a latency spec.
+
+    A spec is a number or a dict with ``dist`` "constant" (value),
+    "uniform" (low, high), "exponential" (mean) or "lognormal" (mean, sigma).
+    """
+    if isinstance(spec, (int, float)):
+        return float(spec)
+    dist = spec.get("dist", "constant")
+    if dist == "constant":
+        return float(spec.get("value", 0.0))
+    if dist == "uniform":
+        return rng.uniform(spec.get("low", 0.0), spec.get("high", 0.0))
+    if dist == "exponential":
+        return rng.expovariate(1.0 / spec["mean"]) if spec.get("mean") else 0.0
+    if dist == "lognormal":
+        sigma = spec.get("sigma", 0.5)
+        return rng.lognormvariate(math.log(spec["mean"]) - sigma ** 2 / 2, sigma) if spec.get("mean") else 0.0
+    raise ValueError(f"Unknown latency distribution: {dist}")
+
+class SimulatedStages:
+    """Stand-ins for the pipeline's external stages."""
+
+    def __init__(self, profile: Optional[Dict[str, Any]] = None, time_scale: float = 1.0, seed: Optional[int] = None):
+        """
+        Args:
+            profile: Per-stage ``latency`` spec and ``failure_rate``, merged over DEFAULT_PROFILE
+            time_scale: Factor applied to every sampled latency
+            seed: Seed for reproducible latencies and failures
+        """
+        self.profile = {stage: dict(settings) for stage, settings in DEFAULT_PROFILE.items()}
+        for stage, settings in (profile or {}).items():
+            self.profile.setdefault(stage, {}).update(settings)
+        self.time_scale = time_scale
+        self.stats = {stage: {"calls": 0, "failures": 0, "busy_seconds": 0.0} for stage in self.profile}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _simulate(self, stage: str) -> bool:
+        """Spend the stage's latency and return whether the call fails."""
+        settings = self.profile.get(stage, {})
+        with self._lock:
+            seconds = sample_seconds(settings.get("latency", 0.0), self._rng) * self.time_scale
+            failed = self._rng.random() < settings.get("failure_rate", 0.0)
+        time.sleep(seconds)
+        with self._lock:
+            stats = self.stats[stage]
+            stats["calls"] += 1
+            stats["failures"] += int(failed)
+            stats["busy_seconds"] += seconds
+        return failed
+
+    @staticmethod
+    def _generated_code(module: Any) -> str:
+        # Valid code in the module's language, so it passes the static check
+        function = module.name.replace('-', '_')
+        if module_code_language(module) == "python":
+            return f"# simulated code for {module.name}\ndef {function}():\n    pass\n"
+        return f"// simulated code for {module.name}\nexport default function {function}() {{}}\n"
+
+    @staticmethod
+    def _comment(module: Any, text: str) -> str:
+        return f"{'#' if module_code_language(module) == 'python' else '//'} {text}\n"
+
+    def ai_generate_code(self, module: Any) -> str:
+        if self._simulate("ai_generate_code"):
+            raise RuntimeError(f"Simulated model failure generating {module.name}")
+        return self._generated_code(module)
+
+    def ai_generate_code_batch(self, modules: List[Any]) -> List[str]:
+        # One call for the whole batch, so one latency sample and one failure draw
+        if self._simulate("ai_generate_code_batch"):
+            raise RuntimeError(f"Simulated model failure generating a batch of {len(modules)} modules")
+        return [self._generated_code(module) for module in modules]
+
+    def ai_fix_code(self, module: Any, error: str) -> str:
+        if self._simulate("ai_fix_code"):
+            raise RuntimeError(f"Simulated model failure fixing {module.name}")
+        return module.code + self._comment(module, f"simulated fix for: {error.splitlines()[0] if error else ''}")
+
+    def run_tests(self, tests: List[str], cwd: Optional[str] = None) -> bool:
+        if self._simulate("run_tests"):
+            with self._lock:
+                self._local.error = self._rng.choice(SIMULATED_ERRORS)
+            return False
+        self._local.error = None
+        return True
+
+    def get_last_error(self) -> Optional[str]:
+        return getattr(self._local, "error", None)
+
+    def integrate_modules(self, modules: List[Any], cwd: Optional[str] = None) -> bool:
+        if self._simulate("integrate_modules"):
+            raise RuntimeError("Simulated integration failure")
+        return True
+
+    def run_e2e_tests(self, cwd: Optional[str] = None) -> Dict[str, Any]:
+        failed = self._simulate("run_e2e_tests")
+        return {"passed": not failed, "simulated": True}
+
+    def generate_report(self, modules: List[Any], pipeline_result: Dict[str, Any]) -> Dict[str, Any]:
+        self._simulate("generate_report")
+        return {"modules": len(modules), "simulated": True}
+
+    def push_github(self) -> None:
+        if self._simulate("push_github"):
+            raise RuntimeError("Simulated push failure")
+
+    def pipeline_stages(self) -> PipelineStages:
+        """Return these stand-ins as pipeline stages."""
+        return PipelineStages(
+            ai_generate_code=self.ai_generate_code,
+            ai_generate_code_batch=self.ai_generate_code_batch,
+            ai_fix_code=self.ai_fix_code,
+            run_tests=self.run_tests,
+            get_last_error=self.get_last_error,
+            integrate_modules=self.integrate_modules,
+            run_e2e_tests=self.run_e2e_tests,
+            generate_report=self.generate_report,
+            push_github=self.push_github
+        )
+
+class ResourceSampler:
+    """Samples thread count and resident memory of the process in the background."""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.peak_threads = 0
+        self.thread_samples: List[int] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="simulation-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            count = threading.active_count()
+            self.thread_samples.append(count)
+            self.peak_threads = max(self.peak_threads, count)
+
+    def __enter__(self) -> 'ResourceSampler':
+        self._start_usage = resource.getrusage(resource.RUSAGE_SELF)
+        self._started = time.monotonic()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.wall_time = time.monotonic() - self._started
+        self._end_usage = resource.getrusage(resource.RUSAGE_SELF)
+
+    def to_dict(self) -> Dict[str, Any]:
+        user = self._end_usage.ru_utime - self._start_usage.ru_utime
+        system = self._end_usage.ru_stime - self._start_usage.ru_stime
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        rss_divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return {
+            "cpu_user_seconds": user,
+            "cpu_system_seconds": system,
+            "cpu_utilization": (user + system) / self.wall_time if self.wall_time else 0.0,
+            "peak_rss_mb": self._end_usage.ru_maxrss / rss_divisor,
+            "peak_threads": self.peak_threads,
+            "mean_threads": sum(self.thread_samples) / len(self.thread_samples) if self.thread_samples else 0.0
+        }
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """Count, mean and percentiles of a sample."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def percentile(p: float) -> float:
+        return ordered[min(int(p * len(ordered)), len(ordered) - 1)]
+
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": percentile(0.5),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+        "max": ordered[-1]
+    }
+
+def simulation_config(root: str, run_index: int, time_scale: float, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Pipeline configuration for one synthetic run, keeping all state under ``root``."""
+    config = {
+        "output_dir": os.path.join(root, "runs", f"run-{run_index:05d}"),
+        "plan_cache_dir": os.path.join(root, "plan_cache"),
+        "timings_path": os.path.join(root, "timings.db"),
+        "fix_cache_path": os.path.join(root, "fix_cache.db"),
+        # Simulated test outcomes are random rather than a function of the
+        # code, so cached outcomes would replay failures across runs
+        "test_cache": False,
+        "test_cache_path": os.path.join(root, "test_cache.db"),
+        "output_state_path": os.path.join(root, "output_state.db"),
+        # Keep the model rate limit proportional to the compressed latencies
+        "ai_gateway": {"rate": 2.0 / time_scale if time_scale else 1000.0}
+    }
+    config.update(overrides or {})
+    # Features enabled by the overrides keep their stores under root as well
+    for key, path_key, name in (("workspaces", "root", "workspaces"),
+                                ("distributed", "queue_path", "work_queue.db"),
+                                ("e2e_sharding", "timings_path", "e2e_timings.db")):
+        if config.get(key):
+            options = dict(config[key]) if isinstance(config[key], dict) else {}
+            options.setdefault(path_key, os.path.join(root, name))
+            config[key] = options
+    return config
+
+def run_simulation(runs: int = 100,
+                   concurrency: int = 50,
+                   profile: Optional[Dict[str, Any]] = None,
+                   time_scale: float = 0.01,
+                   requirements: Optional[List[str]] = None,
+                   config: Optional[Dict[str, Any]] = None,
+                   root: Optional[str] = None,
+                   seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Drive many concurrent synthetic pipeline runs and measure the orchestration.
+
+    Args:
+        runs: Number of pipeline runs
+        concurrency: Runs in flight at once
+        profile: Stage latency and failure overrides, see DEFAULT_PROFILE
+        time_scale: Factor applied to every stage latency
+        requirements: Requirements cycled through by the runs
+        config: Pipeline configuration overrides for every run
+        root: Directory for run outputs and stores, a temporary one by default
+        seed: Seed for reproducible stage behaviour
+
+    Returns:
+        Report with throughput, run latency, queueing delay by resource class,
+        step and stage timings, stage call counts, cache and gateway stats and
+        process resource usage
+    """
+    root = root or tempfile.mkdtemp(prefix="pipeline-simulation-")
+    requirements = requirements or DEFAULT_REQUIREMENTS
+    simulated = SimulatedStages(profile, time_scale, seed)
+    stages = simulated.pipeline_stages()
+    plan_cache = get_plan_cache(simulation_config(root, 0, time_scale, config)["plan_cache_dir"])
+    plan_hits, plan_misses = plan_cache.hits, plan_cache.misses
+
+    # Held for the whole simulation: the registry only keeps gateways in use
+    gateway = get_ai_gateway(stages.ai_generate_code, stages.ai_fix_code,
+                             simulation_config(root, 0, time_scale, config).get("ai_gateway"),
+                             stages.ai_generate_code_batch)
+
+    lock = threading.Lock()
+    run_seconds: List[float] = []
+    queue_delays: Dict[str, List[float]] = {}
+    step_seconds: Dict[str, List[float]] = {}
+    stage_seconds: Dict[str, List[float]] = {}
+    outcomes = {"succeeded": 0, "failed": 0, "crashed": 0}
+
+    def run_one(index: int) -> None:
+        started = time.monotonic()
+        run_config = simulation_config(root, index, time_scale, config)
+        delays: Dict[str, List[float]] = {}
+        steps: Dict[str, List[float]] = {}
+        stage_times: Dict[str, List[float]] = {}
+        success = False
+        try:
+            for event in iter_pipeline_events(requirements[index % len(requirements)], config=run_config, stages=stages):
+                if isinstance(event, StepCompleted):
+                    delays.setdefault(event.resource_class, []).append(event.queue_delay)
+                    steps.setdefault(event.step, []).append(event.elapsed)
+                elif isinstance(event, StageFinished):
+                    stage_times.setdefault(event.stage, []).append(event.elapsed)
+                elif isinstance(event, PipelineFinished):
+                    success = bool(event.result.get("success"))
+            outcome = "succeeded" if success else "failed"
+        except Exception as e:
+            logger.error("Simulated run %s crashed: %s", index, e)
+            outcome = "crashed"
+        with lock:
+            run_seconds.append(time.monotonic() - started)
+            outcomes[outcome] += 1
+            for target, source in ((queue_delays, delays), (step_seconds, steps), (stage_seconds, stage_times)):
+                for key, values in source.items():
+                    target.setdefault(key, []).extend(values)
+
+    logger.info("Simulating %s pipeline runs, %s at a time, in %s", runs, concurrency, root)
+    with ResourceSampler() as sampler:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="simulated-run") as executor:
+            list(executor.map(run_one, range(runs)))
+
+    return {
+        "runs": runs,
+        "concurrency": concurrency,
+        "time_scale": time_scale,
+        "root": root,
+        "wall_time": sampler.wall_time,
+        "throughput_runs_per_second": runs / sampler.wall_time if sampler.wall_time else 0.0,
+        "outcomes": outcomes,
+        "run_seconds": summarize(run_seconds),
+        "queue_delay_seconds": {key: summarize(values) for key, values in sorted(queue_delays.items())},
+        "step_seconds": {key: summarize(values) for key, values in sorted(step_seconds.items())},
+        "stage_seconds": {key: summarize(values) for key, values in sorted(stage_seconds.items())},
+        "stage_calls": simulated.stats,
+        "gateway": dict(gateway.stats),
+        "plan_cache": {"hits": plan_cache.hits - plan_hits, "misses": plan_cache.misses - plan_misses},
+        "resources": sampler.to_dict()
+    }
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load-test the pipeline orchestration with simulated stages")
+    parser.add_argument("--runs", type=int, default=100, help="Number of pipeline runs")
+    parser.add_argument("--concurrency", type=int, default=50, help="Runs in flight at once")
+    parser.add_argument("--time-scale", type=float, default=0.01, help="Factor applied to stage latencies")
+    parser.add_argument("--profile", help="JSON file with stage latency and failure overrides")
+    parser.add_argument("--config", help="JSON file with pipeline configuration overrides")
+    parser.add_argument("--root", help="Directory for run outputs and stores")
+    parser.add_argument("--seed", type=int, help="Random seed")
+    parser.add_argument("--output", help="Write the report to this file instead of stdout")
+    parser.add_argument("--log-level", default="WARNING", help="Pipeline log level during the simulation")
+    args = parser.parse_args(argv)
+
+    configure_logging(level=args.log_level, logger_name=__name__.split(".")[0])
+
+    def load_json(path: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not path:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    report = run_simulation(
+        runs=args.runs,
+        concurrency=args.concurrency,
+        profile=load_json(args.profile),
+        time_scale=args.time_scale,
+        config=load_json(args.config),
+        root=args.root,
+        seed=args.seed
+    )
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
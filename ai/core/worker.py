@@ -0,0 +1,234 @@
+"""
+Pipeline Worker Module
+
+This module runs queue workers for the pipeline's distributed mode. A
+worker claims generate, test and fix tasks from the shared SQLite work
+queue, runs them with the same gateway and stage functions as a local run,
+and writes the results back. A heartbeat thread keeps the task's lease
+alive while it runs; if the worker dies the lease expires and another
+worker picks the task up. Several worker processes can be started on one
+host for local testing.
+
+Test tasks name a snapshot of the tree to test on the shared volume the
+orchestrator writes to, mounted at the same path on every worker, and its
+Merkle hash; the worker refuses snapshots that do not match it. With an
+``ai_gateway`` rate, every worker on the queue draws from one shared bucket.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import threading
+import time
+from typing import Dict, List, Any, Optional, Callable
+
+from .modules.merkle_tree import build_merkle_tree
+from .pipeline import Module, PipelineStages, run_module_tests, stages_in
+from .utils.ai_gateway import get_ai_gateway
+from .utils.logger import configure_logging
+from .utils.work_queue import (DEFAULT_LEASE_SECONDS, DEFAULT_POLL_INTERVAL, DEFAULT_QUEUE_PATH,
+                               LeaseLost, SharedTokenBucket, Task, WorkQueue, default_worker_id)
+
+logger = logging.getLogger(__name__)
+
+TASK_KINDS = ("generate", "test", "fix")
+
+# Bucket in the queue file limiting model calls across all workers
+GATEWAY_BUCKET = "ai_gateway"
+
+class QueueWorker:
+    """Claims and runs module tasks from a work queue."""
+
+    def __init__(self, work_queue: WorkQueue,
+                 stages: Optional[PipelineStages] = None,
+                 config: Optional[Dict[str, Any]] = None,
+                 worker_id: Optional[str] = None,
+                 kinds: Optional[List[str]] = None,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL):
+        """
+        Args:
+            work_queue: Queue to claim tasks from
+            stages: Stage functions, defaulting to the real ones
+            config: Pipeline configuration; ``ai_gateway`` settings apply,
+                with ``rate`` and ``burst`` shared by all workers on the queue
+            worker_id: Worker identity, generated when omitted
+            kinds: Task types to claim, all by default
+            lease_seconds: Lease length, renewed every third of it
+            poll_interval: Sleep between claims when the queue is empty
+        """
+        self.queue = work_queue
+        self.stages = stages or PipelineStages()
+        self.config = config or {}
+        self.worker_id = worker_id or default_worker_id()
+        self.kinds = list(kinds or TASK_KINDS)
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        gateway_config = self.config.get("ai_gateway") or {}
+        bucket = None
+        if gateway_config.get("rate"):
+            bucket = SharedTokenBucket(work_queue, GATEWAY_BUCKET, gateway_config["rate"], gateway_config.get("burst"))
+        self.gateway = get_ai_gateway(self.stages.ai_generate_code, self.stages.ai_fix_code,
+                                      gateway_config, self.stages.ai_generate_code_batch, bucket)
+        self.handlers: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "generate": self._generate,
+            "test": self._test,
+            "fix": self._fix
+        }
+        self.completed = 0
+        self.failed = 0
+
+    @staticmethod
+    def _module(payload: Dict[str, Any]) -> Module:
+        module = Module.from_dict(payload["module"])
+        module.dependency_context = payload.get("dependency_context", "")
+        return module
+
+    def _generate(self, payload: Dict[str, Any]) -> str:
+        return self.gateway.generate(self._module(payload))
+
+    def _fix(self, payload: Dict[str, Any]) -> str:
+        return self.gateway.fix(self._module(payload), payload["error"])
+
+    def _test(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        stages = self.stages
+        tree = payload.get("tree")
+        if tree is not None:
+            found = build_merkle_tree(tree["path"]).root_hash
+            if found != tree["hash"]:
+                raise ValueError(f"Snapshot {tree['path']} hashes to {found}, not {tree['hash']}")
+            stages = stages_in(self.stages, tree["path"])
+        passed, error = run_module_tests(payload["tests"], stages)
+        return {"passed": passed, "error": error}
+
+    def _heartbeat(self, task: Task, done: threading.Event, lost: threading.Event) -> None:
+        while not done.wait(self.lease_seconds / 3):
+            try:
+                if not self.queue.heartbeat(task.id, self.worker_id, self.lease_seconds):
+                    lost.set()
+                    return
+            except Exception as e:
+                # A missed heartbeat is retried; the lease outlasts a couple of them
+                logger.warning("Heartbeat for task %s failed: %s", task.id, e)
+
+    def run_task(self, task: Task) -> bool:
+        """Run one claimed task and record its outcome; False if it failed."""
+        logger.info("Worker %s running %s task %s (attempt %s)", self.worker_id, task.kind, task.id, task.attempts)
+        done, lost = threading.Event(), threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(task, done, lost), daemon=True)
+        heartbeat.start()
+        try:
+            handler = self.handlers.get(task.kind)
+            if handler is None:
+                raise ValueError(f"Unknown task kind: {task.kind}")
+            result = handler(task.payload)
+            if lost.is_set():
+                raise LeaseLost(f"Lease on task {task.id} was lost")
+            succeeded = self.queue.complete(task.id, self.worker_id, result)
+        except LeaseLost as e:
+            logger.warning("%s", e)
+            succeeded = False
+        except Exception as e:
+            logger.error("Task %s failed: %s", task.id, e)
+            self.queue.fail(task.id, self.worker_id, f"{type(e).__name__}: {e}")
+            succeeded = False
+        finally:
+            done.set()
+            heartbeat.join()
+        if succeeded:
+            self.completed += 1
+        else:
+            self.failed += 1
+        return succeeded
+
+    def run(self, stop: Optional[threading.Event] = None, max_tasks: Optional[int] = None,
+            idle_timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Claim and run tasks until stopped.
+
+        Args:
+            stop: Event that ends the loop once set
+            max_tasks: Stop after this many tasks
+            idle_timeout: Stop after the queue has been empty this long
+
+        Returns:
+            Counts of completed and failed tasks
+        """
+        stop = stop or threading.Event()
+        idle_since = time.monotonic()
+        logger.info("Worker %s polling %s for %s", self.worker_id, self.queue.filepath, ', '.join(self.kinds))
+        while not stop.is_set():
+            if max_tasks is not None and self.completed + self.failed >= max_tasks:
+                break
+            try:
+                task = self.queue.claim(self.worker_id, self.kinds, self.lease_seconds)
+            except Exception as e:
+                logger.warning("Claiming a task failed: %s", e)
+                task = None
+            if task is None:
+                if idle_timeout is not None and time.monotonic() - idle_since >= idle_timeout:
+                    break
+                stop.wait(self.poll_interval)
+                continue
+            self.run_task(task)
+            idle_since = time.monotonic()
+        return {"worker": self.worker_id, "completed": self.completed, "failed": self.failed}
+
+def run_worker(queue_path: str = DEFAULT_QUEUE_PATH,
+               config: Optional[Dict[str, Any]] = None,
+               kinds: Optional[List[str]] = None,
+               lease_seconds: float = DEFAULT_LEASE_SECONDS,
+               poll_interval: float = DEFAULT_POLL_INTERVAL,
+               max_tasks: Optional[int] = None,
+               idle_timeout: Optional[float] = None,
+               log_level: Optional[str] = None) -> Dict[str, Any]:
+    """Run one worker in the current process; the target of worker processes."""
+    configure_logging(level=log_level)
+    worker = QueueWorker(WorkQueue(queue_path), config=config, kinds=kinds,
+                         lease_seconds=lease_seconds, poll_interval=poll_interval)
+    return worker.run(max_tasks=max_tasks, idle_timeout=idle_timeout)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run pipeline workers on a shared work queue")
+    parser.add_argument("--queue", default=DEFAULT_QUEUE_PATH, help="SQLite work queue file on the shared volume")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes to start on this host")
+    parser.add_argument("--kinds", help="Comma-separated task kinds to claim (generate,test,fix)")
+    parser.add_argument("--config", help="JSON pipeline configuration, e.g. for ai_gateway settings")
+    parser.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS, help="Lease length in seconds")
+    parser.add_argument("--poll", type=float, default=DEFAULT_POLL_INTERVAL, help="Seconds between claims when idle")
+    parser.add_argument("--max-tasks", type=int, help="Exit after this many tasks per process")
+    parser.add_argument("--idle-timeout", type=float, help="Exit after the queue has been empty this long")
+    parser.add_argument("--log-level", help="Log level")
+    args = parser.parse_args(argv)
+
+    config = None
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    options = dict(
+        queue_path=args.queue,
+        config=config,
+        kinds=args.kinds.split(",") if args.kinds else None,
+        lease_seconds=args.lease,
+        poll_interval=args.poll,
+        max_tasks=args.max_tasks,
+        idle_timeout=args.idle_timeout,
+        log_level=args.log_level
+    )
+    if args.processes <= 1:
+        run_worker(**options)
+        return
+    processes = [multiprocessing.Process(target=run_worker, kwargs=options, name=f"worker-{i}")
+                 for i in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+if __name__ == "__main__":
+    main()
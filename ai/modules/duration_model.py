@@ -0,0 +1,360 @@
+"""
+Duration Model Module
+
+This module records how long the pipeline really spends generating, testing
+and fixing each kind of module. It predicts numeric durations with
+confidence intervals from that history, falling back to the planner's
+hand-written ``estimated_time`` strings when there is no history yet.
+"""
+
+import logging
+import math
+import os
+import re
+import sqlite3
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMINGS_PATH = "ai/data/timings.db"
+
+# A shared model reloads its history after this long, or once this many new
+# timings have been recorded, so long-lived processes keep learning
+DEFAULT_REFRESH_SECONDS = 300
+DEFAULT_REFRESH_SAMPLES = 20
+
+# Stages the pipeline records timings for
+STAGES = ("generate", "test", "fix")
+
+# Hours for the planner's estimated_time strings
+TIME_ESTIMATES_HOURS = {
+    "30 minutes": 0.5,
+    "1 hour": 1,
+    "1-2 hours": 1.5,
+    "2-3 hours": 2.5,
+    "3-4 hours": 3.5,
+    "4-6 hours": 5,
+    "6-8 hours": 7,
+    "1-2 days": 12,
+    "2-3 days": 24,
+    "3-5 days": 40
+}
+
+DEFAULT_ESTIMATE_HOURS = 1.5
+
+_UNIT_HOURS = {"minute": 1 / 60, "hour": 1, "day": 8, "week": 40}
+_ESTIMATE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)(?:\s*-\s*(\d+(?:\.\d+)?))?\s*(minute|hour|day|week)s?\s*$")
+
+def parse_estimated_time(estimated_time: str) -> Tuple[float, float, float]:
+    """
+    Parse an ``estimated_time`` string such as "2-3 hours".
+
+    Returns:
+        Tuple of (expected, low, high) hours
+    """
+    match = _ESTIMATE_PATTERN.match(estimated_time.lower()) if estimated_time else None
+    if match:
+        unit = _UNIT_HOURS[match.group(3)]
+        low = float(match.group(1)) * unit
+        high = float(match.group(2)) * unit if match.group(2) else low
+        expected = TIME_ESTIMATES_HOURS.get(estimated_time, (low + high) / 2)
+        return expected, low, high
+
+    logger.warning("Unrecognized estimated_time '%s', assuming %s hours", estimated_time, DEFAULT_ESTIMATE_HOURS)
+    return DEFAULT_ESTIMATE_HOURS, DEFAULT_ESTIMATE_HOURS, DEFAULT_ESTIMATE_HOURS
+
+def technology_key(technologies: Iterable[str]) -> str:
+    """Canonical key for a module's technology stack."""
+    return ",".join(sorted({t.lower() for t in technologies}))
+
+class DurationEstimate:
+    """Predicted duration of a module or stage, in seconds."""
+
+    def __init__(self, mean: float, low: float, high: float, samples: int, source: str):
+        self.mean = mean
+        self.low = low
+        self.high = high
+        self.samples = samples
+        self.source = source
+
+    @property
+    def hours(self) -> float:
+        return self.mean / 3600
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert estimate to dictionary."""
+        return {
+            "mean": self.mean,
+            "low": self.low,
+            "high": self.high,
+            "samples": self.samples,
+            "source": self.source
+        }
+
+class _Stats:
+    """Running count, sum and sum of squares of duration samples."""
+
+    def __init__(self, count: int = 0, total: float = 0.0, squares: float = 0.0):
+        self.count = count
+        self.total = total
+        self.squares = squares
+
+    def add(self, other: '_Stats') -> None:
+        self.count += other.count
+        self.total += other.total
+        self.squares += other.squares
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def variance(self) -> float:
+        if self.count < 2:
+            return 0.0
+        return max(self.squares - self.count * self.mean ** 2, 0.0) / (self.count - 1)
+
+class TimingStore:
+    """SQLite store of historical stage timings."""
+
+    def __init__(self, filepath: str = DEFAULT_TIMINGS_PATH):
+        self.filepath = filepath
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS timings (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    module_type TEXT NOT NULL,
+                    technology_key TEXT NOT NULL,
+                    module_name TEXT,
+                    stage TEXT NOT NULL,
+                    seconds REAL NOT NULL,
+                    succeeded INTEGER NOT NULL,
+                    recorded_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_timings_kind ON timings (module_type, technology_key, stage)")
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.filepath, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record(self,
+               module_type: str,
+               technologies: Iterable[str],
+               stage: str,
+               seconds: float,
+               module_name: Optional[str] = None,
+               succeeded: bool = True) -> None:
+        """Record how long one stage took for one module."""
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    "INSERT INTO timings (module_type, technology_key, module_name, stage, seconds, succeeded, recorded_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (module_type, technology_key(technologies), module_name, stage, seconds, int(succeeded), time.time())
+                )
+        except sqlite3.Error as e:
+            logger.warning("Failed to record %s timing for %s: %s", stage, module_name, e)
+
+    def last_id(self) -> int:
+        """Id of the newest timing, 0 when there are none."""
+        with self._connection() as conn:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM timings").fetchone()[0]
+
+    def aggregates(self) -> List[Tuple[str, str, str, int, float, float]]:
+        """Return (module_type, technology_key, stage, count, sum, sum of squares) rows."""
+        with self._connection() as conn:
+            return conn.execute(
+                "SELECT module_type, technology_key, stage, COUNT(*), SUM(seconds), SUM(seconds * seconds) "
+                "FROM timings GROUP BY module_type, technology_key, stage"
+            ).fetchall()
+
+class DurationModel:
+    """Predicts module durations from recorded timings."""
+
+    def __init__(self, store: TimingStore,
+                 min_samples: int = 3,
+                 z: float = 1.96,
+                 refresh_seconds: float = DEFAULT_REFRESH_SECONDS,
+                 refresh_samples: int = DEFAULT_REFRESH_SAMPLES):
+        self.store = store
+        self.min_samples = min_samples
+        self.z = z
+        self.refresh_seconds = refresh_seconds
+        self.refresh_samples = refresh_samples
+        self._by_kind: Dict[Tuple[str, str, str], _Stats] = {}
+        self._by_type: Dict[Tuple[str, str], _Stats] = {}
+        self._loaded_at = 0.0
+        self._loaded_id = 0
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Reload the aggregated history from the store."""
+        by_kind: Dict[Tuple[str, str, str], _Stats] = {}
+        by_type: Dict[Tuple[str, str], _Stats] = {}
+        loaded_at = time.monotonic()
+        try:
+            # Read the newest id first so timings recorded meanwhile count as new
+            last_id = self.store.last_id()
+            rows = self.store.aggregates()
+        except sqlite3.Error as e:
+            logger.warning("Failed to load timing history: %s", e)
+            last_id, rows = self._loaded_id, []
+        for module_type, tech_key, stage, count, total, squares in rows:
+            stats = _Stats(count, total or 0.0, squares or 0.0)
+            by_kind[(module_type, tech_key, stage)] = stats
+            by_type.setdefault((module_type, stage), _Stats()).add(stats)
+        with self._lock:
+            self._by_kind = by_kind
+            self._by_type = by_type
+            self._loaded_at = loaded_at
+            self._loaded_id = last_id
+
+    def refresh_if_stale(self) -> bool:
+        """
+        Reload the history if it is older than ``refresh_seconds`` or at
+        least ``refresh_samples`` timings were recorded since the last load.
+
+        Returns:
+            Whether the history was reloaded
+        """
+        with self._lock:
+            loaded_at, loaded_id = self._loaded_at, self._loaded_id
+        stale = time.monotonic() - loaded_at >= self.refresh_seconds
+        if not stale:
+            try:
+                stale = self.store.last_id() - loaded_id >= self.refresh_samples
+            except sqlite3.Error as e:
+                logger.warning("Failed to check timing history: %s", e)
+        if stale:
+            self.refresh()
+        return stale
+
+    def _stats_at(self, level: str, module_type: str, tech_key: str, stage: str) -> Optional[_Stats]:
+        """Stats of a stage at one fallback level, whatever their sample count."""
+        with self._lock:
+            if level == "history":
+                return self._by_kind.get((module_type, tech_key, stage))
+            return self._by_type.get((module_type, stage))
+
+    def _stage_stats(self, module_type: str, tech_key: str, stage: str) -> Tuple[Optional[_Stats], str]:
+        with self._lock:
+            stats = self._by_kind.get((module_type, tech_key, stage))
+            if stats and stats.count >= self.min_samples:
+                return stats, "history"
+            stats = self._by_type.get((module_type, stage))
+            if stats and stats.count >= self.min_samples:
+                return stats, "history-type"
+        return None, "static"
+
+    def predict_stage(self, module_type: str, technologies: Iterable[str], stage: str) -> Optional[DurationEstimate]:
+        """Predict one stage's duration, or None without enough history."""
+        stats, source = self._stage_stats(module_type, technology_key(technologies), stage)
+        if stats is None:
+            return None
+        spread = self.z * math.sqrt(stats.variance * (1 + 1 / stats.count))
+        return DurationEstimate(stats.mean, max(stats.mean - spread, 0.0), stats.mean + spread, stats.count, source)
+
+    def predict(self,
+                module_type: str,
+                technologies: Iterable[str],
+                estimated_time: Optional[str] = None) -> DurationEstimate:
+        """
+        Predict the total generate + test + fix duration of a module.
+
+        The fix stage is weighted by how often it was needed historically.
+        Without enough history the planner's ``estimated_time`` is used.
+
+        Args:
+            module_type: Planner module type (frontend, backend, ...)
+            technologies: The module's technologies
+            estimated_time: Hand-written estimate used as fallback
+
+        Returns:
+            DurationEstimate in seconds
+        """
+        tech_key = technology_key(technologies)
+        generate, source = self._stage_stats(module_type, tech_key, "generate")
+        test, _ = self._stage_stats(module_type, tech_key, "test")
+
+        if generate is None or test is None:
+            expected, low, high = parse_estimated_time(estimated_time or "")
+            return DurationEstimate(expected * 3600, low * 3600, high * 3600, 0, "static")
+
+        mean = generate.mean + test.mean
+        variance = generate.variance + test.variance
+        samples = min(generate.count, test.count)
+
+        fix, fix_source = self._stage_stats(module_type, tech_key, "fix")
+        if fix is not None:
+            # Both counts must come from the same level, or the rate compares
+            # fixes of all modules of a type with generations of one stack
+            generated = self._stats_at(fix_source, module_type, tech_key, "generate")
+            rate = min(fix.count / generated.count, 1.0) if generated and generated.count else 1.0
+            # Fix runs with probability `rate`, each fix also re-runs the tests
+            fix_cost = fix.mean + test.mean
+            mean += rate * fix_cost
+            variance += rate * (fix.variance + test.variance) + rate * (1 - rate) * fix_cost ** 2
+
+        spread = self.z * math.sqrt(variance * (1 + 1 / samples))
+        return DurationEstimate(mean, max(mean - spread, 0.0), mean + spread, samples, source)
+
+    def predict_module(self, module: Any) -> DurationEstimate:
+        """Predict the duration of a planner module."""
+        return self.predict(module.type, module.technologies, module.estimated_time)
+
+    def predict_modules(self, modules: Iterable[Any]) -> Dict[str, DurationEstimate]:
+        """
+        Predict the durations of a plan's modules on one scale.
+
+        Hand-written estimates count developer hours, while history counts
+        pipeline seconds. When some modules have history, the static
+        estimates of the others are scaled by the median ratio of predicted
+        to hand-written duration among those modules, so that critical-path
+        sums do not mix the two scales.
+
+        Returns:
+            DurationEstimate by module name; scaled ones have source "static-scaled"
+        """
+        modules = list(modules)
+        estimates = {m.name: self.predict_module(m) for m in modules}
+        ratios = [
+            estimates[m.name].mean / (parse_estimated_time(m.estimated_time)[0] * 3600)
+            for m in modules if estimates[m.name].source != "static"
+        ]
+        if not ratios:
+            return estimates
+        ratio = statistics.median(ratios)
+        for name, estimate in estimates.items():
+            if estimate.source == "static":
+                estimates[name] = DurationEstimate(
+                    estimate.mean * ratio, estimate.low * ratio, estimate.high * ratio, 0, "static-scaled"
+                )
+        return estimates
+
+_duration_models: Dict[str, DurationModel] = {}
+_duration_models_lock = threading.Lock()
+
+def get_duration_model(filepath: str = DEFAULT_TIMINGS_PATH) -> DurationModel:
+    """Return the shared duration model for a timing store, reloaded when stale."""
+    with _duration_models_lock:
+        model = _duration_models.get(filepath)
+        if model is None:
+            model = _duration_models[filepath] = DurationModel(TimingStore(filepath))
+            return model
+    model.refresh_if_stale()
+    return model
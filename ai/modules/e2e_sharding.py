@@ -0,0 +1,328 @@
+"""
+E2E Sharding Module
+
+This module splits the end-to-end suite across several worker processes.
+Spec files are discovered under the E2E test directories and balanced into
+shards by their recorded durations, longest first. Each shard runs as its
+own Jest process, and the per-shard reports are merged into one structured
+result for the pipeline report. When only part of the output tree changed
+since the suite last passed, the changed files can be mapped to the specs
+covering them, so only those specs run.
+"""
+
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Iterator
+
+from .file_ownership import glob_to_regex
+from ..utils.scheduler import CancelToken, current_cancel_token
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_E2E_TIMINGS_PATH = "ai/data/e2e_timings.db"
+DEFAULT_SPEC_DIRS = ("tests/e2e",)
+DEFAULT_COMMAND = ("npx", "jest", "--ci", "--watchAll=false")
+SPEC_SUFFIXES = (".test.ts", ".test.tsx", ".test.js", ".test.jsx", ".spec.ts", ".spec.tsx", ".spec.js", ".spec.jsx")
+
+# Assumed duration of a spec with no history, when no other spec has any either
+DEFAULT_SPEC_SECONDS = 10.0
+
+# Weight of the newest sample in a spec's moving average duration
+DURATION_SMOOTHING = 0.3
+
+def discover_e2e_specs(root: str = ".", spec_dirs: Optional[List[str]] = None) -> List[str]:
+    """Return the E2E spec files under ``root``, relative to it and sorted."""
+    specs = []
+    for spec_dir in spec_dirs or DEFAULT_SPEC_DIRS:
+        for directory, subdirectories, filenames in os.walk(os.path.join(root, spec_dir)):
+            subdirectories[:] = [d for d in subdirectories if d not in ("node_modules", "__mocks__")]
+            for filename in filenames:
+                if filename.endswith(SPEC_SUFFIXES):
+                    specs.append(os.path.relpath(os.path.join(directory, filename), root).replace(os.sep, "/"))
+    return sorted(set(specs))
+
+def affected_e2e_specs(changed_files: List[str],
+                       specs: List[str],
+                       spec_map: Optional[Dict[str, List[str]]] = None) -> Optional[List[str]]:
+    """
+    Select the specs that must run again after some output files changed.
+
+    A changed spec file selects itself; any other changed file selects the
+    specs its ``spec_map`` entries point to.
+
+    Args:
+        changed_files: Files changed since the suite last passed, relative to the root
+        specs: Every spec of the suite
+        spec_map: Glob of output files -> globs of the specs covering them
+
+    Returns:
+        The affected specs, sorted; None when a changed file is covered by
+        no entry of the map, so the whole suite must run
+    """
+    rules = [
+        (glob_to_regex(source), [glob_to_regex(target) for target in targets])
+        for source, targets in (spec_map or {}).items()
+    ]
+    known_specs = set(specs)
+    affected = set()
+    for path in changed_files:
+        if path in known_specs:
+            affected.add(path)
+            continue
+        covering = [targets for source, targets in rules if source.match(path)]
+        if not covering:
+            logger.info("No E2E specs are mapped to %s, running the whole suite", path)
+            return None
+        for targets in covering:
+            affected.update(spec for spec in specs if any(target.match(spec) for target in targets))
+    return sorted(affected)
+
+class SpecDurationStore:
+    """SQLite store of the moving average duration of each E2E spec."""
+
+    def __init__(self, filepath: str = DEFAULT_E2E_TIMINGS_PATH):
+        self.filepath = filepath
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS spec_durations (
+                    spec TEXT PRIMARY KEY,
+                    seconds REAL NOT NULL,
+                    samples INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.filepath, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def durations(self) -> Dict[str, float]:
+        """Return the recorded duration of every spec, in seconds."""
+        try:
+            with self._connection() as conn:
+                return dict(conn.execute("SELECT spec, seconds FROM spec_durations").fetchall())
+        except sqlite3.Error as e:
+            logger.warning("Failed to load E2E spec durations: %s", e)
+            return {}
+
+    def record(self, durations: Dict[str, float]) -> None:
+        """Fold new spec durations into the moving averages."""
+        now = time.time()
+        try:
+            with self._connection() as conn:
+                conn.executemany(
+                    "INSERT INTO spec_durations (spec, seconds, samples, updated_at) VALUES (?, ?, 1, ?) "
+                    "ON CONFLICT (spec) DO UPDATE SET "
+                    f"seconds = seconds * {1 - DURATION_SMOOTHING} + excluded.seconds * {DURATION_SMOOTHING}, "
+                    "samples = samples + 1, updated_at = excluded.updated_at",
+                    [(spec, seconds, now) for spec, seconds in durations.items()]
+                )
+        except sqlite3.Error as e:
+            logger.warning("Failed to record E2E spec durations: %s", e)
+
+def balance_shards(specs: List[str], durations: Dict[str, float], shard_count: int) -> List[List[str]]:
+    """
+    Split specs into shards of similar total duration.
+
+    Specs are placed longest first onto the least loaded shard. Specs without
+    history are assumed to take the median recorded duration.
+
+    Returns:
+        Non-empty shards, at most ``shard_count`` of them
+    """
+    known = sorted(durations[s] for s in specs if s in durations)
+    fallback = known[len(known) // 2] if known else DEFAULT_SPEC_SECONDS
+    weighted = sorted(((durations.get(s, fallback), s) for s in specs), key=lambda item: (-item[0], item[1]))
+
+    shards: List[List[str]] = [[] for _ in range(max(min(shard_count, len(specs)), 1))]
+    loads = [(0.0, i) for i in range(len(shards))]
+    for seconds, spec in weighted:
+        load, index = heapq.heappop(loads)
+        shards[index].append(spec)
+        heapq.heappush(loads, (load + seconds, index))
+    return [shard for shard in shards if shard]
+
+def _read_jest_report(path: str, root: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    specs = []
+    for result in report.get("testResults", []):
+        name = result.get("name", "")
+        spec = os.path.relpath(name, root).replace(os.sep, "/") if os.path.isabs(name) else name
+        failures = [
+            {"test": a.get("fullName"), "messages": a.get("failureMessages", [])}
+            for a in result.get("assertionResults", []) if a.get("status") == "failed"
+        ]
+        start, end = result.get("startTime"), result.get("endTime")
+        specs.append({
+            "spec": spec,
+            "status": result.get("status", "failed"),
+            "duration": (end - start) / 1000 if start and end else None,
+            "tests": len(result.get("assertionResults", [])),
+            "failures": failures,
+            "message": result.get("message") or None
+        })
+    return {
+        "passed": bool(report.get("success")),
+        "tests": {
+            "total": report.get("numTotalTests", 0),
+            "passed": report.get("numPassedTests", 0),
+            "failed": report.get("numFailedTests", 0),
+            "pending": report.get("numPendingTests", 0)
+        },
+        "specs": specs
+    }
+
+def run_shard(index: int,
+              specs: List[str],
+              command: List[str],
+              root: str,
+              timeout: Optional[float] = None,
+              token: Optional[CancelToken] = None) -> Dict[str, Any]:
+    """
+    Run one shard of specs as a Jest process.
+
+    Returns:
+        Shard report with ``passed``, ``tests``, ``specs``, ``elapsed`` and,
+        when Jest produced no report, ``error``
+    """
+    fd, report_path = tempfile.mkstemp(prefix=f"e2e-shard-{index}-", suffix=".json")
+    os.close(fd)
+    args = list(command) + ["--json", f"--outputFile={report_path}", "--runTestsByPath"] + specs
+    env = dict(os.environ, E2E_SHARD_INDEX=str(index))
+    started = time.monotonic()
+    error = None
+    try:
+        process = subprocess.Popen(args, cwd=root, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        output_chunks: List[str] = []
+        reader = threading.Thread(target=lambda: output_chunks.append(process.stdout.read()), daemon=True)
+        reader.start()
+        while process.poll() is None:
+            if token is not None and token.cancelled:
+                error = "cancelled"
+            elif timeout is not None and time.monotonic() - started > timeout:
+                error = f"timed out after {timeout}s"
+            if error:
+                process.kill()
+                break
+            time.sleep(0.2)
+        process.wait()
+        reader.join(5)
+        output = "".join(output_chunks)
+
+        report = _read_jest_report(report_path, root)
+        if report is None:
+            report = {"passed": False, "tests": {}, "specs": []}
+            error = error or f"jest exited with {process.returncode} without a report: {output[-2000:]}"
+    except OSError as e:
+        report = {"passed": False, "tests": {}, "specs": []}
+        error = f"could not start {args[0]}: {e}"
+    finally:
+        try:
+            os.remove(report_path)
+        except OSError:
+            pass
+
+    report.update({"shard": index, "spec_files": specs, "elapsed": time.monotonic() - started})
+    if error:
+        report["passed"] = False
+        report["error"] = error
+        logger.error("E2E shard %s failed: %s", index, error)
+    return report
+
+def merge_shard_reports(reports: List[Dict[str, Any]], wall_time: float) -> Dict[str, Any]:
+    """Merge shard reports into one E2E result."""
+    tests = {"total": 0, "passed": 0, "failed": 0, "pending": 0}
+    specs = []
+    for report in reports:
+        for key in tests:
+            tests[key] += report.get("tests", {}).get(key, 0)
+        specs.extend(report.get("specs", []))
+    return {
+        "passed": bool(reports) and all(r["passed"] for r in reports),
+        "tests": tests,
+        "specs": sorted(specs, key=lambda s: s["spec"]),
+        "failures": [s for s in specs if s["status"] != "passed"],
+        "shards": [
+            {key: r.get(key) for key in ("shard", "passed", "elapsed", "spec_files", "error")}
+            for r in sorted(reports, key=lambda r: r["shard"])
+        ],
+        "wall_time": wall_time,
+        "serial_time": sum(r["elapsed"] for r in reports)
+    }
+
+def run_sharded_e2e(root: str = ".",
+                    shards: Optional[int] = None,
+                    command: Optional[List[str]] = None,
+                    spec_dirs: Optional[List[str]] = None,
+                    specs: Optional[List[str]] = None,
+                    timings_path: str = DEFAULT_E2E_TIMINGS_PATH,
+                    shard_timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Run the E2E suite split across parallel Jest processes.
+
+    Args:
+        root: Project root Jest runs in
+        shards: Number of worker processes, defaults to the CPU count
+        command: Jest command line without spec arguments
+        spec_dirs: Directories searched for specs, relative to ``root``
+        specs: Explicit spec list instead of discovery
+        timings_path: Store of per-spec durations used for balancing
+        shard_timeout: Seconds each shard may run
+
+    Returns:
+        Merged report with ``passed``, ``tests``, ``specs``, ``failures``,
+        ``shards``, ``wall_time`` and ``serial_time``; without any specs it
+        is not passed and has ``skipped`` set
+    """
+    specs = specs if specs is not None else discover_e2e_specs(root, spec_dirs)
+    if not specs:
+        # Nothing ran, so this is not a pass that later runs could rely on
+        logger.warning("No E2E specs found under %s", root)
+        merged = merge_shard_reports([], 0.0)
+        merged.update(skipped=True, error="no E2E specs found")
+        return merged
+
+    store = SpecDurationStore(timings_path)
+    plan = balance_shards(specs, store.durations(), shards or os.cpu_count() or 2)
+    logger.info("Running %s E2E specs in %s shards", len(specs), len(plan))
+
+    # The caller's cancellation token, e.g. from the pipeline's E2E stage timeout
+    token = current_cancel_token()
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=len(plan), thread_name_prefix="e2e-shard") as executor:
+        futures = [
+            executor.submit(run_shard, i, shard, list(command or DEFAULT_COMMAND), root, shard_timeout, token)
+            for i, shard in enumerate(plan)
+        ]
+        reports = [future.result() for future in futures]
+    merged = merge_shard_reports(reports, time.monotonic() - started)
+
+    store.record({s["spec"]: s["duration"] for s in merged["specs"] if s.get("duration") is not None})
+    logger.info(
+        "E2E finished: %s/%s tests passed in %.1fs (%.1fs across shards)",
+        merged["tests"]["passed"], merged["tests"]["total"], merged["wall_time"], merged["serial_time"]
+    )
+    return merged
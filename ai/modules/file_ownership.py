@@ -0,0 +1,287 @@
+"""
+File Ownership Module
+
+This module works out which planned modules may write the same files. It
+intersects the glob patterns in each module's ``files`` and ``tests`` and
+checks them against a cached index of the output tree. The resulting
+conflict map lets modules run concurrently unless their write sets overlap.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Set, Tuple, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Directories never worth indexing for ownership purposes
+IGNORED_DIRECTORIES = {".git", "node_modules", "__pycache__", ".next", ".venv"}
+
+def _translate_segment(segment: str) -> str:
+    parts = []
+    for char in segment:
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        else:
+            parts.append(re.escape(char))
+    return "".join(parts)
+
+@lru_cache(maxsize=4096)
+def glob_to_regex(pattern: str) -> "re.Pattern":
+    """
+    Compile a write-set glob into a regular expression.
+
+    ``*`` and ``?`` stay within a path segment and ``**`` spans segments.
+    Brackets are literal, as in Next.js route files like ``[...nextauth].ts``.
+    """
+    parts = []
+    segments = pattern.strip("/").split("/")
+    for i, segment in enumerate(segments):
+        last = i == len(segments) - 1
+        if segment == "**":
+            parts.append(".*" if last else "(?:[^/]+/)*")
+        else:
+            parts.append(_translate_segment(segment) + ("" if last else "/"))
+    return re.compile("".join(parts) + r"\Z")
+
+def _segment_tokens(segment: str) -> Tuple[str, ...]:
+    tokens: List[str] = []
+    for char in segment:
+        if char == "*" and tokens and tokens[-1] == "*":
+            continue
+        tokens.append(char)
+    return tuple(tokens)
+
+def _chars_compatible(a: str, b: str) -> bool:
+    return a == b or a == "?" or b == "?"
+
+@lru_cache(maxsize=65536)
+def segments_overlap(a: str, b: str) -> bool:
+    """Whether some single path segment matches both segment globs."""
+    ta, tb = _segment_tokens(a), _segment_tokens(b)
+    memo: Dict[Tuple[int, int], bool] = {}
+
+    def overlap(i: int, j: int) -> bool:
+        key = (i, j)
+        if key in memo:
+            return memo[key]
+        if i == len(ta) and j == len(tb):
+            result = True
+        elif i < len(ta) and ta[i] == "*":
+            result = overlap(i + 1, j) or (j < len(tb) and overlap(i, j + 1))
+        elif j < len(tb) and tb[j] == "*":
+            result = overlap(i, j + 1) or (i < len(ta) and overlap(i + 1, j))
+        elif i < len(ta) and j < len(tb):
+            result = _chars_compatible(ta[i], tb[j]) and overlap(i + 1, j + 1)
+        else:
+            result = False
+        memo[key] = result
+        return result
+
+    return overlap(0, 0)
+
+@lru_cache(maxsize=65536)
+def patterns_overlap(a: str, b: str) -> bool:
+    """Whether some path could match both glob patterns."""
+    sa, sb = a.strip("/").split("/"), b.strip("/").split("/")
+    memo: Dict[Tuple[int, int], bool] = {}
+
+    def overlap(i: int, j: int) -> bool:
+        key = (i, j)
+        if key in memo:
+            return memo[key]
+        if i == len(sa) and j == len(sb):
+            result = True
+        elif i < len(sa) and sa[i] == "**":
+            result = overlap(i + 1, j) or (j < len(sb) and overlap(i, j + 1))
+        elif j < len(sb) and sb[j] == "**":
+            result = overlap(i, j + 1) or (i < len(sa) and overlap(i + 1, j))
+        elif i < len(sa) and j < len(sb):
+            result = segments_overlap(sa[i], sb[j]) and overlap(i + 1, j + 1)
+        else:
+            result = False
+        memo[key] = result
+        return result
+
+    return overlap(0, 0)
+
+class FileTreeIndex:
+    """Cached listing of the files under a root directory."""
+
+    def __init__(self, root: str, max_age: float = 30.0):
+        self.root = root
+        self.max_age = max_age
+        self._files: Optional[List[str]] = None
+        self._expanded: Dict[str, List[str]] = {}
+        self._scanned_at = 0.0
+        self._lock = threading.Lock()
+
+    def _scan(self) -> List[str]:
+        files = []
+        stack = [""]
+        while stack:
+            relative = stack.pop()
+            try:
+                entries = list(os.scandir(os.path.join(self.root, relative)))
+            except OSError:
+                continue
+            for entry in entries:
+                path = f"{relative}/{entry.name}" if relative else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in IGNORED_DIRECTORIES:
+                        stack.append(path)
+                else:
+                    files.append(path)
+        files.sort()
+        return files
+
+    def files(self) -> List[str]:
+        """Return the indexed relative file paths, rescanning when stale."""
+        with self._lock:
+            if self._files is None or time.monotonic() - self._scanned_at > self.max_age:
+                self._files = self._scan()
+                self._expanded.clear()
+                self._scanned_at = time.monotonic()
+            return self._files
+
+    def invalidate(self) -> None:
+        """Force a rescan on next access."""
+        with self._lock:
+            self._files = None
+
+    def expand(self, pattern: str) -> List[str]:
+        """Return the existing files matching a glob pattern."""
+        files = self.files()
+        with self._lock:
+            expanded = self._expanded.get(pattern)
+            if expanded is None:
+                regex = glob_to_regex(pattern)
+                expanded = [f for f in files if regex.match(f)]
+                self._expanded[pattern] = expanded
+            return expanded
+
+_tree_indexes: Dict[str, FileTreeIndex] = {}
+_tree_indexes_lock = threading.Lock()
+
+def get_file_tree_index(root: str) -> FileTreeIndex:
+    """Return the shared file tree index for a root directory."""
+    key = os.path.abspath(root)
+    with _tree_indexes_lock:
+        index = _tree_indexes.get(key)
+        if index is None:
+            index = _tree_indexes[key] = FileTreeIndex(key)
+        return index
+
+def module_write_set(module: Any) -> List[str]:
+    """Return the patterns a module may write: its files and its tests."""
+    if isinstance(module, dict):
+        return list(module.get("files", [])) + list(module.get("tests", []))
+    return list(getattr(module, "files", [])) + list(getattr(module, "tests", []))
+
+class WriteConflictMap:
+    """Pairs of modules whose write sets overlap."""
+
+    def __init__(self, module_names: Iterable[str]):
+        self.conflicts: Dict[str, Set[str]] = {name: set() for name in module_names}
+        self.shared_files: Dict[Tuple[str, str], List[str]] = {}
+        self.shared_patterns: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+
+    def add_conflict(self, a: str, b: str, patterns: List[Tuple[str, str]], files: List[str]) -> None:
+        """Record that modules ``a`` and ``b`` may write the same files."""
+        self.conflicts.setdefault(a, set()).add(b)
+        self.conflicts.setdefault(b, set()).add(a)
+        key = (a, b) if a < b else (b, a)
+        self.shared_patterns[key] = patterns
+        self.shared_files[key] = files
+
+    def conflicts_with(self, name: str) -> Set[str]:
+        """Return the modules whose writes conflict with ``name``."""
+        return self.conflicts.get(name, set())
+
+    def is_compatible(self, name: str, active: Iterable[str]) -> bool:
+        """Whether ``name`` may run alongside every module in ``active``."""
+        conflicting = self.conflicts_with(name)
+        return not any(other in conflicting for other in active)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert conflict map to dictionary."""
+        return {
+            "conflicts": {name: sorted(others) for name, others in self.conflicts.items() if others},
+            "pairs": [
+                {
+                    "modules": list(pair),
+                    "patterns": [list(p) for p in self.shared_patterns[pair]],
+                    "files": self.shared_files[pair]
+                }
+                for pair in sorted(self.shared_patterns)
+            ]
+        }
+
+def compute_write_conflicts(modules: List[Any], tree_index: Optional[FileTreeIndex] = None) -> WriteConflictMap:
+    """
+    Compute which modules' write sets overlap.
+
+    Args:
+        modules: Planned modules (objects or dictionaries with name/files/tests)
+        tree_index: Index of the output tree used to report concrete shared files
+
+    Returns:
+        WriteConflictMap covering every module
+    """
+    names = [m["name"] if isinstance(m, dict) else m.name for m in modules]
+    write_sets = [module_write_set(m) for m in modules]
+    conflict_map = WriteConflictMap(names)
+
+    for i in range(len(modules)):
+        for j in range(i + 1, len(modules)):
+            overlapping = [
+                (a, b) for a in write_sets[i] for b in write_sets[j] if patterns_overlap(a, b)
+            ]
+            if not overlapping:
+                continue
+
+            files: Set[str] = set()
+            if tree_index is not None:
+                for a, b in overlapping:
+                    files.update(set(tree_index.expand(a)) & set(tree_index.expand(b)))
+            conflict_map.add_conflict(names[i], names[j], overlapping, sorted(files))
+
+    logger.info("Write conflict map: %s conflicting module pairs", len(conflict_map.shared_patterns))
+    return conflict_map
+
+class WriteSetLock:
+    """Admits a module only while no module with a conflicting write set holds the lock."""
+
+    def __init__(self, conflict_map: WriteConflictMap):
+        self.conflict_map = conflict_map
+        self.active: Set[str] = set()
+        self._condition = threading.Condition()
+
+    def try_acquire(self, name: str) -> bool:
+        """Acquire without blocking; return whether it succeeded."""
+        with self._condition:
+            if not self.conflict_map.is_compatible(name, self.active):
+                return False
+            self.active.add(name)
+            return True
+
+    def acquire(self, name: str, timeout: Optional[float] = None) -> bool:
+        """Block until no conflicting module is active, then acquire."""
+        with self._condition:
+            admitted = self._condition.wait_for(
+                lambda: self.conflict_map.is_compatible(name, self.active), timeout
+            )
+            if admitted:
+                self.active.add(name)
+            return admitted
+
+    def release(self, name: str) -> None:
+        """Release a module and wake modules waiting on it."""
+        with self._condition:
+            self.active.discard(name)
+            self._condition.notify_all()
@@ -0,0 +1,201 @@
+"""
+Fix Cache Module
+
+This module remembers which patches fixed which test failures. Errors are
+normalized into stable signatures by stripping paths, line numbers,
+timestamps and other run-specific noise. A patch that fixed a signature
+once can be replayed on the next module that fails the same way, before
+asking the model for a fix.
+"""
+
+import difflib
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Iterator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FIX_CACHE_PATH = "ai/data/fix_cache.db"
+
+# Lines of unchanged code kept around each hunk to anchor it when replaying
+PATCH_CONTEXT = 2
+
+_NOISE_PATTERNS = [
+    (re.compile(r"\x1b\[[0-9;]*m"), ""),
+    (re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), "<time>"),
+    (re.compile(r"\b\d{1,2}:\d{2}:\d{2}(?:\.\d+)?\b"), "<time>"),
+    (re.compile(r"(?:[A-Za-z]:)?(?:[\w.@~-]*[/\\])+[\w@-]+(\.\w+)+"), r"<path>\1"),
+    (re.compile(r"(?:[A-Za-z]:)?(?:[\w.@~-]*[/\\])+([\w@-]+)"), r"<path>/\1"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b"), "<addr>"),
+    (re.compile(r"(?::\d+){1,2}\b"), ""),
+    (re.compile(r"\b(?:line|ln|col|column)\s*\d+", re.IGNORECASE), r"line"),
+    (re.compile(r"\(\d+(?:,\d+)?\)"), ""),
+    (re.compile(r"\b\d+(?:\.\d+)?\s*(?:ms|s|sec|seconds)\b"), "<duration>"),
+    (re.compile(r"[ \t]+"), " "),
+]
+
+def normalize_error(error: str) -> str:
+    """Strip run-specific details from an error so equal failures compare equal."""
+    text = error or ""
+    for pattern, replacement in _NOISE_PATTERNS:
+        text = pattern.sub(replacement, text)
+    lines = [line.strip() for line in text.splitlines()]
+    return "\n".join(line for line in lines if line)
+
+def error_signature(error: str) -> str:
+    """Return a stable hash of a normalized error."""
+    return hashlib.sha256(normalize_error(error).encode("utf-8")).hexdigest()
+
+def make_patch(before: str, after: str) -> List[Dict[str, List[str]]]:
+    """
+    Describe the change from ``before`` to ``after`` as context-anchored hunks.
+
+    Returns:
+        List of hunks with ``context_before``, ``remove``, ``add`` and
+        ``context_after`` line lists
+    """
+    old_lines = before.splitlines()
+    new_lines = after.splitlines()
+    hunks = []
+    matcher = difflib.SequenceMatcher(a=old_lines, b=new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        hunks.append({
+            "context_before": old_lines[max(i1 - PATCH_CONTEXT, 0):i1],
+            "remove": old_lines[i1:i2],
+            "add": new_lines[j1:j2],
+            "context_after": old_lines[i2:i2 + PATCH_CONTEXT]
+        })
+    return hunks
+
+def _find(lines: List[str], needle: List[str], start: int) -> int:
+    if not needle:
+        return start
+    for i in range(start, len(lines) - len(needle) + 1):
+        if lines[i:i + len(needle)] == needle:
+            return i
+    return -1
+
+def apply_patch(code: str, patch: List[Dict[str, List[str]]]) -> Optional[str]:
+    """
+    Replay a patch on different code.
+
+    Returns:
+        The patched code, or None when a hunk's context cannot be found
+    """
+    lines = code.splitlines()
+    position = 0
+    for hunk in patch:
+        before, remove, after = hunk["context_before"], hunk["remove"], hunk["context_after"]
+        if not (before or remove or after):
+            # A pure insertion into empty code
+            if lines:
+                return None
+            lines = list(hunk["add"])
+            continue
+
+        # Prefer the fully anchored hunk, then progressively less context
+        start = -1
+        for lead, trail in ((before, after), (before, []), ([], after), ([], [])):
+            anchor = lead + remove + trail
+            if not anchor:
+                continue
+            index = _find(lines, anchor, position)
+            if index >= 0:
+                start = index + len(lead)
+                break
+        if start < 0:
+            return None
+        lines[start:start + len(remove)] = hunk["add"]
+        position = start + len(hunk["add"])
+
+    patched = "\n".join(lines)
+    if code.endswith("\n"):
+        patched += "\n"
+    return patched if patched != code else None
+
+class FixCache:
+    """SQLite store of patches that fixed each error signature."""
+
+    def __init__(self, filepath: str = DEFAULT_FIX_CACHE_PATH):
+        self.filepath = filepath
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS fixes (
+                    signature TEXT NOT NULL,
+                    patch_hash TEXT NOT NULL,
+                    patch TEXT NOT NULL,
+                    normalized_error TEXT,
+                    successes INTEGER NOT NULL DEFAULT 0,
+                    failures INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL,
+                    PRIMARY KEY (signature, patch_hash)
+                )
+            """)
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.filepath, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _patch_hash(patch: List[Dict[str, List[str]]]) -> str:
+        return hashlib.sha256(json.dumps(patch, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def lookup(self, signature: str, limit: int = 1) -> List[List[Dict[str, List[str]]]]:
+        """Return the most successful patches recorded for a signature."""
+        try:
+            with self._connection() as conn:
+                rows = conn.execute(
+                    "SELECT patch FROM fixes WHERE signature = ? AND successes > failures "
+                    "ORDER BY successes - failures DESC, last_used_at DESC LIMIT ?",
+                    (signature, limit)
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning("Fix cache lookup failed: %s", e)
+            return []
+        return [json.loads(row[0]) for row in rows]
+
+    def store(self, signature: str, patch: List[Dict[str, List[str]]], error: str = "") -> None:
+        """Record a patch that fixed an error with this signature."""
+        if not patch:
+            return
+        now = time.time()
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    "INSERT INTO fixes (signature, patch_hash, patch, normalized_error, successes, created_at, last_used_at) "
+                    "VALUES (?, ?, ?, ?, 1, ?, ?) "
+                    "ON CONFLICT (signature, patch_hash) DO UPDATE SET successes = successes + 1, last_used_at = excluded.last_used_at",
+                    (signature, self._patch_hash(patch), json.dumps(patch), normalize_error(error), now, now)
+                )
+        except sqlite3.Error as e:
+            logger.warning("Failed to store fix for %s: %s", signature[:12], e)
+
+    def record_result(self, signature: str, patch: List[Dict[str, List[str]]], succeeded: bool) -> None:
+        """Update a cached patch's score after replaying it."""
+        column = "successes" if succeeded else "failures"
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    f"UPDATE fixes SET {column} = {column} + 1, last_used_at = ? WHERE signature = ? AND patch_hash = ?",
+                    (time.time(), signature, self._patch_hash(patch))
+                )
+        except sqlite3.Error as e:
+            logger.warning("Failed to update fix cache for %s: %s", signature[:12], e)
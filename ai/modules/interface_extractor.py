@@ -0,0 +1,293 @@
+"""
+Interface Extractor Module
+
+This module records what each completed module exports: functions with
+their signatures, classes with their public methods, constants and, for
+TypeScript, interfaces and type aliases. Python is read with ``ast``;
+TS/TSX uses a lightweight scan of ``export`` declarations. Code generation
+and fixing for a module then receive only the interfaces of its declared
+dependencies instead of nothing or their full source.
+"""
+
+import ast
+import logging
+import os
+import re
+import threading
+from typing import Dict, List, Any, Optional
+
+from .file_ownership import FileTreeIndex
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the dependency context handed to a single model request
+DEFAULT_MAX_CONTEXT_CHARS = 6000
+
+# Longest interface/type body kept verbatim
+MAX_TYPE_BODY_CHARS = 400
+
+TS_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx")
+
+_TS_EXPORT = re.compile(
+    r"^\s*export\s+(?P<default>default\s+)?(?:declare\s+)?(?P<async>async\s+)?"
+    r"(?P<kind>function\*?|class|interface|type|enum|const|let|var|abstract\s+class)\s+"
+    r"(?P<name>[A-Za-z_$][\w$]*)",
+    re.MULTILINE
+)
+_TS_REEXPORT = re.compile(r"^\s*export\s+(?:type\s+)?\{(?P<names>[^}]*)\}", re.MULTILINE)
+
+def _python_signature(node: ast.AST) -> str:
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns is not None else ""
+    return f"{prefix} {node.name}({ast.unparse(node.args)}){returns}"
+
+def _first_line(docstring: Optional[str]) -> Optional[str]:
+    if not docstring:
+        return None
+    return docstring.strip().splitlines()[0]
+
+def extract_python_interface(source: str) -> List[Dict[str, Any]]:
+    """
+    Return the public top-level symbols of Python source.
+
+    ``__all__`` is honoured when present; otherwise names starting with an
+    underscore are skipped.
+
+    Raises:
+        SyntaxError: If the source does not parse
+    """
+    tree = ast.parse(source)
+    exported: Optional[set] = None
+    symbols: List[Dict[str, Any]] = []
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "__all__" for t in node.targets):
+            try:
+                exported = set(ast.literal_eval(node.value))
+            except ValueError:
+                pass
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            symbols.append({"kind": "function", "name": node.name, "signature": _python_signature(node),
+                            "doc": _first_line(ast.get_docstring(node))})
+        elif isinstance(node, ast.ClassDef):
+            bases = ", ".join(ast.unparse(base) for base in node.bases)
+            methods = [
+                _python_signature(item) for item in node.body
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef))
+                and (not item.name.startswith("_") or item.name == "__init__")
+            ]
+            fields = [
+                f"{ast.unparse(item.target)}: {ast.unparse(item.annotation)}" for item in node.body
+                if isinstance(item, ast.AnnAssign)
+            ]
+            symbols.append({"kind": "class", "name": node.name,
+                            "signature": f"class {node.name}({bases})" if bases else f"class {node.name}",
+                            "members": fields + methods, "doc": _first_line(ast.get_docstring(node))})
+        elif isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+            symbols.append({"kind": "variable", "name": node.target.id,
+                            "signature": f"{node.target.id}: {ast.unparse(node.annotation)}"})
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name) and target.id.isupper():
+                    symbols.append({"kind": "constant", "name": target.id, "signature": target.id})
+
+    if exported is not None:
+        return [s for s in symbols if s["name"] in exported]
+    return [s for s in symbols if not s["name"].startswith("_")]
+
+def _balanced_end(source: str, start: int, opening: str = "{", closing: str = "}") -> int:
+    """Index just past the bracket block opening at or after ``start``."""
+    depth = 0
+    index = source.find(opening, start)
+    if index < 0:
+        return start
+    for position in range(index, len(source)):
+        char = source[position]
+        if char == opening:
+            depth += 1
+        elif char == closing:
+            depth -= 1
+            if depth == 0:
+                return position + 1
+    return len(source)
+
+def _ts_declaration(source: str, match: "re.Match") -> str:
+    """The declaration header of an export: up to the body, or the full type."""
+    kind = match.group("kind").split()[-1].rstrip("*")
+    start = match.start("kind") - (len(match.group("async") or ""))
+    if kind in ("interface", "type", "enum"):
+        end = source.find(";", match.end()) if kind == "type" else -1
+        brace = source.find("{", match.end())
+        line_end = source.find("\n", match.end())
+        if kind != "type" or (brace >= 0 and (end < 0 or brace < end) and (line_end < 0 or brace <= line_end)):
+            end = _balanced_end(source, match.end())
+        elif end < 0:
+            end = line_end if line_end >= 0 else len(source)
+        text = source[start:end]
+        if len(text) > MAX_TYPE_BODY_CHARS:
+            text = text[:MAX_TYPE_BODY_CHARS] + " ...}"
+        return " ".join(text.split())
+    if kind == "function":
+        end = _balanced_end(source, match.end(), "(", ")")
+        # Return type annotation up to the body
+        body = source.find("{", end)
+        text = source[start:body if body >= 0 else end]
+        return " ".join(text.split())
+    if kind == "class":
+        body = source.find("{", match.end())
+        return " ".join(source[start:body if body >= 0 else match.end()].split())
+    # const/let/var: keep an explicit type annotation or arrow function header
+    line_end = source.find("\n", match.end())
+    text = source[start:line_end if line_end >= 0 else len(source)]
+    arrow = text.find("=>")
+    if arrow >= 0:
+        text = text[:arrow + 2]
+    elif "=" in text:
+        text = text[:text.index("=")]
+    return " ".join(text.split()).rstrip(";")
+
+def extract_ts_interface(source: str) -> List[Dict[str, Any]]:
+    """
+    Return the exported symbols of TypeScript/TSX source.
+
+    This is a scan of ``export`` declarations, not a full parser: function
+    headers, class names, interface and type bodies and typed constants are
+    kept; implementations are dropped.
+    """
+    symbols: List[Dict[str, Any]] = []
+    for match in _TS_EXPORT.finditer(source):
+        kind = match.group("kind").split()[-1].rstrip("*")
+        symbol = {
+            "kind": {"let": "variable", "var": "variable", "const": "constant"}.get(kind, kind),
+            "name": match.group("name"),
+            "signature": _ts_declaration(source, match)
+        }
+        if match.group("default"):
+            symbol["signature"] = f"export default {symbol['signature']}"
+        symbols.append(symbol)
+    for match in _TS_REEXPORT.finditer(source):
+        for name in match.group("names").split(","):
+            name = name.strip().split(" as ")[-1].strip()
+            if name:
+                symbols.append({"kind": "reexport", "name": name, "signature": f"export {{ {name} }}"})
+    return symbols
+
+def language_of(path: str) -> str:
+    """Language of a source file by extension: "typescript" or "python"."""
+    return "typescript" if path.endswith(TS_EXTENSIONS) else "python"
+
+class ModuleInterface:
+    """Exported symbols of one module."""
+
+    def __init__(self, module: str, symbols: List[Dict[str, Any]], sources: Optional[List[str]] = None):
+        self.module = module
+        self.symbols = symbols
+        self.sources = sources or []
+
+    def render(self) -> str:
+        """Compact text form used in model prompts."""
+        lines = [f"# {self.module}"]
+        for symbol in self.symbols:
+            line = symbol["signature"]
+            if symbol.get("doc"):
+                line += f"  # {symbol['doc']}"
+            lines.append(line)
+            lines.extend(f"    {member}" for member in symbol.get("members", []))
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"module": self.module, "symbols": self.symbols, "sources": self.sources}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ModuleInterface':
+        return cls(data["module"], data.get("symbols", []), data.get("sources", []))
+
+def extract_interface(module_name: str, code: str, code_path: Optional[str] = None,
+                      files: Optional[List[str]] = None, root: Optional[str] = None) -> ModuleInterface:
+    """
+    Extract a module's interface from its generated code and planned files.
+
+    Args:
+        module_name: Module name
+        code: Generated code of the module
+        code_path: File the code was saved to, which decides its language
+        files: Planned files of the module, often globs, expanded against
+            ``root`` and read when they exist
+        root: Output tree the planned files live in
+
+    Returns:
+        ModuleInterface; sources that fail to parse are skipped
+    """
+    root = root or "."
+    sources = [(code_path or module_name, code)]
+    seen = {os.path.normpath(os.path.relpath(code_path, root))} if code_path else set()
+    # One scan of the tree serves every pattern of the module
+    tree = FileTreeIndex(root) if files else None
+    for pattern in files or []:
+        for path in tree.expand(pattern):
+            if os.path.normpath(path) in seen:
+                continue
+            seen.add(os.path.normpath(path))
+            try:
+                with open(os.path.join(root, path), "r", encoding="utf-8") as f:
+                    sources.append((path, f.read()))
+            except (OSError, UnicodeDecodeError):
+                continue
+
+    symbols: List[Dict[str, Any]] = []
+    parsed: List[str] = []
+    for path, source in sources:
+        try:
+            if language_of(path) == "typescript":
+                found = extract_ts_interface(source)
+            else:
+                found = extract_python_interface(source)
+        except SyntaxError as e:
+            logger.debug("Could not extract interface of %s: %s", path, e)
+            continue
+        symbols.extend(found)
+        parsed.append(path)
+    return ModuleInterface(module_name, symbols, parsed)
+
+class InterfaceRegistry:
+    """Thread-safe registry of the interfaces of completed modules."""
+
+    def __init__(self, max_chars: int = DEFAULT_MAX_CONTEXT_CHARS):
+        self.max_chars = max_chars
+        self._interfaces: Dict[str, ModuleInterface] = {}
+        self._lock = threading.Lock()
+
+    def record(self, interface: ModuleInterface) -> None:
+        with self._lock:
+            self._interfaces[interface.module] = interface
+
+    def get(self, module_name: str) -> Optional[ModuleInterface]:
+        with self._lock:
+            return self._interfaces.get(module_name)
+
+    def context_for(self, dependencies: List[str]) -> str:
+        """
+        Rendered interfaces of the given dependencies, within ``max_chars``.
+
+        Dependencies without a recorded interface are skipped; once the
+        budget is reached the remaining ones are listed by name only.
+        """
+        parts: List[str] = []
+        used = 0
+        omitted: List[str] = []
+        for name in dependencies:
+            interface = self.get(name)
+            if interface is None:
+                continue
+            text = interface.render()
+            if used + len(text) > self.max_chars:
+                omitted.append(name)
+                continue
+            parts.append(text)
+            used += len(text) + 2
+        if omitted:
+            parts.append(f"# Interfaces omitted for size: {', '.join(omitted)}")
+        return "\n\n".join(parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {name: interface.to_dict() for name, interface in self._interfaces.items()}
@@ -0,0 +1,233 @@
+"""
+Merkle Tree Module
+
+This module hashes the generated output tree bottom-up. Every file hash
+feeds its directory's hash, up to a single root hash. Comparing two trees
+only descends into subtrees whose hashes differ, so unchanged output is
+recognised without diffing every file. The hashes of the last successful
+integration and E2E runs are kept in a small SQLite store.
+"""
+
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Tuple
+
+from .file_ownership import IGNORED_DIRECTORIES, glob_to_regex
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT_STATE_PATH = "ai/data/output_state.db"
+
+# Files the pipeline itself writes into the output tree on every run
+IGNORED_FILES = ("pipeline_result_*.json", "profile_*")
+
+_CHUNK_SIZE = 1 << 20
+
+def hash_file(path: str) -> str:
+    """Return the sha256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _hash_entries(entries: Iterable[Tuple[str, str, str]]) -> str:
+    digest = hashlib.sha256()
+    for name, kind, value in sorted(entries):
+        digest.update(f"{name}\0{kind}\0{value}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+class MerkleTree:
+    """Content hashes of every file and directory under a root."""
+
+    def __init__(self, root: str, files: Dict[str, Tuple[int, int, str]]):
+        """
+        Args:
+            root: Directory the tree was built from
+            files: Relative path -> (size, mtime_ns, sha256) for every file
+        """
+        self.root = root
+        self.files = files
+        self.directories = self._hash_directories({path: entry[2] for path, entry in files.items()})
+
+    @staticmethod
+    def _hash_directories(file_hashes: Dict[str, str]) -> Dict[str, str]:
+        """Hash every directory from its children, deepest first; "" is the root."""
+        children: Dict[str, List[Tuple[str, str, str]]] = {"": []}
+        for path in file_hashes:
+            parts = path.split("/")
+            for depth in range(1, len(parts)):
+                children.setdefault("/".join(parts[:depth]), [])
+        for path, value in file_hashes.items():
+            parent, _, name = path.rpartition("/")
+            children[parent].append((name, "f", value))
+
+        hashes: Dict[str, str] = {}
+        for directory in sorted(children, key=lambda d: d.count("/") if d else -1, reverse=True):
+            hashes[directory] = _hash_entries(children[directory])
+            if directory:
+                parent, _, name = directory.rpartition("/")
+                children[parent].append((name, "d", hashes[directory]))
+        return hashes
+
+    @property
+    def root_hash(self) -> str:
+        return self.directories[""]
+
+    def subtree_hash(self, path: str) -> Optional[str]:
+        """Hash of a file or directory, or None if it is not in the tree."""
+        path = path.strip("/")
+        if path in self.files:
+            return self.files[path][2]
+        return self.directories.get(path)
+
+    def hash_of(self, patterns: Iterable[str]) -> str:
+        """Combined hash of the files matching any of the glob patterns."""
+        regexes = [glob_to_regex(p.strip("/")) for p in patterns]
+        matched = [(path, "f", entry[2]) for path, entry in self.files.items()
+                   if any(r.match(path) for r in regexes)]
+        return _hash_entries(matched)
+
+    def changed_files(self, previous: Optional['MerkleTree']) -> List[str]:
+        """
+        List files added, removed or modified since ``previous``.
+
+        Only directories whose hashes differ are descended into.
+        """
+        if previous is None:
+            return sorted(self.files)
+        if previous.root_hash == self.root_hash:
+            return []
+
+        def entries(tree: 'MerkleTree') -> Dict[str, Dict[str, Tuple[str, str]]]:
+            listing: Dict[str, Dict[str, Tuple[str, str]]] = {d: {} for d in tree.directories}
+            for path, entry in tree.files.items():
+                parent, _, name = path.rpartition("/")
+                listing[parent][name] = ("f", entry[2])
+            for directory, value in tree.directories.items():
+                if directory:
+                    parent, _, name = directory.rpartition("/")
+                    listing[parent][name] = ("d", value)
+            return listing
+
+        current, old = entries(self), entries(previous)
+        changed = []
+        stack = [""]
+        while stack:
+            directory = stack.pop()
+            here, there = current.get(directory, {}), old.get(directory, {})
+            for name in set(here) | set(there):
+                if here.get(name) == there.get(name):
+                    continue
+                path = f"{directory}/{name}" if directory else name
+                kinds = {entry[0] for entry in (here.get(name), there.get(name)) if entry}
+                if "d" in kinds:
+                    stack.append(path)
+                    # A directory replaced by a file or the other way round
+                    if "f" in kinds:
+                        changed.append(path)
+                else:
+                    changed.append(path)
+        return sorted(changed)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert tree to dictionary; directory hashes are recomputed on load."""
+        return {"root": self.root, "root_hash": self.root_hash, "files": {p: list(e) for p, e in self.files.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'MerkleTree':
+        """Create tree from dictionary."""
+        return cls(data["root"], {p: tuple(e) for p, e in data.get("files", {}).items()})
+
+def build_merkle_tree(root: str, previous: Optional[MerkleTree] = None) -> MerkleTree:
+    """
+    Hash the tree under ``root``.
+
+    Files whose size and modification time match ``previous`` reuse its
+    hash instead of being read again.
+
+    Args:
+        root: Directory to hash
+        previous: Earlier tree of the same root
+
+    Returns:
+        MerkleTree of the directory; empty if it does not exist
+    """
+    known = previous.files if previous is not None else {}
+    files: Dict[str, Tuple[int, int, str]] = {}
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories[:] = [d for d in subdirectories if d not in IGNORED_DIRECTORIES]
+        for filename in filenames:
+            if any(fnmatch.fnmatch(filename, pattern) for pattern in IGNORED_FILES):
+                continue
+            path = os.path.join(directory, filename)
+            relative = os.path.relpath(path, root).replace(os.sep, "/")
+            try:
+                stat = os.stat(path)
+                entry = known.get(relative)
+                if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+                    files[relative] = entry
+                else:
+                    files[relative] = (stat.st_size, stat.st_mtime_ns, hash_file(path))
+            except OSError as e:
+                logger.warning("Skipping %s while hashing output tree: %s", path, e)
+    return MerkleTree(root, files)
+
+class OutputStateStore:
+    """SQLite store of the output tree state after the last successful stages, by root."""
+
+    def __init__(self, filepath: str = DEFAULT_OUTPUT_STATE_PATH):
+        self.filepath = filepath
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS output_state (
+                    root TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (root, stage)
+                )
+            """)
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.filepath, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, root: str, stage: str) -> Optional[Dict[str, Any]]:
+        """Return the state recorded for a stage of an output root, if any."""
+        try:
+            with self._connection() as conn:
+                row = conn.execute(
+                    "SELECT state FROM output_state WHERE root = ? AND stage = ?",
+                    (os.path.abspath(root), stage)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("Failed to load %s state for %s: %s", stage, root, e)
+            return None
+        return json.loads(row[0]) if row else None
+
+    def put(self, root: str, stage: str, state: Dict[str, Any]) -> None:
+        """Record the state of an output root after a stage succeeded."""
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO output_state (root, stage, state, updated_at) VALUES (?, ?, ?, ?)",
+                    (os.path.abspath(root), stage, json.dumps(state, default=str), time.time())
+                )
+        except sqlite3.Error as e:
+            logger.warning("Failed to save %s state for %s: %s", stage, root, e)
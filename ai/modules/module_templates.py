@@ -0,0 +1,238 @@
+"""
+Module Template Rule Engine
+
+This module loads the planner's module templates from a declarative rule
+file and indexes them by project type, technology and trigger keyword, so
+that a specification is only ever matched against rules that can apply to it.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEMPLATES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "config",
+    "module_templates.json"
+)
+
+class ModuleTemplate:
+    """Immutable, shared description of a module the planner can emit."""
+
+    __slots__ = ("order", "project_types", "trigger_technologies", "trigger_keywords",
+                 "name", "description", "type", "technologies", "dependencies",
+                 "estimated_complexity", "estimated_time", "files", "tests")
+
+    def __init__(self, order: int, rule: Dict[str, Any]):
+        module = rule["module"]
+        when = rule.get("when", {})
+        values = {
+            "order": order,
+            "project_types": tuple(rule.get("project_types", [])),
+            "trigger_technologies": tuple(t.lower() for t in when.get("technologies", [])),
+            "trigger_keywords": tuple(k.lower() for k in when.get("keywords", [])),
+            "name": module["name"],
+            "description": module["description"],
+            "type": module["type"],
+            "technologies": tuple(module.get("technologies", [])),
+            "dependencies": tuple(module.get("dependencies", [])),
+            "estimated_complexity": module.get("estimated_complexity", "medium"),
+            "estimated_time": module.get("estimated_time", "1-2 hours"),
+            "files": tuple(module.get("files", [])),
+            "tests": tuple(module.get("tests", []))
+        }
+        for key, value in values.items():
+            object.__setattr__(self, key, value)
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        raise AttributeError(f"ModuleTemplate '{self.name}' is immutable")
+
+    @property
+    def unconditional(self) -> bool:
+        """Whether the template applies to every spec of its project types."""
+        return not self.trigger_technologies and not self.trigger_keywords
+
+    def module_fields(self) -> Dict[str, Any]:
+        """Return fresh, mutable constructor arguments for a module instance."""
+        return {
+            "name": self.name,
+            "description": self.description,
+            "type": self.type,
+            "technologies": list(self.technologies),
+            "dependencies": list(self.dependencies),
+            "estimated_complexity": self.estimated_complexity,
+            "estimated_time": self.estimated_time,
+            "files": list(self.files),
+            "tests": list(self.tests)
+        }
+
+    def __repr__(self) -> str:
+        return f"ModuleTemplate({self.name!r})"
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton finding every trigger keyword in one pass over the text."""
+
+    def __init__(self, keywords: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[str, ...]] = [()]
+
+        for keyword in set(keywords):
+            if not keyword:
+                continue
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                state = next_state
+            self._output[state] = self._output[state] + (keyword,)
+
+        # Breadth-first construction of failure links
+        queue = list(self._goto[0].values())
+        while queue:
+            state = queue.pop(0)
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text: str) -> set:
+        """Return the set of keywords occurring anywhere in ``text``."""
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            if self._output[state]:
+                found.update(self._output[state])
+        return found
+
+class ProjectTypeIndex:
+    """Templates for one project type, indexed by their triggers."""
+
+    def __init__(self, templates: List[ModuleTemplate]):
+        self.unconditional: List[ModuleTemplate] = []
+        self.by_technology: Dict[str, List[ModuleTemplate]] = {}
+        self.by_keyword: Dict[str, List[ModuleTemplate]] = {}
+
+        for template in templates:
+            if template.unconditional:
+                self.unconditional.append(template)
+            for tech in template.trigger_technologies:
+                self.by_technology.setdefault(tech, []).append(template)
+            for keyword in template.trigger_keywords:
+                self.by_keyword.setdefault(keyword, []).append(template)
+
+        self.keywords = KeywordAutomaton(self.by_keyword.keys())
+
+    def match(self, technologies: Iterable[str], description: str) -> List[ModuleTemplate]:
+        """Return the matching templates in rule-file order."""
+        matched = {t.order: t for t in self.unconditional}
+
+        for tech in technologies:
+            for template in self.by_technology.get(tech.lower(), ()):
+                matched[template.order] = template
+
+        if self.by_keyword and description:
+            for keyword in self.keywords.find(description.lower()):
+                for template in self.by_keyword[keyword]:
+                    matched[template.order] = template
+
+        return [matched[order] for order in sorted(matched)]
+
+class TemplateIndex:
+    """All module templates loaded from a rule file."""
+
+    def __init__(self, rules: Dict[str, Any], source: Optional[str] = None):
+        self.source = source
+        self.source_stat: Optional[Tuple[int, int]] = None
+        # Content hash of the rules; plan caches key on it so edits invalidate them
+        self.version = hashlib.sha256(
+            json.dumps(rules, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()[:16]
+        self.default_project_type = rules.get("default_project_type", "web")
+        self.templates = [ModuleTemplate(i, rule) for i, rule in enumerate(rules.get("templates", []))]
+
+        grouped: Dict[str, List[ModuleTemplate]] = {}
+        for template in self.templates:
+            for proj_type in template.project_types:
+                grouped.setdefault(proj_type, []).append(template)
+        self.project_types = {proj_type: ProjectTypeIndex(templates) for proj_type, templates in grouped.items()}
+
+    def resolve_project_type(self, proj_type: Optional[str]) -> str:
+        """Map unknown project types onto the configured default."""
+        return proj_type if proj_type in self.project_types else self.default_project_type
+
+    def match(self, spec: Dict[str, Any], project_type: Optional[str] = None) -> List[ModuleTemplate]:
+        """
+        Match a specification against the templates that can apply to it.
+
+        Args:
+            spec: The normalized requirement specification
+            project_type: Overrides ``spec["type"]`` when given
+
+        Returns:
+            Shared template instances in rule-file order
+        """
+        proj_type = self.resolve_project_type(project_type or spec.get("type"))
+        type_index = self.project_types.get(proj_type)
+        if type_index is None:
+            return []
+        return type_index.match(spec.get("technologies", []), spec.get("description", ""))
+
+def load_module_templates(filepath: str = DEFAULT_TEMPLATES_PATH) -> TemplateIndex:
+    """Load and index module templates from a JSON rule file."""
+    stat = _file_stat(filepath)
+    with open(filepath, 'r', encoding='utf-8') as f:
+        rules = json.load(f)
+
+    index = TemplateIndex(rules, source=filepath)
+    index.source_stat = stat
+    logger.info("Loaded %s module templates from %s (version %s)", len(index.templates), filepath, index.version)
+    return index
+
+def _file_stat(filepath: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+_template_index: Optional[TemplateIndex] = None
+
+def get_template_index() -> TemplateIndex:
+    """
+    Return the process-wide template index.
+
+    The index is loaded on first use and reloaded when its rule file changes
+    on disk, which also changes ``TemplateIndex.version``.
+    """
+    global _template_index
+    index = _template_index
+    if index is None:
+        _template_index = load_module_templates()
+    elif index.source and index.source_stat is not None and _file_stat(index.source) != index.source_stat:
+        try:
+            _template_index = load_module_templates(index.source)
+        except (OSError, ValueError) as e:
+            logger.error("Failed to reload module templates from %s: %s", index.source, e)
+    return _template_index
+
+def set_template_index(index: TemplateIndex) -> None:
+    """Replace the process-wide template index (e.g. after editing the rule file)."""
+    global _template_index
+    _template_index = index
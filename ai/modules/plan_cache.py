@@ -0,0 +1,154 @@
+"""
+Plan Cache Module
+
+This module caches development plans keyed by a canonical fingerprint of the
+requirement specification and the version of the planner templates, in an
+in-memory LRU backed by plan files on disk.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+# Fields that change on every normalization without changing the plan
+VOLATILE_SPEC_FIELDS = {"normalized_at"}
+
+# Fields built from sets, whose order is not stable between runs
+UNORDERED_SPEC_FIELDS = {"technologies", "features", "constraints"}
+
+def spec_fingerprint(spec: Dict[str, Any]) -> str:
+    """Return a canonical hash of a requirement specification."""
+    canonical = {}
+    for key, value in spec.items():
+        if key in VOLATILE_SPEC_FIELDS:
+            continue
+        if key in UNORDERED_SPEC_FIELDS and isinstance(value, list):
+            value = sorted(value, key=str)
+        canonical[key] = value
+
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class PlanCache:
+    """LRU cache of plan dictionaries, persisted as one JSON file per plan."""
+
+    def __init__(self,
+                 directory: Optional[str] = None,
+                 max_entries: int = 256,
+                 saver: Optional[Callable[[Dict[str, Any], str], None]] = None):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.saver = saver
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._template_version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(spec: Dict[str, Any], template_version: str) -> str:
+        """Build the cache key for a spec planned with a template version."""
+        return f"{template_version}-{spec_fingerprint(spec)[:32]}"
+
+    def _path(self, key: str) -> Optional[str]:
+        if not self.directory:
+            return None
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _check_version(self, template_version: str) -> None:
+        """Drop every entry planned with other templates once the version changes."""
+        if self._template_version == template_version:
+            return
+        if self._template_version is not None:
+            logger.info("Planner templates changed (%s -> %s), invalidating plan cache", self._template_version, template_version)
+            self._entries.clear()
+            self._purge_disk(template_version)
+        self._template_version = template_version
+
+    def _purge_disk(self, template_version: str) -> None:
+        if not self.directory or not os.path.isdir(self.directory):
+            return
+        for filename in os.listdir(self.directory):
+            if filename.endswith(".json") and not filename.startswith(f"{template_version}-"):
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except OSError as e:
+                    logger.warning("Failed to remove stale cached plan %s: %s", filename, e)
+
+    def get(self, spec: Dict[str, Any], template_version: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached plan.
+
+        Args:
+            spec: The normalized requirement specification
+            template_version: Version of the templates the plan must come from
+
+        Returns:
+            A private copy of the cached plan dictionary, or None on a miss
+        """
+        key = self.make_key(spec, template_version)
+
+        with self._lock:
+            self._check_version(template_version)
+            plan = self._entries.get(key)
+            if plan is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(plan)
+
+        plan = self._load(key)
+
+        with self._lock:
+            if plan is None:
+                self.misses += 1
+                return None
+            self._remember(key, plan)
+            self.hits += 1
+        return copy.deepcopy(plan)
+
+    def put(self, spec: Dict[str, Any], template_version: str, plan: Dict[str, Any]) -> None:
+        """Store a plan in memory and persist it to the cache directory."""
+        key = self.make_key(spec, template_version)
+        plan = copy.deepcopy(plan)
+        plan["cache_key"] = key
+        plan["template_version"] = template_version
+
+        with self._lock:
+            self._check_version(template_version)
+            self._remember(key, plan)
+
+        path = self._path(key)
+        if path and self.saver:
+            self.saver(plan, path)
+
+    def clear(self) -> None:
+        """Drop all in-memory entries (plan files on disk are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key: str, plan: Dict[str, Any]) -> None:
+        self._entries[key] = plan
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                plan = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable cached plan %s: %s", path, e)
+            return None
+        if plan.get("cache_key") != key:
+            return None
+        return plan
@@ -0,0 +1,222 @@
+"""
+Binary Plan Store Module
+
+This module provides a compact on-disk format for development plans and
+specifications, alongside the pretty-printed JSON written by
+``save_development_plan`` and ``save_specification``. A header index records
+where each module's record lives. Readers memory-map the file and only
+decode the modules they actually ask for.
+
+Layout (little-endian)::
+
+    magic "AIPB" | u16 format version | u16 kind | u32 record count
+    | u32 index size | u32 metadata size
+    | index: per record u16 name size, name, u64 offset, u32 size
+    | metadata: compact JSON
+    | records: compact JSON, one per module
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+from .planner import DevelopmentModule, DevelopmentPlan
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"AIPB"
+FORMAT_VERSION = 1
+KIND_PLAN = 1
+KIND_SPECIFICATION = 2
+
+PLAN_EXTENSION = ".plan"
+SPECIFICATION_EXTENSION = ".spec"
+
+_HEADER = struct.Struct("<4sHHIII")
+_INDEX_NAME = struct.Struct("<H")
+_INDEX_SPAN = struct.Struct("<QI")
+
+def _compact(data: Any) -> bytes:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def _write_container(filepath: str, kind: int, metadata: Dict[str, Any], records: List[Tuple[str, bytes]]) -> None:
+    meta_bytes = _compact(metadata)
+
+    index_size = sum(_INDEX_NAME.size + len(name.encode("utf-8")) + _INDEX_SPAN.size for name, _ in records)
+    offset = _HEADER.size + index_size + len(meta_bytes)
+
+    index = bytearray()
+    for name, payload in records:
+        encoded = name.encode("utf-8")
+        index += _INDEX_NAME.pack(len(encoded)) + encoded + _INDEX_SPAN.pack(offset, len(payload))
+        offset += len(payload)
+
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # Write to a temporary file first so readers never see a partial plan
+    tmp_path = f"{filepath}.tmp.{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, kind, len(records), len(index), len(meta_bytes)))
+        f.write(index)
+        f.write(meta_bytes)
+        for _, payload in records:
+            f.write(payload)
+    os.replace(tmp_path, filepath)
+
+class PlanFile:
+    """Memory-mapped binary plan or specification with lazily decoded records."""
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self._file = open(filepath, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            self._file.close()
+            raise ValueError(f"Not a binary plan file: {filepath}")
+
+        try:
+            self._read_index()
+        except (struct.error, ValueError) as e:
+            # Truncated or corrupt files are reported as ValueError like any other bad file
+            self.close()
+            raise ValueError(f"Unreadable binary plan file {filepath}: {e}") from e
+
+        self._metadata: Optional[Dict[str, Any]] = None
+        self._modules: Dict[str, DevelopmentModule] = {}
+
+    def _read_index(self) -> None:
+        """Read the header and index, checking every span lies within the file."""
+        magic, version, kind, count, index_size, meta_size = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError("not a binary plan file")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"unsupported format version {version}")
+
+        self.kind = kind
+        self.index: Dict[str, Tuple[int, int]] = {}
+        position = _HEADER.size
+        for _ in range(count):
+            (name_size,) = _INDEX_NAME.unpack_from(self._map, position)
+            position += _INDEX_NAME.size
+            name = self._map[position:position + name_size].decode("utf-8")
+            position += name_size
+            offset, size = self.index[name] = _INDEX_SPAN.unpack_from(self._map, position)
+            position += _INDEX_SPAN.size
+            if offset + size > len(self._map):
+                raise ValueError(f"record {name!r} extends past the end of the file")
+        if position != _HEADER.size + index_size or position + meta_size > len(self._map):
+            raise ValueError("index or metadata extends past the end of the file")
+        self._meta_span = (position, meta_size)
+
+    def __enter__(self) -> 'PlanFile':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def close(self) -> None:
+        """Release the memory map and file handle."""
+        if getattr(self, "_map", None) is not None and not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+    @property
+    def module_names(self) -> List[str]:
+        """Names of the modules stored in the file, in plan order."""
+        return list(self.index)
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """Plan-level fields (or the specification itself), decoded on first access."""
+        if self._metadata is None:
+            offset, size = self._meta_span
+            self._metadata = json.loads(self._map[offset:offset + size])
+        return self._metadata
+
+    def module_dict(self, name: str) -> Dict[str, Any]:
+        """Decode one module record without touching the others."""
+        offset, size = self.index[name]
+        return json.loads(self._map[offset:offset + size])
+
+    def module(self, name: str) -> DevelopmentModule:
+        """Return a module, decoding and caching it on first access."""
+        module = self._modules.get(name)
+        if module is None:
+            module = self._modules[name] = DevelopmentModule.from_dict(self.module_dict(name))
+        return module
+
+    def iter_modules(self) -> Iterator[DevelopmentModule]:
+        """Yield the plan's modules in order, decoding each on demand."""
+        for name in self.index:
+            yield self.module(name)
+
+    def to_plan(self) -> DevelopmentPlan:
+        """Decode the whole file into a DevelopmentPlan."""
+        data = dict(self.metadata)
+        data["modules"] = [self.module_dict(name) for name in self.index]
+        return DevelopmentPlan.from_dict(data)
+
+def save_development_plan_binary(plan: Dict[str, Any], filepath: str = f"ai/plans/latest{PLAN_EXTENSION}") -> None:
+    """Save development plan in the compact binary format."""
+    try:
+        metadata = {k: v for k, v in plan.items() if k != "modules"}
+        records = [(m["name"], _compact(m)) for m in plan.get("modules", [])]
+        _write_container(filepath, KIND_PLAN, metadata, records)
+        logger.info("Development plan saved to %s", filepath)
+    except Exception as e:
+        logger.error("Failed to save development plan: %s", e)
+
+def load_development_plan_binary(filepath: str) -> PlanFile:
+    """Open a binary development plan for lazy, per-module access."""
+    plan_file = PlanFile(filepath)
+    if plan_file.kind != KIND_PLAN:
+        plan_file.close()
+        raise ValueError(f"Not a binary development plan: {filepath}")
+    return plan_file
+
+def save_specification_binary(spec: Dict[str, Any], filepath: str = f"ai/specifications/latest{SPECIFICATION_EXTENSION}") -> None:
+    """Save specification in the compact binary format."""
+    try:
+        _write_container(filepath, KIND_SPECIFICATION, spec, [])
+        logger.info("Specification saved to %s", filepath)
+    except Exception as e:
+        logger.error("Failed to save specification: %s", e)
+
+def load_specification_binary(filepath: str) -> Dict[str, Any]:
+    """Load a specification saved with save_specification_binary."""
+    with PlanFile(filepath) as spec_file:
+        if spec_file.kind != KIND_SPECIFICATION:
+            raise ValueError(f"Not a binary specification: {filepath}")
+        return spec_file.metadata
+
+def scan_plan_archive(directory: str) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Yield ``(path, module names)`` for every binary plan in an archive directory.
+
+    Only each file's header index is read; module records and metadata are
+    never decoded.
+    """
+    for root, _, filenames in os.walk(directory):
+        for filename in sorted(filenames):
+            if not filename.endswith(PLAN_EXTENSION):
+                continue
+            path = os.path.join(root, filename)
+            try:
+                with PlanFile(path) as plan_file:
+                    if plan_file.kind == KIND_PLAN:
+                        yield path, plan_file.module_names
+            except (OSError, ValueError) as e:
+                logger.warning("Skipping unreadable plan %s: %s", path, e)
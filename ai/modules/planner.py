@@ -7,12 +7,20 @@ into manageable modules with dependencies and implementation order.
 
 import json
 import logging
-from typing import Dict, List, Any, Optional, Set
+import os
+import threading
+from typing import Dict, List, Any, Optional
 from datetime import datetime
-import re
+
+from .duration_model import DurationEstimate, DurationModel, parse_estimated_time
+from .file_ownership import FileTreeIndex, WriteConflictMap, compute_write_conflicts
+from .module_templates import ModuleTemplate, get_template_index
+from .plan_cache import PlanCache
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_PLAN_PATH = "ai/plans/latest.json"
+
 class DevelopmentModule:
     """Represents a module in the development plan."""
     
@@ -68,6 +76,11 @@ class DevelopmentModule:
         )
         module.created_at = datetime.fromisoformat(data["created_at"])
         return module
+    
+    @classmethod
+    def from_template(cls, template: ModuleTemplate) -> 'DevelopmentModule':
+        """Create a fresh module instance from a shared template."""
+        return cls(**template.module_fields())
 
 class DevelopmentPlan:
     """Represents a complete development plan."""
@@ -112,25 +125,20 @@ class DevelopmentPlan:
         
         self.execution_order = execution_order
     
-    def calculate_total_time(self) -> None:
-        """Calculate total estimated time for the plan."""
-        time_mapping = {
-            "30 minutes": 0.5,
-            "1 hour": 1,
-            "1-2 hours": 1.5,
-            "2-3 hours": 2.5,
-            "3-4 hours": 3.5,
-            "4-6 hours": 5,
-            "6-8 hours": 7,
-            "1-2 days": 12,
-            "2-3 days": 24,
-            "3-5 days": 40
-        }
-        
-        total_hours = 0
+    def estimate_durations(self, duration_model: Optional[DurationModel] = None) -> Dict[str, DurationEstimate]:
+        """Predict each module's duration, from timing history when a model is given."""
+        if duration_model is not None:
+            return duration_model.predict_modules(self.modules)
+        estimates = {}
         for module in self.modules:
-            hours = time_mapping.get(module.estimated_time, 1.5)
-            total_hours += hours
+            expected, low, high = parse_estimated_time(module.estimated_time)
+            estimates[module.name] = DurationEstimate(expected * 3600, low * 3600, high * 3600, 0, "static")
+        return estimates
+    
+    def calculate_total_time(self, duration_model: Optional[DurationModel] = None) -> None:
+        """Calculate total estimated time for the plan."""
+        estimates = self.estimate_durations(duration_model)
+        total_hours = sum(e.hours for e in estimates.values())
         
         # Convert to readable format
         if total_hours < 1:
@@ -144,6 +152,10 @@ class DevelopmentPlan:
             days = total_hours / 8
             self.total_estimated_time = f"{int(days)} days"
     
+    def write_conflict_map(self, tree_index: Optional[FileTreeIndex] = None) -> WriteConflictMap:
+        """Compute which modules' file and test patterns may write the same paths."""
+        return compute_write_conflicts(self.modules, tree_index)
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert plan to dictionary."""
         return {
@@ -153,368 +165,118 @@ class DevelopmentPlan:
             "total_estimated_time": self.total_estimated_time,
             "created_at": self.created_at.isoformat()
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DevelopmentPlan':
+        """Create plan from dictionary."""
+        plan = cls(data["requirement_spec"])
+        plan.modules = [DevelopmentModule.from_dict(m) for m in data.get("modules", [])]
+        plan.execution_order = data.get("execution_order", [])
+        plan.total_estimated_time = data.get("total_estimated_time", "")
+        plan.created_at = datetime.fromisoformat(data["created_at"])
+        return plan
+
+def generate_template_modules(spec: Dict[str, Any], project_type: Optional[str] = None) -> List[DevelopmentModule]:
+    """Generate modules for a spec from the indexed module templates."""
+    templates = get_template_index().match(spec, project_type)
+    return [DevelopmentModule.from_template(t) for t in templates]
 
 def generate_web_modules(spec: Dict[str, Any]) -> List[DevelopmentModule]:
     """Generate modules for web applications."""
-    modules = []
-    
-    # Core modules
-    if "react" in spec["technologies"] or "nextjs" in spec["technologies"]:
-        modules.append(DevelopmentModule(
-            name="frontend-setup",
-            description="Set up React/Next.js frontend project structure",
-            type="frontend",
-            technologies=["react", "nextjs", "typescript"],
-            dependencies=[],
-            estimated_complexity="low",
-            estimated_time="30 minutes",
-            files=["package.json", "next.config.js", "tsconfig.json", "tailwind.config.js"],
-            tests=["setup.test.js"]
-        ))
-    
-    # Authentication module
-    if "auth" in spec["description"].lower() or "authentication" in spec["description"].lower():
-        modules.append(DevelopmentModule(
-            name="authentication",
-            description="Implement user authentication system",
-            type="backend",
-            technologies=["nextauth", "prisma"],
-            dependencies=["frontend-setup"],
-            estimated_complexity="medium",
-            estimated_time="2-3 hours",
-            files=["src/lib/auth.ts", "src/pages/api/auth/[...nextauth].ts"],
-            tests=["auth.test.js"]
-        ))
-    
-    # Database module
-    if "database" in spec["description"].lower() or "data" in spec["description"].lower():
-        modules.append(DevelopmentModule(
-            name="database-setup",
-            description="Set up database schema and connection",
-            type="backend",
-            technologies=["prisma", "postgresql"],
-            dependencies=[],
-            estimated_complexity="medium",
-            estimated_time="1-2 hours",
-            files=["prisma/schema.prisma", "src/lib/db.ts"],
-            tests=["db.test.js"]
-        ))
-    
-    # API modules
-    if "api" in spec["description"].lower() or "backend" in spec["description"].lower():
-        modules.append(DevelopmentModule(
-            name="api-routes",
-            description="Create REST API routes",
-            type="backend",
-            technologies=["nextjs", "typescript"],
-            dependencies=["database-setup"],
-            estimated_complexity="medium",
-            estimated_time="2-3 hours",
-            files=["src/pages/api/**/*.ts"],
-            tests=["api.test.js"]
-        ))
-    
-    # UI Components
-    modules.append(DevelopmentModule(
-        name="ui-components",
-        description="Create reusable UI components",
-        type="frontend",
-        technologies=["react", "tailwind", "shadcn"],
-        dependencies=["frontend-setup"],
-        estimated_complexity="medium",
-        estimated_time="2-3 hours",
-        files=["src/components/**/*.tsx"],
-        tests=["components.test.js"]
-    ))
-    
-    # Pages/Routes
-    modules.append(DevelopmentModule(
-        name="pages",
-        description="Create application pages and routes",
-        type="frontend",
-        technologies=["nextjs", "react"],
-        dependencies=["ui-components", "api-routes"],
-        estimated_complexity="medium",
-        estimated_time="2-3 hours",
-        files=["src/pages/**/*.tsx", "src/app/**/*.tsx"],
-        tests=["pages.test.js"]
-    ))
-    
-    # Styling
-    modules.append(DevelopmentModule(
-        name="styling",
-        description="Implement styling and responsive design",
-        type="frontend",
-        technologies=["tailwind", "css"],
-        dependencies=["ui-components", "pages"],
-        estimated_complexity="low",
-        estimated_time="1-2 hours",
-        files=["src/styles/**/*.css", "src/**/*.css"],
-        tests=["styling.test.js"]
-    ))
-    
-    return modules
+    return generate_template_modules(spec, "web")
 
 def generate_api_modules(spec: Dict[str, Any]) -> List[DevelopmentModule]:
     """Generate modules for API projects."""
-    modules = []
-    
-    # Core API setup
-    modules.append(DevelopmentModule(
-        name="api-setup",
-        description="Set up API project structure",
-        type="backend",
-        technologies=["fastapi", "python"],
-        dependencies=[],
-        estimated_complexity="low",
-        estimated_time="30 minutes",
-        files=["main.py", "requirements.txt", "pyproject.toml"],
-        tests=["setup.test.py"]
-    ))
-    
-    # Database models
-    modules.append(DevelopmentModule(
-        name="database-models",
-        description="Define database models and schemas",
-        type="backend",
-        technologies=["sqlalchemy", "postgresql"],
-        dependencies=["api-setup"],
-        estimated_complexity="medium",
-        estimated_time="1-2 hours",
-        files=["models.py", "schemas.py"],
-        tests=["models.test.py"]
-    ))
-    
-    # API endpoints
-    modules.append(DevelopmentModule(
-        name="api-endpoints",
-        description="Implement API endpoints",
-        type="backend",
-        technologies=["fastapi", "python"],
-        dependencies=["database-models"],
-        estimated_complexity="medium",
-        estimated_time="2-3 hours",
-        files=["routers/**/*.py"],
-        tests=["endpoints.test.py"]
-    ))
-    
-    # Authentication
-    modules.append(DevelopmentModule(
-        name="auth-middleware",
-        description="Implement authentication middleware",
-        type="backend",
-        technologies=["fastapi", "jwt"],
-        dependencies=["api-endpoints"],
-        estimated_complexity="medium",
-        estimated_time="1-2 hours",
-        files=["auth.py", "middleware.py"],
-        tests=["auth.test.py"]
-    ))
-    
-    # Documentation
-    modules.append(DevelopmentModule(
-        name="api-docs",
-        description="Generate API documentation",
-        type="documentation",
-        technologies=["fastapi", "swagger"],
-        dependencies=["api-endpoints"],
-        estimated_complexity="low",
-        estimated_time="30 minutes",
-        files=["docs/**/*.md"],
-        tests=["docs.test.py"]
-    ))
-    
-    return modules
+    return generate_template_modules(spec, "api")
 
 def generate_mobile_modules(spec: Dict[str, Any]) -> List[DevelopmentModule]:
     """Generate modules for mobile applications."""
-    modules = []
-    
-    # Core setup
-    modules.append(DevelopmentModule(
-        name="mobile-setup",
-        description="Set up React Native project",
-        type="mobile",
-        technologies=["react native", "typescript"],
-        dependencies=[],
-        estimated_complexity="low",
-        estimated_time="1 hour",
-        files=["package.json", "app.json", "tsconfig.json"],
-        tests=["setup.test.js"]
-    ))
-    
-    # Navigation
-    modules.append(DevelopmentModule(
-        name="navigation",
-        description="Implement app navigation",
-        type="mobile",
-        technologies=["react navigation"],
-        dependencies=["mobile-setup"],
-        estimated_complexity="medium",
-        estimated_time="1-2 hours",
-        files=["navigation/**/*.tsx"],
-        tests=["navigation.test.js"]
-    ))
-    
-    # Screens
-    modules.append(DevelopmentModule(
-        name="screens",
-        description="Create app screens",
-        type="mobile",
-        technologies=["react native"],
-        dependencies=["navigation"],
-        estimated_complexity="medium",
-        estimated_time="2-3 hours",
-        files=["screens/**/*.tsx"],
-        tests=["screens.test.js"]
-    ))
-    
-    # Components
-    modules.append(DevelopmentModule(
-        name="mobile-components",
-        description="Create reusable components",
-        type="mobile",
-        technologies=["react native"],
-        dependencies=["mobile-setup"],
-        estimated_complexity="medium",
-        estimated_time="2-3 hours",
-        files=["components/**/*.tsx"],
-        tests=["components.test.js"]
-    ))
-    
-    # State management
-    modules.append(DevelopmentModule(
-        name="state-management",
-        description="Implement state management",
-        type="mobile",
-        technologies=["redux", "zustand"],
-        dependencies=["screens"],
-        estimated_complexity="medium",
-        estimated_time="1-2 hours",
-        files=["store/**/*.ts"],
-        tests=["state.test.js"]
-    ))
-    
-    return modules
+    return generate_template_modules(spec, "mobile")
 
 def generate_library_modules(spec: Dict[str, Any]) -> List[DevelopmentModule]:
     """Generate modules for library projects."""
-    modules = []
+    return generate_template_modules(spec, "library")
+
+def build_development_plan(spec: Dict[str, Any]) -> DevelopmentPlan:
+    """Build a complete development plan for a spec, bypassing the plan cache."""
+    plan = DevelopmentPlan(spec)
+    
+    # Generate modules from the templates indexed for the project type;
+    # unknown types fall back to the rule file's default (web)
+    for module in generate_template_modules(spec):
+        plan.add_module(module)
+    
+    # Calculate execution order and total time
+    plan.calculate_execution_order()
+    plan.calculate_total_time()
+    return plan
+
+DEFAULT_PLAN_CACHE_DIR = os.path.join(os.path.dirname(DEFAULT_PLAN_PATH), "cache")
+
+_plan_caches: Dict[str, PlanCache] = {}
+_plan_caches_lock = threading.Lock()
+
+def get_plan_cache(directory: Optional[str] = None) -> PlanCache:
+    """Return the process-wide plan cache persisted in a directory, next to saved plans by default."""
+    directory = directory or DEFAULT_PLAN_CACHE_DIR
+    with _plan_caches_lock:
+        cache = _plan_caches.get(directory)
+        if cache is None:
+            cache = _plan_caches[directory] = PlanCache(directory=directory, saver=save_development_plan)
+        return cache
+
+def plan_development(spec: Dict[str, Any], use_cache: bool = True, cache_dir: Optional[str] = None) -> DevelopmentPlan:
+    """
+    Return the development plan for a spec, reusing a cached plan if possible.
     
-    # Core library setup
-    modules.append(DevelopmentModule(
-        name="library-setup",
-        description="Set up library project structure",
-        type="library",
-        technologies=["typescript"],
-        dependencies=[],
-        estimated_complexity="low",
-        estimated_time="30 minutes",
-        files=["package.json", "tsconfig.json", "rollup.config.js"],
-        tests=["setup.test.js"]
-    ))
+    Args:
+        spec: The normalized requirement specification
+        use_cache: Reuse a plan previously built for the same spec and templates
+        cache_dir: Directory of the plan cache, DEFAULT_PLAN_CACHE_DIR by default
+        
+    Returns:
+        The development plan
+    """
+    logger.info("Generating development plan for: %s", spec['title'])
+    
+    template_version = get_template_index().version
+    cache = get_plan_cache(cache_dir) if use_cache else None
     
-    # Core functionality
-    modules.append(DevelopmentModule(
-        name="core-functionality",
-        description="Implement core library functionality",
-        type="library",
-        technologies=["typescript"],
-        dependencies=["library-setup"],
-        estimated_complexity="medium",
-        estimated_time="2-3 hours",
-        files=["src/**/*.ts"],
-        tests=["core.test.js"]
-    ))
+    if cache is not None:
+        cached = cache.get(spec, template_version)
+        if cached is not None:
+            logger.info("Using cached development plan %s", cached['cache_key'])
+            return DevelopmentPlan.from_dict(cached)
     
-    # Types and interfaces
-    modules.append(DevelopmentModule(
-        name="types-interfaces",
-        description="Define types and interfaces",
-        type="library",
-        technologies=["typescript"],
-        dependencies=["library-setup"],
-        estimated_complexity="low",
-        estimated_time="1 hour",
-        files=["src/types/**/*.ts"],
-        tests=["types.test.js"]
-    ))
+    plan = build_development_plan(spec)
     
-    # Documentation
-    modules.append(DevelopmentModule(
-        name="library-docs",
-        description="Create library documentation",
-        type="documentation",
-        technologies=["markdown"],
-        dependencies=["core-functionality"],
-        estimated_complexity="low",
-        estimated_time="1-2 hours",
-        files=["docs/**/*.md", "README.md"],
-        tests=["docs.test.js"]
-    ))
+    logger.info("Generated %s modules with execution order: %s", len(plan.modules), plan.execution_order)
+    logger.info("Total estimated time: %s", plan.total_estimated_time)
     
-    # Tests
-    modules.append(DevelopmentModule(
-        name="library-tests",
-        description="Write comprehensive tests",
-        type="testing",
-        technologies=["jest", "typescript"],
-        dependencies=["core-functionality"],
-        estimated_complexity="medium",
-        estimated_time="2-3 hours",
-        files=["tests/**/*.test.ts"],
-        tests=["test.test.js"]
-    ))
+    if cache is not None:
+        cache.put(spec, template_version, plan.to_dict())
     
-    return modules
+    return plan
 
-def ai_plan_modules(spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+def ai_plan_modules(spec: Dict[str, Any], use_cache: bool = True) -> List[Dict[str, Any]]:
     """
     Generate a development plan based on the requirement specification.
     
     Args:
         spec: The normalized requirement specification
+        use_cache: Reuse a plan previously built for the same spec and templates
         
     Returns:
         List of module dictionaries
     """
-    logger.info(f"Generating development plan for: {spec['title']}")
-    
     try:
-        # Create development plan
-        plan = DevelopmentPlan(spec)
-        
-        # Generate modules based on project type
-        proj_type = spec["type"]
-        
-        if proj_type == "web":
-            modules = generate_web_modules(spec)
-        elif proj_type == "api":
-            modules = generate_api_modules(spec)
-        elif proj_type == "mobile":
-            modules = generate_mobile_modules(spec)
-        elif proj_type == "library":
-            modules = generate_library_modules(spec)
-        else:
-            # Default to web modules
-            modules = generate_web_modules(spec)
-        
-        # Add modules to plan
-        for module in modules:
-            plan.add_module(module)
-        
-        # Calculate execution order and total time
-        plan.calculate_execution_order()
-        plan.calculate_total_time()
-        
-        logger.info(f"Generated {len(modules)} modules with execution order: {plan.execution_order}")
-        logger.info(f"Total estimated time: {plan.total_estimated_time}")
+        plan = plan_development(spec, use_cache=use_cache)
         
         # Return modules as dictionaries
         return [m.to_dict() for m in plan.modules]
         
     except Exception as e:
-        logger.error(f"Failed to generate development plan: {e}")
+        logger.error("Failed to generate development plan: %s", e)
         # Return basic modules on error
         return [
             DevelopmentModule(
@@ -528,18 +290,17 @@ def ai_plan_modules(spec: Dict[str, Any]) -> List[Dict[str, Any]]:
             ).to_dict()
         ]
 
-def save_development_plan(plan: Dict[str, Any], filepath: str = "ai/plans/latest.json") -> None:
+def save_development_plan(plan: Dict[str, Any], filepath: str = DEFAULT_PLAN_PATH) -> None:
     """Save development plan to file."""
     try:
-        import os
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
         
         with open(filepath, 'w', encoding='utf-8') as f:
             json.dump(plan, f, indent=2, ensure_ascii=False)
         
-        logger.info(f"Development plan saved to {filepath}")
+        logger.info("Development plan saved to %s", filepath)
     except Exception as e:
-        logger.error(f"Failed to save development plan: {e}")
+        logger.error("Failed to save development plan: %s", e)
 
 if __name__ == "__main__":
     # Example usage
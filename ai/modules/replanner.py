@@ -0,0 +1,143 @@
+"""
+Incremental Replanning Module
+
+This module compares a previous development plan with the plan for an
+updated specification and works out which modules actually need to be
+redone: the added and changed modules plus everything downstream of them.
+"""
+
+import hashlib
+import json
+import logging
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+from .planner import DevelopmentModule, DevelopmentPlan, plan_development
+
+logger = logging.getLogger(__name__)
+
+Edge = Tuple[str, str]
+
+def module_signature(module: DevelopmentModule) -> str:
+    """Hash the fields of a module that affect what gets generated."""
+    data = module.to_dict()
+    data.pop("created_at", None)
+    payload = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def dependency_edges(plan: DevelopmentPlan) -> Set[Edge]:
+    """Return the plan's dependency edges as (dependency, dependent) pairs."""
+    return {(dep, m.name) for m in plan.modules for dep in m.dependencies}
+
+class PlanDiff:
+    """Differences between two development plans."""
+
+    def __init__(self,
+                 added: List[str],
+                 removed: List[str],
+                 changed: List[str],
+                 added_edges: List[Edge],
+                 removed_edges: List[Edge],
+                 dirty: List[str],
+                 clean: List[str]):
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+        self.added_edges = added_edges
+        self.removed_edges = removed_edges
+        self.dirty = dirty
+        self.clean = clean
+
+    @property
+    def is_empty(self) -> bool:
+        """Whether the new plan can reuse every module of the previous one."""
+        return not (self.added or self.removed or self.changed)
+
+    def is_dirty(self, module_name: str) -> bool:
+        """Whether a module of the new plan has to be reprocessed."""
+        return module_name in self.dirty
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert diff to dictionary."""
+        return {
+            "added": self.added,
+            "removed": self.removed,
+            "changed": self.changed,
+            "added_edges": [list(e) for e in self.added_edges],
+            "removed_edges": [list(e) for e in self.removed_edges],
+            "dirty": self.dirty,
+            "clean": self.clean
+        }
+
+def diff_plans(previous: DevelopmentPlan, current: DevelopmentPlan) -> PlanDiff:
+    """
+    Compute the difference between two plans.
+
+    Args:
+        previous: The plan the existing output was produced from
+        current: The plan for the updated specification
+
+    Returns:
+        PlanDiff whose ``dirty`` list holds, in execution order, every module
+        of ``current`` that is new, changed, or downstream of a change
+    """
+    old_modules = {m.name: m for m in previous.modules}
+    new_modules = {m.name: m for m in current.modules}
+
+    added = [name for name in new_modules if name not in old_modules]
+    removed = [name for name in old_modules if name not in new_modules]
+    changed = [
+        name for name, module in new_modules.items()
+        if name in old_modules and module_signature(module) != module_signature(old_modules[name])
+    ]
+
+    old_edges = dependency_edges(previous)
+    new_edges = dependency_edges(current)
+
+    # Propagate from every touched module to its transitive dependents
+    dependents: Dict[str, List[str]] = {}
+    for dep, name in new_edges:
+        dependents.setdefault(dep, []).append(name)
+
+    dirty: Set[str] = set()
+    stack = added + changed + removed
+    while stack:
+        name = stack.pop()
+        if name in new_modules:
+            if name in dirty:
+                continue
+            dirty.add(name)
+        stack.extend(dependents.get(name, ()))
+
+    order = current.execution_order or [m.name for m in current.modules]
+    return PlanDiff(
+        added=added,
+        removed=removed,
+        changed=changed,
+        added_edges=sorted(new_edges - old_edges),
+        removed_edges=sorted(old_edges - new_edges),
+        dirty=[name for name in order if name in dirty],
+        clean=[name for name in order if name not in dirty]
+    )
+
+def replan(previous: DevelopmentPlan, spec: Dict[str, Any], use_cache: bool = True,
+           cache_dir: Optional[str] = None) -> Tuple[DevelopmentPlan, PlanDiff]:
+    """
+    Plan an updated specification incrementally against a previous plan.
+
+    Args:
+        previous: The plan the existing output was produced from
+        spec: The updated normalized requirement specification
+        use_cache: Reuse a cached plan for ``spec`` when available
+        cache_dir: Directory of the plan cache
+
+    Returns:
+        Tuple of the new plan and its diff against ``previous``
+    """
+    current = plan_development(spec, use_cache=use_cache, cache_dir=cache_dir)
+    diff = diff_plans(previous, current)
+
+    logger.info(
+        "Replanned %s modules: %s added, %s removed, %s changed, %s dirty",
+        len(current.modules), len(diff.added), len(diff.removed), len(diff.changed), len(diff.dirty)
+    )
+    return current, diff
@@ -254,7 +254,7 @@ def normalize_requirement(requirement: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing the normalized specification
     """
-    logger.info(f"Normalizing requirement: {requirement[:100]}...")
+    logger.info("Normalizing requirement: %s...", requirement[:100])
     
     try:
         # Extract information from requirement
@@ -280,11 +280,11 @@ def normalize_requirement(requirement: str) -> Dict[str, Any]:
         # Generate acceptance criteria
         spec.acceptance_criteria = generate_acceptance_criteria(spec.to_dict())
         
-        logger.info(f"Requirement normalized successfully: {spec.title}")
+        logger.info("Requirement normalized successfully: %s", spec.title)
         return spec.to_dict()
         
     except Exception as e:
-        logger.error(f"Failed to normalize requirement: {e}")
+        logger.error("Failed to normalize requirement: %s", e)
         # Return basic specification on error
         return RequirementSpec(
             title="Unknown Requirement",
@@ -300,7 +300,7 @@ def validate_specification(spec: Dict[str, Any]) -> bool:
     
     for field in required_fields:
         if field not in spec or not spec[field]:
-            logger.error(f"Missing required field in specification: {field}")
+            logger.error("Missing required field in specification: %s", field)
             return False
     
     return True
@@ -314,9 +314,9 @@ def save_specification(spec: Dict[str, Any], filepath: str = "ai/specifications/
         with open(filepath, 'w', encoding='utf-8') as f:
             json.dump(spec, f, indent=2, ensure_ascii=False)
         
-        logger.info(f"Specification saved to {filepath}")
+        logger.info("Specification saved to %s", filepath)
     except Exception as e:
-        logger.error(f"Failed to save specification: {e}")
+        logger.error("Failed to save specification: %s", e)
 
 if __name__ == "__main__":
     # Example usage
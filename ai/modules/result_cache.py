@@ -0,0 +1,227 @@
+"""
+Result Cache Module
+
+This module remembers the outcome of module test runs. Results are keyed
+by a hash of the module's code, the content of its test files and the
+code of the modules it depends on, so a rerun with nothing relevant
+changed can reuse the recorded pass/fail instead of executing the tests
+again. Test entries are paths or globs resolved against the output tree;
+a run whose tests match no file cannot be keyed and is never cached.
+Entries are evicted by age, then least recently used first while the
+stored results exceed a byte budget or a number of entries.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+from .file_ownership import FileTreeIndex
+from .merkle_tree import hash_file
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEST_CACHE_PATH = "ai/data/test_cache.db"
+DEFAULT_TEST_CACHE_MAX_ENTRIES = 20000
+DEFAULT_TEST_CACHE_MAX_AGE_DAYS = 14
+DEFAULT_TEST_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Longest failure output kept per entry
+MAX_ERROR_CHARS = 8000
+
+def _hash_test(test: str, root: str, tree: FileTreeIndex) -> Optional[str]:
+    """
+    Hash the content of the files a test entry names, a path or a glob.
+
+    Returns None when no file matches or one cannot be read: a test whose
+    content is unknown must not share a key with another version of it.
+    """
+    paths = [test] if os.path.isfile(os.path.join(root, test)) else tree.expand(test)
+    if not paths:
+        return None
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        try:
+            digest.update(f"{path}\0{hash_file(os.path.join(root, path))}\n".encode("utf-8"))
+        except OSError:
+            return None
+    return digest.hexdigest()
+
+def test_result_key(code: str,
+                    tests: List[str],
+                    dependency_code: Optional[Dict[str, str]] = None,
+                    root: str = ".",
+                    salt: Any = None,
+                    tree: Optional[FileTreeIndex] = None) -> Optional[str]:
+    """
+    Return the cache key of a test run, or None if it cannot be cached.
+
+    Args:
+        code: Module code under test
+        tests: Test files or test names of the module
+        dependency_code: Code of each dependency, by module name
+        root: Directory test paths are relative to
+        salt: Anything else the outcome depends on, e.g. module type
+        tree: Index of ``root`` to expand test globs with; pass one index
+            for all keys of a pass instead of walking the tree every call
+
+    Returns:
+        Hex digest identifying the inputs of the run; None when a test
+        matches no readable file under ``root``
+    """
+    if tree is None:
+        tree = FileTreeIndex(root)
+    test_hashes = []
+    for test in tests:
+        test_hash = _hash_test(test, root, tree)
+        if test_hash is None:
+            logger.debug("Test %s matches no file under %s; result is not cacheable", test, root)
+            return None
+        test_hashes.append([test, test_hash])
+    parts = {
+        "code": hashlib.sha256(code.encode("utf-8")).hexdigest(),
+        "tests": test_hashes,
+        "dependencies": {
+            name: hashlib.sha256((dep_code or "").encode("utf-8")).hexdigest()
+            for name, dep_code in sorted((dependency_code or {}).items())
+        },
+        "salt": salt
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def entry_size(key: str, module: Optional[str], error: Optional[str]) -> int:
+    """Approximate bytes a stored result takes: its text plus the fixed-size columns."""
+    return len(key) + len((module or "").encode("utf-8")) + len((error or "").encode("utf-8")) + 40
+
+class TestResultCache:
+    """SQLite store of test outcomes by input hash."""
+
+    def __init__(self, filepath: str = DEFAULT_TEST_CACHE_PATH,
+                 max_entries: int = DEFAULT_TEST_CACHE_MAX_ENTRIES,
+                 max_age_days: float = DEFAULT_TEST_CACHE_MAX_AGE_DAYS,
+                 max_bytes: int = DEFAULT_TEST_CACHE_MAX_BYTES):
+        self.filepath = filepath
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS test_results (
+                    key TEXT PRIMARY KEY,
+                    module TEXT,
+                    passed INTEGER NOT NULL,
+                    error TEXT,
+                    seconds REAL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL,
+                    size INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(test_results)")}
+            if "size" not in columns:
+                conn.execute("ALTER TABLE test_results ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS test_results_last_used ON test_results (last_used_at)")
+        self.evict()
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.filepath, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def lookup(self, key: str) -> Optional[Tuple[bool, Optional[str]]]:
+        """Return the recorded ``(passed, error)`` for a key, or None."""
+        try:
+            with self._connection() as conn:
+                row = conn.execute("SELECT passed, error FROM test_results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE test_results SET last_used_at = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.Error as e:
+            logger.warning("Test cache lookup failed: %s", e)
+            return None
+        with self._stats_lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if row is None:
+            return None
+        return bool(row[0]), row[1]
+
+    def store(self, key: str, passed: bool, error: Optional[str] = None,
+              seconds: Optional[float] = None, module: Optional[str] = None) -> None:
+        """Record the outcome of a test run."""
+        now = time.time()
+        error = (error or "")[:MAX_ERROR_CHARS] or None
+        size = entry_size(key, module, error)
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO test_results "
+                    "(key, module, passed, error, seconds, created_at, last_used_at, size) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, module, int(passed), error, seconds, now, now, size)
+                )
+        except sqlite3.Error as e:
+            logger.warning("Failed to store test result for %s: %s", module or key[:12], e)
+
+    def evict(self) -> int:
+        """
+        Drop entries unused for longer than the maximum age, then the least
+        recently used ones beyond the maximum number of entries or while
+        the stored results exceed the byte budget.
+
+        Returns:
+            Number of entries removed
+        """
+        try:
+            with self._connection() as conn:
+                removed = conn.execute(
+                    "DELETE FROM test_results WHERE last_used_at < ?", (time.time() - self.max_age,)
+                ).rowcount
+                removed += conn.execute(
+                    "DELETE FROM test_results WHERE key IN ("
+                    "SELECT key FROM test_results ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                ).rowcount
+                # Keep the most recently used entries that fit in the budget
+                removed += conn.execute(
+                    "DELETE FROM test_results WHERE key IN ("
+                    "SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY last_used_at DESC, key) AS total "
+                    "FROM test_results) WHERE total > ?)",
+                    (self.max_bytes,)
+                ).rowcount
+        except sqlite3.Error as e:
+            logger.warning("Test cache eviction failed: %s", e)
+            return 0
+        if removed:
+            logger.info("Evicted %s test cache entries", removed)
+        return removed
+
+    def size(self) -> int:
+        """Approximate bytes of all stored results."""
+        try:
+            with self._connection() as conn:
+                return conn.execute("SELECT COALESCE(SUM(size), 0) FROM test_results").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.warning("Test cache size query failed: %s", e)
+            return 0
+
+    def stats(self) -> Dict[str, int]:
+        """Hits and misses of this instance."""
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,333 @@
+"""
+Static Check Module
+
+This module rejects obviously broken generated code before any tests run.
+Python is compiled in-process, TS/TSX/JS is scanned for unbalanced
+brackets, strings and comments, and JSON is parsed. A module's language
+comes from its name, planned files or technologies; modules whose
+language cannot be told are not checked. Relative imports are
+checked against the files the plan will produce and the files already in
+the output tree. Each problem is reported with its file, line and column
+so it can be handed straight to the fix step.
+"""
+
+import fnmatch
+import json
+import logging
+import os
+import re
+from typing import Dict, List, Optional, Iterable, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs")
+
+# Extension a module's generated code is saved with, by language
+LANGUAGE_EXTENSIONS = {"python": ".py", "typescript": ".ts", "tsx": ".tsx"}
+
+# Technologies implying a language, most specific first
+TECHNOLOGY_LANGUAGES = (
+    ("tsx", {"react", "nextjs", "next.js", "shadcn", "shadcn/ui"}),
+    ("typescript", {"typescript", "nextauth", "prisma", "node", "nodejs", "express"}),
+    ("python", {"python", "fastapi", "django", "flask", "sqlalchemy", "pydantic"})
+)
+
+_BRACKETS = {"(": ")", "[": "]", "{": "}"}
+_CLOSERS = {v: k for k, v in _BRACKETS.items()}
+
+# Words after which a quote or slash starts a literal rather than JSX text or division
+_EXPRESSION_KEYWORDS = {"return", "case", "typeof", "in", "of", "yield", "await", "export", "import", "from",
+                        "default", "else", "new", "delete", "void", "throw"}
+_EXPRESSION_CHARS = set("=(,:[!&|?{};+-*%<>~^")
+
+_TS_IMPORT = re.compile(
+    r"""(?:^|[;\s])(?:import|export)\b[^'"`;]*?\bfrom\s*(['"])(?P<from>[^'"]+)\1"""
+    r"""|(?:^|[;\s])import\s*(['"])(?P<bare>[^'"]+)\3"""
+    r"""|\b(?:require|import)\(\s*(['"])(?P<call>[^'"]+)\5\s*\)""",
+    re.MULTILINE
+)
+_PY_RELATIVE_IMPORT = re.compile(r"^\s*from\s+(\.+)([\w.]*)\s+import\s+(.+)$", re.MULTILINE)
+
+class CheckProblem:
+    """A static problem at a position in a file."""
+
+    def __init__(self, path: str, line: int, column: int, message: str, source_line: str = ""):
+        self.path = path
+        self.line = line
+        self.column = column
+        self.message = message
+        self.source_line = source_line
+
+    def __str__(self) -> str:
+        text = f"{self.path}:{self.line}:{self.column}: {self.message}"
+        if self.source_line.strip():
+            text += f"\n    {self.source_line.rstrip()}\n    {' ' * max(self.column - 1, 0)}^"
+        return text
+
+    def to_dict(self) -> dict:
+        return {"path": self.path, "line": self.line, "column": self.column, "message": self.message}
+
+def _extension_language(path: str) -> Optional[str]:
+    if path.endswith((".tsx", ".jsx")):
+        return "tsx"
+    if path.endswith(SCRIPT_EXTENSIONS):
+        return "typescript"
+    if path.endswith(".py"):
+        return "python"
+    return None
+
+def module_language(name: str, technologies: Iterable[str] = (), files: Iterable[str] = ()) -> Optional[str]:
+    """
+    Return the language of a module's generated code: "python", "typescript" or "tsx".
+
+    A file extension in the module name wins, then the module's
+    technologies, then the extensions of its planned files, TSX before TS
+    before Python.
+
+    Returns:
+        The language, or None when nothing tells it
+    """
+    language = _extension_language(name)
+    if language is not None:
+        return language
+    lowered = {technology.lower() for technology in technologies}
+    for language, names in TECHNOLOGY_LANGUAGES:
+        if lowered & names:
+            return language
+    found = {_extension_language(path) for path in files}
+    for language in ("tsx", "typescript", "python"):
+        if language in found:
+            return language
+    return None
+
+def _position(source: str, index: int) -> Tuple[int, int, str]:
+    line = source.count("\n", 0, index) + 1
+    start = source.rfind("\n", 0, index) + 1
+    end = source.find("\n", index)
+    return line, index - start + 1, source[start:end if end >= 0 else len(source)]
+
+def check_python(source: str, path: str) -> List[CheckProblem]:
+    """Compile Python source without executing it."""
+    try:
+        compile(source, path, "exec", dont_inherit=True)
+    except SyntaxError as e:
+        return [CheckProblem(path, e.lineno or 1, e.offset or 1, f"SyntaxError: {e.msg}", e.text or "")]
+    except ValueError as e:
+        return [CheckProblem(path, 1, 1, f"ValueError: {e}")]
+    return []
+
+def _starts_expression(source: str, index: int) -> bool:
+    """Whether position ``index`` is where an expression may begin."""
+    position = index - 1
+    while position >= 0 and source[position] in " \t\r\n":
+        position -= 1
+    if position < 0 or source[position] in _EXPRESSION_CHARS:
+        return True
+    end = position + 1
+    while position >= 0 and (source[position].isalnum() or source[position] in "_$"):
+        position -= 1
+    return source[position + 1:end] in _EXPRESSION_KEYWORDS
+
+def check_script(source: str, path: str) -> List[CheckProblem]:
+    """
+    Scan TS/TSX/JS for unbalanced brackets and unterminated strings or comments.
+
+    This is not a parser. A quote or slash only starts a literal where an
+    expression can start, so apostrophes in JSX text, division and closing
+    tags are not mistaken for strings or regular expressions.
+    """
+    stack: List[Tuple[str, int]] = []
+    # Template literals nest: each entry is the bracket depth its ${ opened at
+    templates: List[int] = []
+    jsx = path.endswith((".tsx", ".jsx"))
+    i, length = 0, len(source)
+
+    def problem(index: int, message: str) -> List[CheckProblem]:
+        line, column, text = _position(source, index)
+        return [CheckProblem(path, line, column, message, text)]
+
+    while i < length:
+        char = source[i]
+        if char == "/" and source.startswith("//", i):
+            end = source.find("\n", i)
+            i = length if end < 0 else end
+            continue
+        if char == "/" and source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            if end < 0:
+                return problem(i, "unterminated comment")
+            i = end + 2
+            continue
+        if char in "'\"" and (not jsx or _starts_expression(source, i)):
+            j = i + 1
+            while j < length and source[j] != char:
+                if source[j] == "\\":
+                    j += 1
+                elif source[j] == "\n":
+                    return problem(i, "unterminated string literal")
+                j += 1
+            if j >= length:
+                return problem(i, "unterminated string literal")
+            i = j + 1
+            continue
+        if char == "`" or (char == "}" and templates and templates[-1] == len(stack)):
+            if char == "}":
+                templates.pop()
+            j = i + 1
+            while j < length and source[j] != "`":
+                if source[j] == "\\":
+                    j += 1
+                elif source.startswith("${", j):
+                    break
+                j += 1
+            if j >= length:
+                return problem(i, "unterminated template literal")
+            if source[j] == "`":
+                i = j + 1
+            else:
+                templates.append(len(stack))
+                i = j + 2
+            continue
+        if char == "/" and _starts_expression(source, i) and not (jsx and source[:i].rstrip().endswith("<")):
+            # Regular expression literal; in JSX "</" closes a tag instead
+            j = i + 1
+            in_class = False
+            while j < length and (in_class or source[j] != "/"):
+                if source[j] == "\\":
+                    j += 1
+                elif source[j] == "[":
+                    in_class = True
+                elif source[j] == "]":
+                    in_class = False
+                elif source[j] == "\n":
+                    break
+                j += 1
+            if j < length and source[j] == "/":
+                i = j + 1
+                continue
+        if char in _BRACKETS:
+            stack.append((char, i))
+        elif char in _CLOSERS:
+            if not stack:
+                return problem(i, f"unexpected '{char}'")
+            opening, index = stack.pop()
+            if opening != _CLOSERS[char]:
+                line, column, _ = _position(source, index)
+                return problem(i, f"expected '{_BRACKETS[opening]}' to close '{opening}' at {line}:{column}, found '{char}'")
+        i += 1
+
+    if templates:
+        return problem(length - 1, "unterminated template literal")
+    if stack:
+        opening, index = stack[-1]
+        return problem(index, f"'{opening}' is never closed")
+    return []
+
+def check_json(source: str, path: str) -> List[CheckProblem]:
+    """Parse JSON."""
+    try:
+        json.loads(source)
+    except json.JSONDecodeError as e:
+        _, _, text = _position(source, e.pos)
+        return [CheckProblem(path, e.lineno, e.colno, f"invalid JSON: {e.msg}", text)]
+    return []
+
+def _stem(path: str) -> str:
+    base = os.path.basename(path.rstrip("/"))
+    for extension in SCRIPT_EXTENSIONS + (".py", ".json", ".d.ts"):
+        if base.endswith(extension):
+            return base[:-len(extension)]
+    return base
+
+class ImportResolver:
+    """
+    Decides whether a relative import names a file anyone will produce.
+
+    Resolution is by file stem within the importing language (Python
+    imports only match ``.py`` files), so it accepts path aliases and index
+    files it cannot follow exactly; it only rejects imports of names that
+    no planned or existing file has.
+    """
+
+    def __init__(self, paths: Iterable[str]):
+        self.stems: Dict[str, Set[str]] = {"python": set(), "script": set()}
+        self.patterns: Dict[str, List[str]] = {"python": [], "script": []}
+        for path in paths:
+            path = path.replace("\\", "/")
+            stem = _stem(path)
+            language = "python" if path.endswith(".py") else "script"
+            if any(c in stem for c in "*?["):
+                self.patterns[language].append(stem)
+            else:
+                self.stems[language].update((stem, stem.replace("-", "_")))
+            # Directory names resolve index files and Python packages
+            directories = [part for part in path.split("/")[:-1] if part and not any(c in part for c in "*?[")]
+            for stems in self.stems.values():
+                stems.update(directories)
+
+    def resolves(self, target: str, language: str = "script") -> bool:
+        stem = _stem(target)
+        if stem in ("", ".", "..", "index") or stem in self.stems[language]:
+            return True
+        return any(fnmatch.fnmatch(stem, pattern) for pattern in self.patterns[language])
+
+def check_imports(source: str, path: str, resolver: ImportResolver) -> List[CheckProblem]:
+    """Report relative imports that no planned or existing file provides."""
+    problems = []
+    if path.endswith(".py"):
+        for match in _PY_RELATIVE_IMPORT.finditer(source):
+            module = match.group(2)
+            targets = [module.split(".")[-1]] if module else [
+                name.strip().split(" as ")[0].strip("() ") for name in match.group(3).split(",")
+            ]
+            for target in targets:
+                if target and not resolver.resolves(target, "python"):
+                    line, column, text = _position(source, match.start(2) if module else match.start(3))
+                    problems.append(CheckProblem(
+                        path, line, column,
+                        f"cannot resolve import '{match.group(1)}{module or target}': "
+                        f"no module in the plan or output tree is named '{target}'", text
+                    ))
+    elif path.endswith(SCRIPT_EXTENSIONS):
+        for match in _TS_IMPORT.finditer(source):
+            spec = match.group("from") or match.group("bare") or match.group("call")
+            if not spec.startswith((".", "@/", "~/")) or resolver.resolves(spec):
+                continue
+            key = "from" if match.group("from") else "bare" if match.group("bare") else "call"
+            line, column, text = _position(source, match.start(key))
+            problems.append(CheckProblem(
+                path, line, column,
+                f"cannot resolve import '{spec}': no file in the plan or output tree is named '{_stem(spec)}'", text
+            ))
+    return problems
+
+class StaticChecker:
+    """Syntax and import checks for one pipeline run."""
+
+    def __init__(self, known_paths: Optional[Iterable[str]] = None, check_imports: bool = True):
+        """
+        Args:
+            known_paths: Files the plan produces and files already in the
+                output tree; relative imports must resolve to one of them
+            check_imports: Whether to check relative imports at all
+        """
+        self.resolver = ImportResolver(known_paths or []) if check_imports else None
+
+    def check(self, code: str, path: str, language: Optional[str] = None) -> List[CheckProblem]:
+        """
+        Return the problems found in ``code`` saved at ``path``.
+
+        ``language`` overrides the one implied by the path's extension.
+        """
+        language = language or _extension_language(path)
+        if language == "python":
+            problems = check_python(code, path)
+        elif language in ("typescript", "tsx"):
+            problems = check_script(code, path)
+        elif path.endswith(".json"):
+            problems = check_json(code, path)
+        else:
+            problems = []
+        if not problems and self.resolver is not None:
+            problems = check_imports(code, path, self.resolver)
+        return problems
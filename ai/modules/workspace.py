@@ -0,0 +1,318 @@
+"""
+Workspace Module
+
+This module gives every pipeline run its own workspace. A workspace is
+materialized from the currently published output tree using reflinks, so
+creating it is cheap where the filesystem supports copy-on-write, and falls
+back to plain copies elsewhere. Hardlinks are faster still but share inodes
+with the published tree, so they are only safe when nothing in the run
+writes files in place. A finished workspace is published by atomically
+pointing the output path at it, unless another run published since this
+one started. Failed workspaces are kept for inspection, a few at a time.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Optional, Iterator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKSPACE_ROOT = "ai/workspaces"
+DEFAULT_LINK_MODE = "reflink"
+DEFAULT_KEEP_RELEASES = 3
+DEFAULT_KEEP_FAILED = 3
+
+# Directories shared read-only by every workspace through a symlink; they
+# live in <root>/shared so pruning old releases never deletes them
+SHARED_DIRECTORIES = {"node_modules"}
+
+LINK_MODES = ("reflink", "hardlink", "copy")
+
+# ioctl request cloning a file's extents on Linux (btrfs, xfs, ...)
+_FICLONE = 0x40049409
+
+# renameat2 flag swapping two paths atomically on Linux
+_RENAME_EXCHANGE = 2
+_AT_FDCWD = -100
+
+_promote_lock = threading.Lock()
+
+class PublishConflict(Exception):
+    """Another run published the output tree after this workspace was created from it."""
+
+def new_run_id() -> str:
+    """Return a unique, time-sortable run identifier."""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+def _reflink(source: str, target: str) -> None:
+    import fcntl
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+    shutil.copystat(source, target)
+
+def link_file(source: str, target: str, mode: str = DEFAULT_LINK_MODE) -> str:
+    """
+    Materialize ``source`` at ``target`` as cheaply as the filesystem allows.
+
+    Falls back to a plain copy when the method is not supported; a failed
+    reflink never falls back to a hardlink, which would share the inode.
+    Returns the method used.
+    """
+    methods = (mode, "copy") if mode != "copy" else ("copy",)
+    for method in methods:
+        try:
+            if method == "reflink":
+                _reflink(source, target)
+            elif method == "hardlink":
+                os.link(source, target)
+            else:
+                shutil.copy2(source, target)
+            return method
+        except (OSError, ImportError) as e:
+            if method == "copy":
+                raise
+            if os.path.lexists(target):
+                os.remove(target)
+            logger.debug("%s of %s failed (%s), falling back", method, source, e)
+    return "copy"
+
+def materialize_tree(base: str, target: str, mode: str = DEFAULT_LINK_MODE) -> int:
+    """
+    Recreate the tree under ``base`` at ``target`` with links instead of copies.
+
+    Shared directories become symlinks to the real directory behind them,
+    never to a path through ``base``, which may itself be a symlink that
+    will later point at ``target``.
+
+    Returns:
+        Number of files materialized
+    """
+    os.makedirs(target, exist_ok=True)
+    if not os.path.isdir(base):
+        return 0
+    count = 0
+    for directory, subdirectories, filenames in os.walk(base):
+        relative = os.path.relpath(directory, base)
+        destination = target if relative == "." else os.path.join(target, relative)
+        for name in list(subdirectories):
+            if name in SHARED_DIRECTORIES:
+                os.symlink(os.path.realpath(os.path.join(directory, name)), os.path.join(destination, name))
+                subdirectories.remove(name)
+            else:
+                os.makedirs(os.path.join(destination, name), exist_ok=True)
+        for name in filenames:
+            source = os.path.join(directory, name)
+            if os.path.islink(source):
+                os.symlink(os.readlink(source), os.path.join(destination, name))
+            else:
+                # Once a method fails for one file it will fail for the rest
+                mode = link_file(source, os.path.join(destination, name), mode)
+            count += 1
+    return count
+
+def _exchange(a: str, b: str) -> bool:
+    """Atomically swap two paths with renameat2; False where unsupported."""
+    libc_name = ctypes.util.find_library("c")
+    if not libc_name:
+        return False
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    if not hasattr(libc, "renameat2"):
+        return False
+    result = libc.renameat2(_AT_FDCWD, os.fsencode(a), _AT_FDCWD, os.fsencode(b), _RENAME_EXCHANGE)
+    if result != 0:
+        err = ctypes.get_errno()
+        if err in (errno.ENOSYS, errno.EINVAL, errno.EXDEV):
+            return False
+        raise OSError(err, os.strerror(err), a)
+    return True
+
+@contextmanager
+def _publish_lock(root: str) -> Iterator[None]:
+    """Serialize promotions across threads and, where flock exists, processes."""
+    with _promote_lock:
+        with open(os.path.join(root, ".promote.lock"), "a") as lock_file:
+            try:
+                import fcntl
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            except ImportError:
+                pass
+            yield
+
+def _version(path: str) -> Optional[str]:
+    """The tree currently published at ``path``: its real location, None if absent."""
+    return os.path.realpath(path) if os.path.lexists(path) else None
+
+def _oldest_first(directory: str) -> List[str]:
+    """Entries of ``directory`` by modification time; run ids only order to the second."""
+    entries = []
+    for name in os.listdir(directory):
+        try:
+            entries.append((os.lstat(os.path.join(directory, name)).st_mtime, name))
+        except OSError:
+            continue
+    return [name for _, name in sorted(entries)]
+
+class RunWorkspace:
+    """An isolated output tree for one pipeline run."""
+
+    def __init__(self, publish_dir: str, root: str = DEFAULT_WORKSPACE_ROOT,
+                 run_id: Optional[str] = None, link_mode: str = DEFAULT_LINK_MODE):
+        """
+        Args:
+            publish_dir: Output path the finished tree is published at
+            root: Directory holding workspaces, published releases and shared directories
+            run_id: Run identifier, generated when omitted
+            link_mode: "reflink", "hardlink" or "copy"; "hardlink" shares
+                inodes with the published tree and is only safe when every
+                writer replaces files instead of modifying them
+        """
+        if link_mode not in LINK_MODES:
+            raise ValueError(f"Unknown link mode: {link_mode}")
+        self.publish_dir = publish_dir
+        self.root = root
+        self.run_id = run_id or new_run_id()
+        self.link_mode = link_mode
+        self.path = os.path.join(root, "runs", self.run_id)
+        self.base_version: Optional[str] = None
+        self.published = False
+        self.failed = False
+
+    def create(self) -> 'RunWorkspace':
+        """Materialize the currently published tree as this run's workspace."""
+        os.makedirs(self.root, exist_ok=True)
+        with _publish_lock(self.root):
+            self._share_directories()
+            # Promotion refuses to publish over a tree other than this one
+            self.base_version = _version(self.publish_dir)
+            count = materialize_tree(self.publish_dir, self.path, self.link_mode)
+        logger.info("Workspace %s created from %s (%s files)", self.path, self.publish_dir, count)
+        return self
+
+    def _share_directories(self) -> None:
+        """
+        Move real shared directories of the published tree to ``<root>/shared``.
+
+        Left in place they would end up inside a release and be deleted when
+        that release is pruned, while newer workspaces still link to them.
+        """
+        for name in SHARED_DIRECTORIES:
+            path = os.path.join(self.publish_dir, name)
+            if os.path.islink(path) or not os.path.isdir(path):
+                continue
+            shared_root = os.path.join(self.root, "shared")
+            os.makedirs(shared_root, exist_ok=True)
+            shared = os.path.join(shared_root, name)
+            if os.path.lexists(shared):
+                shared = os.path.join(shared_root, f"{name}.{self.run_id}")
+            os.rename(path, shared)
+            os.symlink(os.path.abspath(shared), path)
+
+    def promote(self, keep: int = DEFAULT_KEEP_RELEASES) -> str:
+        """
+        Atomically publish the workspace at ``publish_dir``.
+
+        The workspace moves to ``<root>/releases/<output>/<run_id>``, where
+        ``<output>`` names ``publish_dir``, and ``publish_dir``
+        becomes a symlink to it, replaced in a single rename. A plain directory
+        at ``publish_dir`` is first swapped out with renameat2 where available.
+
+        Args:
+            keep: Published releases to keep, including this one
+
+        Returns:
+            The release directory
+
+        Raises:
+            PublishConflict: If another run published since this workspace was created
+        """
+        # Output trees sharing a root prune only their own releases
+        publish_path = os.path.abspath(self.publish_dir)
+        digest = hashlib.sha1(publish_path.encode("utf-8")).hexdigest()[:8]
+        releases = os.path.join(self.root, "releases", f"{os.path.basename(publish_path)}-{digest}")
+        os.makedirs(releases, exist_ok=True)
+        release = os.path.join(releases, self.run_id)
+        with _publish_lock(self.root):
+            current = _version(self.publish_dir)
+            if current != self.base_version:
+                raise PublishConflict(
+                    f"{self.publish_dir} now points at {current}, not {self.base_version}, "
+                    "the tree this workspace was created from"
+                )
+            os.rename(self.path, release)
+            # Stamp the release so pruning goes by publication order
+            os.utime(release)
+            self.path = release
+            self._publish(release, releases)
+            self.published = True
+            self._prune(releases, keep)
+        logger.info("Published %s at %s", release, self.publish_dir)
+        return release
+
+    def _publish(self, release: str, releases: str) -> None:
+        """Point ``publish_dir`` at ``release`` with a single atomic rename."""
+        target = os.path.abspath(release)
+        parent = os.path.dirname(os.path.abspath(self.publish_dir))
+        os.makedirs(parent, exist_ok=True)
+        link = os.path.join(parent, f".{os.path.basename(self.publish_dir)}.{self.run_id}.link")
+        os.symlink(target, link)
+
+        if os.path.isdir(self.publish_dir) and not os.path.islink(self.publish_dir):
+            # First promotion over a real directory: keep it as a release
+            legacy = os.path.join(releases, f"{self.run_id}.previous")
+            if _exchange(link, self.publish_dir):
+                # The old directory now sits at the temporary link path
+                os.rename(link, legacy)
+            else:
+                logger.warning("Atomic exchange unsupported, replacing %s with two renames", self.publish_dir)
+                os.rename(self.publish_dir, legacy)
+                os.rename(link, self.publish_dir)
+        else:
+            os.replace(link, self.publish_dir)
+
+    def _prune(self, releases: str, keep: int) -> None:
+        current = os.path.realpath(self.publish_dir)
+        entries = _oldest_first(releases)
+        for name in entries[:max(len(entries) - keep, 0)]:
+            path = os.path.join(releases, name)
+            if os.path.islink(path):
+                os.remove(path)
+            elif os.path.realpath(path) != current:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def fail(self, keep: int = DEFAULT_KEEP_FAILED) -> str:
+        """
+        Set an unpublished workspace aside in ``<root>/failed`` for inspection.
+
+        Only the ``keep`` most recent failed workspaces are kept.
+
+        Returns:
+            The workspace's new location
+        """
+        if self.published or self.failed:
+            return self.path
+        failed = os.path.join(self.root, "failed")
+        os.makedirs(failed, exist_ok=True)
+        destination = os.path.join(failed, self.run_id)
+        if os.path.isdir(self.path):
+            os.rename(self.path, destination)
+            os.utime(destination)
+        self.path = destination
+        self.failed = True
+        entries = _oldest_first(failed)
+        for name in entries[:max(len(entries) - keep, 0)]:
+            shutil.rmtree(os.path.join(failed, name), ignore_errors=True)
+        return self.path
+
+    def discard(self) -> None:
+        """Delete an unpublished workspace."""
+        if not self.published:
+            shutil.rmtree(self.path, ignore_errors=True)
@@ -0,0 +1,83 @@
+"""
+Make the ``ai`` package importable when pytest runs from any directory.
+
+The orchestrator modules in ``ai/core`` import their stages relative to the
+deployed package (``.modules.*``, ``.utils.*``), where the model, test
+runner, integration, report and GitHub stages live alongside the modules in
+this tree. The ``stage_stubs`` fixture maps ``ai.core.modules`` and
+``ai.core.utils`` onto ``ai/modules`` and ``ai/utils`` and stands in for the
+stages that are not in the tree, so the ``pipeline``, ``worker`` and
+``simulation`` fixtures import the real orchestrator.
+"""
+
+import importlib
+import os
+import sys
+import types
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+class StageNotAvailable(RuntimeError):
+    """A stage without an implementation in this tree was called; pass it in PipelineStages."""
+
+def _unavailable(name):
+    def stage(*args, **kwargs):
+        raise StageNotAvailable(f"{name} is not available in tests; pass it to PipelineStages")
+    stage.__name__ = name
+    return stage
+
+# Stage modules of the deployed package that are not part of this tree
+STUB_MODULES = {
+    "ai.core.modules.code_generator": ["ai_generate_code"],
+    "ai.core.modules.test_runner": ["run_tests", "get_last_error"],
+    "ai.core.modules.code_fixer": ["ai_fix_code"],
+    "ai.core.modules.integrator": ["integrate_modules"],
+    "ai.core.modules.e2e_tester": ["run_e2e_tests"],
+    "ai.core.modules.reporter": ["generate_report"],
+    "ai.core.modules.github_pusher": ["push_github"]
+}
+
+def _package(name, path):
+    package = sys.modules.get(name)
+    if package is None:
+        package = types.ModuleType(name)
+        package.__path__ = [path]
+        sys.modules[name] = package
+    return package
+
+def _load_config(path):
+    raise StageNotAvailable("load_config is not available in tests; pass config to the pipeline")
+
+@pytest.fixture(scope="session")
+def stage_stubs():
+    """Install the deployed package layout over this tree; returns the stubbed module names."""
+    importlib.import_module("ai.core")
+    _package("ai.core.modules", os.path.join(ROOT, "ai", "modules"))
+    _package("ai.core.utils", os.path.join(ROOT, "ai", "utils"))
+    for name, functions in STUB_MODULES.items():
+        if name not in sys.modules:
+            module = types.ModuleType(name)
+            for function in functions:
+                setattr(module, function, _unavailable(function))
+            sys.modules[name] = module
+    if "ai.core.utils.config" not in sys.modules:
+        config = types.ModuleType("ai.core.utils.config")
+        config.load_config = _load_config
+        sys.modules["ai.core.utils.config"] = config
+    return sorted(STUB_MODULES) + ["ai.core.utils.config"]
+
+@pytest.fixture(scope="session")
+def pipeline(stage_stubs):
+    return importlib.import_module("ai.core.pipeline")
+
+@pytest.fixture(scope="session")
+def worker(stage_stubs):
+    return importlib.import_module("ai.core.worker")
+
+@pytest.fixture(scope="session")
+def simulation(stage_stubs):
+    return importlib.import_module("ai.core.simulation")
@@ -0,0 +1,85 @@
+import gc
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from ai.utils.ai_gateway import AIGateway, TokenBucket, get_ai_gateway
+from ai.utils.stub_model_server import StubModelClient, StubModelServer
+
+def module(name, description="small module"):
+    return SimpleNamespace(name=name, description=description, type="frontend", technologies=["react"],
+                           dependencies=[], files=[], tests=[], dependency_context="", code="",
+                           to_dict=lambda: {"name": name, "description": description})
+
+@pytest.fixture
+def server():
+    with StubModelServer(latency=0.2) as stub:
+        yield stub
+
+def test_identical_concurrent_requests_reach_the_server_once(server):
+    client = StubModelClient(server.url)
+    gateway = AIGateway(client.generate, client.fix)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: gateway.generate(module("frontend-setup")), range(8)))
+
+    assert results == ["// generated for frontend-setup\n"] * 8
+    assert server.requests["generate"] == 1
+    assert gateway.stats["coalesced"] == 7
+
+def test_rate_limit_keeps_a_throttling_server_happy():
+    with StubModelServer(latency=0.0, max_requests_per_second=5) as stub:
+        client = StubModelClient(stub.url)
+        gateway = AIGateway(client.generate, client.fix, rate=4.0, burst=1.0)
+        started = time.monotonic()
+        for i in range(6):
+            gateway.generate(module(f"module-{i}"))
+        elapsed = time.monotonic() - started
+
+    assert stub.throttled == 0
+    assert stub.requests["generate"] == 6
+    # One call at once, then one every quarter second
+    assert elapsed >= 1.1
+
+def test_small_requests_are_batched(server):
+    client = StubModelClient(server.url)
+    gateway = AIGateway(client.generate, client.fix, batch_generate_fn=client.generate_batch,
+                        batch_size=4, batch_window=0.2)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda i: gateway.generate(module(f"module-{i}")), range(4)))
+
+    assert results == [f"// generated for module-{i}\n" for i in range(4)]
+    assert server.requests["generate_batch"] == 1
+    assert server.requests["generate"] == 0
+
+def test_large_requests_bypass_the_batch(server):
+    client = StubModelClient(server.url)
+    gateway = AIGateway(client.generate, client.fix, batch_generate_fn=client.generate_batch, batch_max_chars=10)
+    gateway.generate(module("big", "x" * 100))
+    assert server.requests == {"generate": 1, "fix": 0, "generate_batch": 0}
+
+def test_no_rate_limit_by_default():
+    gateway = get_ai_gateway(lambda m: "code", lambda m, e: "fixed")
+    assert gateway.bucket is None
+    started = time.monotonic()
+    for i in range(50):
+        gateway.generate(module(f"module-{i}"))
+    assert time.monotonic() - started < 0.5
+
+def test_registry_shares_gateways_in_use_and_drops_unused_ones():
+    generate, fix = (lambda m: "code"), (lambda m, e: "fixed")
+    gateway = get_ai_gateway(generate, fix, {"rate": 10})
+    assert get_ai_gateway(generate, fix, {"rate": 10}) is gateway
+    assert get_ai_gateway(generate, fix, {"rate": 20}) is not gateway
+
+    stats = gateway.stats
+    stats["requests"] = 99
+    del gateway
+    gc.collect()
+    assert get_ai_gateway(generate, fix, {"rate": 10}).stats["requests"] == 0
+
+def test_token_bucket_waits_for_tokens():
+    bucket = TokenBucket(rate=20.0, capacity=1.0)
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() > 0.0
@@ -0,0 +1,76 @@
+import pytest
+
+from ai.modules.duration_model import DurationModel, TimingStore, get_duration_model, parse_estimated_time
+from ai.modules.planner import DevelopmentModule, DevelopmentPlan
+
+def record(store, stage, seconds, count, module_type="backend", technologies=("python",)):
+    for _ in range(count):
+        store.record(module_type, list(technologies), stage, seconds)
+
+def test_static_estimate_without_history(tmp_path):
+    model = DurationModel(TimingStore(str(tmp_path / "timings.db")))
+    estimate = model.predict("backend", ["python"], "2-3 hours")
+    assert estimate.source == "static"
+    assert estimate.mean == 2.5 * 3600
+    assert parse_estimated_time("2-3 hours") == (2.5, 2.0, 3.0)
+
+def test_predicts_from_history(tmp_path):
+    store = TimingStore(str(tmp_path / "timings.db"))
+    record(store, "generate", 10.0, 4)
+    record(store, "test", 5.0, 4)
+    estimate = DurationModel(store).predict("backend", ["python"])
+    assert estimate.source == "history"
+    assert estimate.mean == pytest.approx(15.0)
+    assert estimate.samples == 4
+
+def test_fix_rate_uses_counts_from_the_same_level(tmp_path):
+    store = TimingStore(str(tmp_path / "timings.db"))
+    # Plenty of history for this stack, but fixes were only ever recorded for
+    # other stacks of the same type, so the fix stats fall back to the type
+    record(store, "generate", 10.0, 10)
+    record(store, "test", 5.0, 10)
+    record(store, "generate", 10.0, 90, technologies=("go",))
+    record(store, "fix", 20.0, 9, technologies=("go",))
+
+    estimate = DurationModel(store).predict("backend", ["python"])
+    # 9 fixes out of 100 generations of the type, not 9 out of 10 of the stack
+    assert estimate.mean == pytest.approx(15.0 + 0.09 * (20.0 + 5.0))
+
+def test_shared_model_refreshes_after_new_samples(tmp_path):
+    path = str(tmp_path / "timings.db")
+    model = get_duration_model(path)
+    model.refresh_samples = 5
+    assert model.predict("backend", ["python"]).source == "static"
+
+    store = TimingStore(path)
+    record(store, "generate", 10.0, 3)
+    record(store, "test", 5.0, 3)
+    assert get_duration_model(path) is model
+    assert model.predict("backend", ["python"]).source == "history"
+
+def test_shared_model_refreshes_after_ttl(tmp_path):
+    path = str(tmp_path / "timings.db")
+    model = get_duration_model(path)
+    model.refresh_seconds = 0
+    record(TimingStore(path), "generate", 10.0, 1)
+    assert model.refresh_if_stale()
+
+def test_static_estimates_are_scaled_to_the_history(tmp_path):
+    store = TimingStore(str(tmp_path / "timings.db"))
+    record(store, "generate", 10.0, 4)
+    record(store, "test", 5.0, 4)
+    plan = DevelopmentPlan({"title": "app"})
+    plan.add_module(DevelopmentModule("api", "", "backend", ["python"], estimated_time="2-3 hours"))
+    plan.add_module(DevelopmentModule("ui", "", "frontend", ["react"], estimated_time="1-2 hours"))
+    estimates = plan.estimate_durations(DurationModel(store))
+    assert estimates["api"].source == "history"
+    # 15s measured against 2.5 hours written: the 1.5 hour module takes 9s
+    assert estimates["ui"].source == "static-scaled"
+    assert estimates["ui"].mean == pytest.approx(9.0)
+    assert estimates["ui"].low == pytest.approx(15.0 / 9000 * 3600)
+
+def test_static_estimates_stay_in_hours_without_history(tmp_path):
+    plan = DevelopmentPlan({"title": "app"})
+    plan.add_module(DevelopmentModule("ui", "", "frontend", ["react"], estimated_time="1-2 hours"))
+    estimates = plan.estimate_durations(DurationModel(TimingStore(str(tmp_path / "timings.db"))))
+    assert (estimates["ui"].source, estimates["ui"].mean) == ("static", 1.5 * 3600)
@@ -0,0 +1,54 @@
+from ai.modules.e2e_sharding import (SpecDurationStore, affected_e2e_specs, balance_shards, discover_e2e_specs,
+                                     merge_shard_reports, run_sharded_e2e)
+
+def test_discovers_specs_relative_to_root(tmp_path):
+    (tmp_path / "tests" / "e2e" / "node_modules").mkdir(parents=True)
+    (tmp_path / "tests" / "e2e" / "login.spec.ts").write_text("")
+    (tmp_path / "tests" / "e2e" / "helpers.ts").write_text("")
+    (tmp_path / "tests" / "e2e" / "node_modules" / "x.test.js").write_text("")
+    assert discover_e2e_specs(str(tmp_path)) == ["tests/e2e/login.spec.ts"]
+
+def test_balances_longest_first():
+    durations = {"a": 30.0, "b": 20.0, "c": 10.0, "d": 10.0}
+    shards = balance_shards(["a", "b", "c", "d"], durations, 2)
+    assert sorted(sum(durations[s] for s in shard) for shard in shards) == [30.0, 40.0]
+    assert balance_shards(["a"], durations, 4) == [["a"]]
+
+def test_no_specs_is_skipped_not_passed(tmp_path):
+    result = run_sharded_e2e(root=str(tmp_path), timings_path=str(tmp_path / "e2e.db"))
+    assert result["passed"] is False
+    assert result["skipped"] is True
+    assert result["tests"]["total"] == 0
+
+def test_merge_requires_every_shard_to_pass():
+    reports = [
+        {"shard": 0, "passed": True, "elapsed": 2.0, "tests": {"total": 2, "passed": 2}, "specs": []},
+        {"shard": 1, "passed": False, "elapsed": 3.0, "tests": {"total": 1, "failed": 1},
+         "specs": [{"spec": "b.test.ts", "status": "failed"}]}
+    ]
+    merged = merge_shard_reports(reports, 3.0)
+    assert merged["passed"] is False
+    assert merged["tests"] == {"total": 3, "passed": 2, "failed": 1, "pending": 0}
+    assert merged["serial_time"] == 5.0
+    assert [f["spec"] for f in merged["failures"]] == ["b.test.ts"]
+
+def test_spec_durations_are_smoothed(tmp_path):
+    store = SpecDurationStore(str(tmp_path / "e2e.db"))
+    store.record({"a.test.ts": 10.0})
+    store.record({"a.test.ts": 20.0})
+    assert store.durations()["a.test.ts"] == 10.0 * 0.7 + 20.0 * 0.3
+
+def test_changed_files_select_the_specs_mapped_to_them():
+    specs = ["tests/e2e/api.spec.ts", "tests/e2e/login.spec.ts", "tests/e2e/pages/home.spec.ts"]
+    spec_map = {"src/api/**": ["tests/e2e/api.spec.ts"], "src/pages/**": ["tests/e2e/pages/*"], "README.md": []}
+    assert affected_e2e_specs(["src/api/users.ts"], specs, spec_map) == ["tests/e2e/api.spec.ts"]
+    assert affected_e2e_specs(["src/pages/a.tsx", "tests/e2e/login.spec.ts"], specs, spec_map) == [
+        "tests/e2e/login.spec.ts", "tests/e2e/pages/home.spec.ts"
+    ]
+    assert affected_e2e_specs(["README.md"], specs, spec_map) == []
+
+def test_unmapped_changes_run_the_whole_suite():
+    specs = ["tests/e2e/api.spec.ts"]
+    assert affected_e2e_specs(["src/lib/db.ts"], specs, {"src/api/**": ["tests/e2e/api.spec.ts"]}) is None
+    assert affected_e2e_specs(["src/lib/db.ts"], specs) is None
+    assert affected_e2e_specs(["tests/e2e/api.spec.ts"], specs) == ["tests/e2e/api.spec.ts"]
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+
+import pytest
+
+from ai.utils.events import EventStream, PipelineFinished, StageFinished, StageStarted
+
+def _events(count=3):
+    for index in range(count):
+        yield StageStarted(f"stage-{index}")
+    yield PipelineFinished({"success": True})
+
+def _stages(events):
+    return [getattr(event, "stage", None) for event in events]
+
+async def _collect(stream):
+    return [event async for event in stream]
+
+def test_events_arrive_in_order():
+    stream = EventStream(_events)
+    expected = ["stage-0", "stage-1", "stage-2", None]
+    assert _stages(stream) == expected
+    assert _stages(asyncio.run(_collect(stream))) == expected
+    assert isinstance(list(stream)[-1], PipelineFinished)
+
+def test_every_consumer_gets_the_whole_stream():
+    stream = EventStream(_events)
+    assert _stages(stream) == _stages(stream)
+
+    async def consume_concurrently():
+        return await asyncio.gather(_collect(stream), _collect(stream), _collect(stream))
+
+    results = asyncio.run(consume_concurrently())
+    assert [_stages(events) for events in results] == [["stage-0", "stage-1", "stage-2", None]] * 3
+
+def test_producer_errors_reach_the_async_consumer():
+    def failing():
+        yield StageStarted("plan")
+        raise ValueError("planner crashed")
+
+    async def consume():
+        seen = []
+        with pytest.raises(ValueError, match="planner crashed"):
+            async for event in EventStream(failing):
+                seen.append(event)
+        return seen
+
+    assert _stages(asyncio.run(consume())) == ["plan"]
+
+def test_closing_while_the_consumer_waits_stops_the_producer():
+    release = threading.Event()
+    closed = threading.Event()
+    produced = []
+
+    def slow():
+        try:
+            for index in range(3):
+                produced.append(index)
+                yield StageFinished(f"stage-{index}", True, 0.0)
+                # The consumer is left waiting for the next event
+                release.wait(5)
+        finally:
+            closed.set()
+
+    async def consume():
+        stream = EventStream(slow).__aiter__()
+        first = await stream.__anext__()
+        waiting = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        await stream.aclose()
+        return first
+
+    assert asyncio.run(consume()).stage == "stage-0"
+    release.set()
+    assert closed.wait(5)
+    # The producer stops at the event after the close instead of running on
+    assert produced == [0, 1]
@@ -0,0 +1,69 @@
+import threading
+
+from ai.modules.file_ownership import (FileTreeIndex, WriteSetLock, compute_write_conflicts, patterns_overlap,
+                                       segments_overlap)
+
+def _module(name, files, tests=()):
+    return {"name": name, "files": list(files), "tests": list(tests)}
+
+def test_recursive_glob_overlaps_nested_patterns():
+    assert patterns_overlap("src/**", "src/api/*.ts")
+    assert patterns_overlap("src/api/*.ts", "src/**")
+    assert patterns_overlap("src/**/*.css", "src/styles/**/*.css")
+    assert patterns_overlap("**/*.ts", "src/lib/auth.ts")
+
+def test_sibling_patterns_do_not_overlap():
+    assert not patterns_overlap("src/api/*.ts", "src/pages/*.ts")
+    assert not patterns_overlap("src/components/**/*.tsx", "src/pages/**/*.tsx")
+    assert not patterns_overlap("src/*.ts", "src/*.css")
+    assert not patterns_overlap("src/*.ts", "src/api/users.ts")
+
+def test_segment_wildcards_overlap_literals():
+    assert segments_overlap("*.test.ts", "auth.test.ts")
+    assert segments_overlap("auth.*", "*.ts")
+    assert not segments_overlap("*.py", "*.ts")
+
+def test_conflict_map_pairs_only_overlapping_modules(tmp_path):
+    (tmp_path / "src" / "api").mkdir(parents=True)
+    (tmp_path / "src" / "api" / "users.ts").write_text("")
+    (tmp_path / "src" / "pages").mkdir()
+    (tmp_path / "src" / "pages" / "index.ts").write_text("")
+    modules = [
+        _module("setup", ["src/**"]),
+        _module("api", ["src/api/*.ts"]),
+        _module("pages", ["src/pages/*.ts"]),
+        _module("docs", ["docs/**/*.md"], ["docs.test.js"])
+    ]
+    conflict_map = compute_write_conflicts(modules, FileTreeIndex(str(tmp_path)))
+    assert conflict_map.conflicts_with("setup") == {"api", "pages"}
+    assert conflict_map.conflicts_with("api") == {"setup"}
+    assert conflict_map.conflicts_with("docs") == set()
+    pair = next(p for p in conflict_map.to_dict()["pairs"] if p["modules"] == ["api", "setup"])
+    assert pair["files"] == ["src/api/users.ts"]
+    assert conflict_map.is_compatible("api", ["pages", "docs"])
+    assert not conflict_map.is_compatible("api", ["setup"])
+
+def test_lock_excludes_conflicting_write_sets():
+    lock = WriteSetLock(compute_write_conflicts([
+        _module("setup", ["src/**"]), _module("api", ["src/api/*.ts"]), _module("pages", ["src/pages/*.ts"])
+    ]))
+    assert lock.try_acquire("api")
+    assert lock.try_acquire("pages")
+    assert not lock.try_acquire("setup")
+    assert not lock.acquire("setup", timeout=0.01)
+    lock.release("api")
+    lock.release("pages")
+    assert lock.try_acquire("setup")
+    assert not lock.try_acquire("api")
+
+def test_blocked_acquire_proceeds_once_the_conflict_is_released():
+    lock = WriteSetLock(compute_write_conflicts([_module("setup", ["src/**"]), _module("api", ["src/api/*.ts"])]))
+    assert lock.acquire("setup")
+    admitted = []
+    waiter = threading.Thread(target=lambda: admitted.append(lock.acquire("api", timeout=5)))
+    waiter.start()
+    waiter.join(0.05)
+    assert admitted == [] and lock.active == {"setup"}
+    lock.release("setup")
+    waiter.join()
+    assert admitted == [True] and lock.active == {"api"}
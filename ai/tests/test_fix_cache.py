@@ -0,0 +1,26 @@
+from ai.modules.fix_cache import FixCache, apply_patch, error_signature, make_patch
+
+def test_equal_failures_share_a_signature():
+    first = "2026-10-19 03:00:00 /tmp/run-1/src/auth.ts:12:5 TypeError: x is undefined (took 35 ms)"
+    second = "2026-10-20 11:22:33 /home/ci/src/auth.ts:40:1 TypeError: x is undefined (took 120 ms)"
+    assert error_signature(first) == error_signature(second)
+    assert error_signature(first) != error_signature("TypeError: y is undefined")
+
+def test_patch_replays_on_shifted_code():
+    before = "import a\n\ndef f():\n    return a.x\n"
+    after = "import a\n\ndef f():\n    return a.y\n"
+    patch = make_patch(before, after)
+    shifted = "# header\nimport b\n" + before
+    assert apply_patch(shifted, patch) == "# header\nimport b\n" + after
+    assert apply_patch("unrelated\n", patch) is None
+
+def test_lookup_prefers_successful_patches(tmp_path):
+    cache = FixCache(str(tmp_path / "fixes.db"))
+    good = make_patch("x = 1\n", "x = 2\n")
+    bad = make_patch("x = 1\n", "x = 3\n")
+    cache.store("sig", good, "error")
+    cache.store("sig", bad, "error")
+    cache.record_result("sig", bad, False)
+    assert cache.lookup("sig", limit=2) == [good]
+    cache.record_result("sig", good, True)
+    assert cache.lookup("other") == []
@@ -0,0 +1,24 @@
+from ai.modules.interface_extractor import InterfaceRegistry, extract_interface
+
+def test_planned_globs_are_expanded(tmp_path):
+    (tmp_path / "src" / "lib" / "node_modules").mkdir(parents=True)
+    (tmp_path / "src" / "lib" / "auth.ts").write_text("export function signIn(user: string): Promise<void> {}\n")
+    (tmp_path / "src" / "lib" / "db.ts").write_text("export const DB_URL: string = 'x';\n")
+    (tmp_path / "src" / "lib" / "node_modules" / "dep.ts").write_text("export const HIDDEN = 1;\n")
+    interface = extract_interface("lib", "", None, ["src/lib/**/*.ts"], str(tmp_path))
+    assert sorted(interface.sources) == ["lib", "src/lib/auth.ts", "src/lib/db.ts"]
+    assert {symbol["name"] for symbol in interface.symbols} == {"signIn", "DB_URL"}
+
+def test_code_path_is_not_read_twice(tmp_path):
+    code = "def handler(event: dict) -> dict:\n    return event\n"
+    (tmp_path / "api.py").write_text(code)
+    interface = extract_interface("api", code, str(tmp_path / "api.py"), ["*.py"], str(tmp_path))
+    assert [symbol["name"] for symbol in interface.symbols] == ["handler"]
+
+def test_context_lists_omitted_dependencies():
+    registry = InterfaceRegistry(max_chars=40)
+    registry.record(extract_interface("a", "def a_function_with_a_long_name(x: int) -> int: ...\n", "a.py"))
+    registry.record(extract_interface("b", "def b() -> None: ...\n", "b.py"))
+    context = registry.context_for(["a", "b", "missing"])
+    assert "def b() -> None" in context
+    assert "omitted for size: a" in context
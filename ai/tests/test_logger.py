@@ -0,0 +1,44 @@
+import json
+import logging
+import math
+
+from ai.utils.logger import SamplingFilter, configure_logging, lazy, setup_logger, shutdown_logging
+
+def test_setup_logger_installs_no_handlers():
+    logger = setup_logger("ai.tests.quiet")
+    package = logging.getLogger("ai")
+    assert logger.handlers == []
+    assert all(not hasattr(handler, "dropped") for handler in package.handlers)
+
+def test_sampling_keys_on_the_message_template():
+    sampling = SamplingFilter({"Code saved to %s": 0.25})
+    records = [logging.LogRecord("ai", logging.INFO, __file__, 1, "Code saved to %s", (f"src/m{i}.py",), None)
+               for i in range(8)]
+    # The first record of a group is kept, then every fourth
+    assert [sampling.filter(record) for record in records] == [True, False, False, False, True, False, False, False]
+
+def test_sampled_records_are_evenly_spaced():
+    for rate in (0.5, 0.3, 0.25, 0.1):
+        sampling = SamplingFilter({"tick": rate})
+        records = [logging.LogRecord("ai", logging.INFO, __file__, 1, "tick", None, None) for _ in range(100)]
+        kept = [i for i, record in enumerate(records) if sampling.filter(record)]
+        assert kept[0] == 0
+        assert len(kept) == 1 + int(99 * rate + 1e-9)
+        gaps = {b - a for a, b in zip(kept, kept[1:])}
+        assert gaps <= {math.floor(1 / rate), math.ceil(1 / rate)}, (rate, kept)
+
+def test_lazy_arguments_are_not_built_when_disabled(tmp_path):
+    calls = []
+    configure_logging(level="INFO", filepath=str(tmp_path / "log.jsonl"), logger_name="ai_test_pkg")
+    try:
+        logger = logging.getLogger("ai_test_pkg.module")
+        logger.debug("Spec: %s", lazy(lambda: calls.append(1)))
+        logger.info("Saved %s", "x", extra={"event": "saved"})
+    finally:
+        shutdown_logging()
+        logging.getLogger("ai_test_pkg").handlers.clear()
+    assert calls == []
+    with open(tmp_path / "log.jsonl", encoding="utf-8") as f:
+        record = json.loads(f.readline())
+    assert record["message"] == "Saved x"
+    assert record["event"] == "saved"
@@ -0,0 +1,40 @@
+from ai.modules.merkle_tree import MerkleTree, OutputStateStore, build_merkle_tree
+
+def _tree(root, files):
+    for path, content in files.items():
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text(content)
+    return build_merkle_tree(str(root))
+
+def test_changed_files_descend_only_into_changed_directories(tmp_path):
+    before = _tree(tmp_path, {"src/a.ts": "a", "src/lib/b.ts": "b", "README.md": "r"})
+    (tmp_path / "src" / "lib" / "b.ts").write_text("b2")
+    (tmp_path / "src" / "lib" / "c.ts").write_text("c")
+    (tmp_path / "README.md").unlink()
+    after = build_merkle_tree(str(tmp_path), before)
+    assert after.changed_files(before) == ["README.md", "src/lib/b.ts", "src/lib/c.ts"]
+    assert after.subtree_hash("src/a.ts") == before.subtree_hash("src/a.ts")
+    assert after.subtree_hash("src") != before.subtree_hash("src")
+    assert build_merkle_tree(str(tmp_path)).changed_files(after) == []
+
+def test_ignored_directories_do_not_change_the_hash(tmp_path):
+    tree = _tree(tmp_path, {"app.py": "x"})
+    _tree(tmp_path, {"node_modules/dep/index.js": "y", "__pycache__/app.pyc": "z"})
+    assert build_merkle_tree(str(tmp_path)).root_hash == tree.root_hash
+
+def test_hash_of_globs(tmp_path):
+    tree = _tree(tmp_path, {"src/a.ts": "a", "src/b.ts": "b", "src/c.css": "c"})
+    scripts = tree.hash_of(["src/*.ts"])
+    (tmp_path / "src" / "c.css").write_text("c2")
+    assert build_merkle_tree(str(tmp_path)).hash_of(["src/*.ts"]) == scripts
+    (tmp_path / "src" / "b.ts").write_text("b2")
+    assert build_merkle_tree(str(tmp_path)).hash_of(["src/*.ts"]) != scripts
+
+def test_round_trip_and_state_store(tmp_path):
+    tree = _tree(tmp_path / "out", {"a.py": "a", "pkg/b.py": "b"})
+    restored = MerkleTree.from_dict(tree.to_dict())
+    assert restored.root_hash == tree.root_hash
+    store = OutputStateStore(str(tmp_path / "state.db"))
+    assert store.get(str(tmp_path / "out"), "integrate") is None
+    store.put(str(tmp_path / "out"), "integrate", {"tree": tree.to_dict()})
+    assert store.get(str(tmp_path / "out"), "integrate")["tree"]["root_hash"] == tree.root_hash
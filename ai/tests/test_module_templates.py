@@ -0,0 +1,70 @@
+from ai.modules.module_templates import KeywordAutomaton, TemplateIndex, load_module_templates
+
+def _linear_match(index, spec):
+    """The planner's original scan: every template of the type, keywords searched one by one."""
+    proj_type = index.resolve_project_type(spec.get("type"))
+    technologies = [t.lower() for t in spec.get("technologies", [])]
+    description = spec.get("description", "").lower()
+    return [
+        t for t in index.templates
+        if proj_type in t.project_types and (
+            t.unconditional
+            or any(tech in technologies for tech in t.trigger_technologies)
+            or any(keyword in description for keyword in t.trigger_keywords)
+        )
+    ]
+
+def _names(templates):
+    return [t.name for t in templates]
+
+def test_automaton_finds_overlapping_keywords():
+    automaton = KeywordAutomaton(["he", "she", "hers", "his"])
+    assert automaton.find("ushers") == {"he", "she", "hers"}
+    assert automaton.find("this") == {"his"}
+    assert automaton.find("") == set()
+
+def test_automaton_finds_keywords_inside_other_keywords():
+    automaton = KeywordAutomaton(["auth", "authentication", "data", "database"])
+    assert automaton.find("an authentication database") == {"auth", "authentication", "data", "database"}
+    assert automaton.find("oauth metadata") == {"auth", "data"}
+
+def test_one_template_matched_by_several_keywords_is_returned_once():
+    index = TemplateIndex({"templates": [
+        {"project_types": ["web"], "when": {"keywords": ["auth", "login"]},
+         "module": {"name": "auth", "description": "", "type": "backend"}},
+        {"project_types": ["web"], "module": {"name": "setup", "description": "", "type": "setup"}}
+    ]})
+    matched = index.match({"type": "web", "description": "Login with auth tokens"})
+    assert _names(matched) == ["auth", "setup"]
+
+def test_technologies_match_case_insensitively():
+    index = load_module_templates()
+    spec = {"type": "web", "technologies": ["NextJS"], "description": "A blog"}
+    assert "frontend-setup" in _names(index.match(spec))
+    assert "frontend-setup" not in _names(index.match({"type": "web", "technologies": ["vue"], "description": "A blog"}))
+
+def test_index_matches_the_linear_scan_for_every_project_type():
+    index = load_module_templates()
+    descriptions = [
+        "",
+        "A store front with user authentication and a database",
+        "Backend API for metadata",
+        "Dashboard showing DATA from an Auth service",
+        "A static landing page"
+    ]
+    for proj_type in ("web", "api", "mobile", "library", "desktop"):
+        for technologies in ([], ["react"], ["NextJS", "typescript"], ["python"]):
+            for description in descriptions:
+                spec = {"type": proj_type, "technologies": technologies, "description": description}
+                assert index.match(spec) == _linear_match(index, spec), spec
+
+def test_baseline_web_plan_modules():
+    index = load_module_templates()
+    spec = {"type": "web", "technologies": ["react", "typescript"],
+            "description": "React app with user authentication and data visualization"}
+    assert _names(index.match(spec)) == [
+        "frontend-setup", "authentication", "database-setup", "ui-components", "pages", "styling"
+    ]
+    assert _names(index.match({"type": "api", "description": "anything"})) == [
+        "api-setup", "database-models", "api-endpoints", "auth-middleware", "api-docs"
+    ]
@@ -0,0 +1,242 @@
+import copy
+import os
+import threading
+
+REQUIREMENT = "Create a REST API for managing users"
+
+# Modules of the REST API plan with their test entries, in execution order
+API_MODULES = {
+    "api-setup": "setup.test.py",
+    "database-models": "models.test.py",
+    "api-endpoints": "endpoints.test.py",
+    "auth-middleware": "auth.test.py",
+    "api-docs": "docs.test.py"
+}
+
+class FakeStages:
+    """
+    Stage stand-ins that record their calls.
+
+    Generated code is valid Python; the tests of a module in ``failing``
+    fail until its saved code carries the fix.
+    """
+
+    def __init__(self, output_dir, failing=()):
+        self.output_dir = output_dir
+        self.failing = set(failing)
+        self.calls = {"generate": [], "fix": [], "test": [], "integrate": [], "e2e": []}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _record(self, stage, value):
+        with self._lock:
+            self.calls[stage].append(value)
+
+    def ai_generate_code(self, module):
+        self._record("generate", module.name)
+        return f"def {module.name.replace('-', '_')}():\n    return {module.name!r}\n"
+
+    def ai_fix_code(self, module, error):
+        self._record("fix", module.name)
+        return f"{module.code}# fixed\n"
+
+    def run_tests(self, tests, cwd=None):
+        self._record("test", (list(tests), cwd))
+        module = next(name for name, test in API_MODULES.items() if tests == [test])
+        with open(os.path.join(cwd or self.output_dir, f"{module}.py"), encoding="utf-8") as f:
+            passed = module not in self.failing or "# fixed" in f.read()
+        self._local.error = None if passed else f"AssertionError: {module} returned 500"
+        return passed
+
+    def get_last_error(self):
+        return getattr(self._local, "error", None)
+
+    def integrate_modules(self, modules, cwd=None):
+        self._record("integrate", [m.name for m in modules])
+        return True
+
+    def run_e2e_tests(self, cwd=None, specs=None):
+        self._record("e2e", specs)
+        return {"passed": True}
+
+    def pipeline_stages(self, pipeline):
+        return pipeline.PipelineStages(
+            ai_generate_code=self.ai_generate_code,
+            ai_fix_code=self.ai_fix_code,
+            run_tests=self.run_tests,
+            get_last_error=self.get_last_error,
+            integrate_modules=self.integrate_modules,
+            run_e2e_tests=self.run_e2e_tests,
+            generate_report=lambda modules, result: {"modules": len(modules)},
+            push_github=lambda: None
+        )
+
+def _config(tmp_path, output="out", **overrides):
+    config = {
+        "output_dir": str(tmp_path / output),
+        "plan_cache_dir": str(tmp_path / "plan_cache"),
+        "timings_path": str(tmp_path / "timings.db"),
+        "fix_cache_path": str(tmp_path / "fix_cache.db"),
+        "test_cache_path": str(tmp_path / "test_cache.db"),
+        "output_state_path": str(tmp_path / "output_state.db")
+    }
+    config.update(overrides)
+    return config
+
+def _run(pipeline, config, fake, previous_result=None):
+    return pipeline.ai_autocode_pipeline(
+        REQUIREMENT, config=config, stages=fake.pipeline_stages(pipeline), previous_result=previous_result
+    )
+
+def _module(pipeline, name, technologies, files=()):
+    module = pipeline.Module(name, "")
+    module.technologies = list(technologies)
+    module.files = list(files)
+    return module
+
+def test_tsx_module_is_saved_and_checked_as_tsx(pipeline, tmp_path):
+    module = _module(pipeline, "pages", ["react", "nextjs"])
+    code = "export default function Page() {\n  return <p>Don't panic</p>;\n}\n"
+    checker = pipeline.StaticChecker(check_imports=False)
+    assert pipeline.module_code_path("pages", str(tmp_path), pipeline.module_code_language(module)).endswith("pages.tsx")
+    assert pipeline.static_errors(checker, module, code, str(tmp_path)) is None
+    assert "never closed" in pipeline.static_errors(checker, module, code[:-2], str(tmp_path))
+
+def test_unknown_language_is_not_checked(pipeline, tmp_path):
+    module = _module(pipeline, "styling", ["css"], ["src/**/*.css"])
+    checker = pipeline.StaticChecker(check_imports=False)
+    assert pipeline.static_errors(checker, module, "body { color: red", str(tmp_path)) is None
+
+def test_every_module_is_generated_tested_and_integrated(pipeline, tmp_path):
+    fake = FakeStages(str(tmp_path / "out"))
+    result = _run(pipeline, _config(tmp_path), fake)
+    assert result["success"], result["errors"]
+    assert sorted(fake.calls["generate"]) == sorted(API_MODULES)
+    assert sorted(fake.calls["integrate"][0]) == sorted(API_MODULES)
+    assert (tmp_path / "out" / "api-setup.py").read_text().startswith("def api_setup():")
+
+def test_replanning_reprocesses_changed_modules_and_their_dependents(pipeline, tmp_path):
+    config = _config(tmp_path)
+    first = _run(pipeline, config, FakeStages(config["output_dir"]))
+    previous = copy.deepcopy(first)
+    for module in previous["plan"]["modules"]:
+        if module["name"] == "api-endpoints":
+            module["description"] = "An older description"
+    for module in previous["modules"]:
+        if module["name"] == "api-setup":
+            module["code"] = "def api_setup():\n    return 'kept'\n"
+    fake = FakeStages(config["output_dir"])
+    result = _run(pipeline, config, fake, previous)
+    assert result["success"], result["errors"]
+    assert result["plan_diff"]["changed"] == ["api-endpoints"]
+    assert result["plan_diff"]["dirty"] == ["api-endpoints", "auth-middleware", "api-docs"]
+    assert sorted(fake.calls["generate"]) == ["api-docs", "api-endpoints", "auth-middleware"]
+    # Clean modules are carried over from the previous result, not regenerated
+    modules = {m["name"]: m for m in result["modules"]}
+    assert modules["api-setup"]["code"] == "def api_setup():\n    return 'kept'\n"
+    assert all(m["status"] == "completed" for m in modules.values())
+
+def test_unchanged_tree_skips_integration_and_e2e(pipeline, tmp_path):
+    config = _config(tmp_path)
+    first_fake = FakeStages(config["output_dir"])
+    first = _run(pipeline, config, first_fake)
+    assert first["incremental"]["e2e_skipped"] is False
+    fake = FakeStages(config["output_dir"])
+    result = _run(pipeline, config, fake, first)
+    assert result["success"], result["errors"]
+    assert fake.calls["generate"] == [] and fake.calls["integrate"] == [] and fake.calls["e2e"] == []
+    assert result["incremental"]["integrated"] == []
+    assert result["incremental"]["e2e_skipped"] is True
+    assert result["e2e"] == {"passed": True}
+
+def test_only_e2e_specs_covering_changed_files_run(pipeline, tmp_path):
+    config = _config(tmp_path, e2e_spec_map={"api-endpoints.py": ["tests/e2e/api*"], "docs/**": []})
+    output = tmp_path / "out"
+    (output / "tests" / "e2e").mkdir(parents=True)
+    for spec in ("api.spec.js", "login.spec.js"):
+        (output / "tests" / "e2e" / spec).write_text(f"// {spec}\n")
+    result = _run(pipeline, config, FakeStages(config["output_dir"]))
+    assert result["incremental"]["e2e_specs"] is None
+
+    def rerun(change):
+        change()
+        fake = FakeStages(config["output_dir"])
+        rerun_result = _run(pipeline, config, fake, result)
+        assert rerun_result["success"], rerun_result["errors"]
+        return fake.calls["e2e"], rerun_result["incremental"]
+
+    # A mapped file runs its specs, a changed spec runs itself
+    assert rerun(lambda: (output / "api-endpoints.py").write_text("def api_endpoints():\n    return 1\n"))[0] == [
+        ["tests/e2e/api.spec.js"]
+    ]
+    assert rerun(lambda: (output / "tests" / "e2e" / "login.spec.js").write_text("// v2\n"))[0] == [
+        ["tests/e2e/login.spec.js"]
+    ]
+    # A file mapped to no spec skips the suite, an unmapped one runs all of it
+    calls, incremental = rerun(lambda: (output / "docs").mkdir() or (output / "docs" / "api.md").write_text("# API\n"))
+    assert calls == [] and incremental["e2e_skipped"] is True
+    assert rerun(lambda: (output / "api-setup.py").write_text("def api_setup():\n    return 2\n"))[0] == [None]
+
+def test_test_results_are_reused_for_unchanged_code_and_tests(pipeline, tmp_path):
+    config = _config(tmp_path)
+    os.makedirs(config["output_dir"])
+    for test in API_MODULES.values():
+        (tmp_path / "out" / test).write_text(f"# {test}\n")
+    _run(pipeline, config, FakeStages(config["output_dir"]))
+    fake = FakeStages(config["output_dir"])
+    result = _run(pipeline, config, fake)
+    assert result["success"], result["errors"]
+    assert fake.calls["test"] == []
+    assert result["test_cache"] == {"hits": len(API_MODULES), "misses": 0}
+
+def test_cached_fix_is_replayed_before_asking_the_model(pipeline, tmp_path):
+    first = FakeStages(str(tmp_path / "first"), failing=["api-endpoints"])
+    result = _run(pipeline, _config(tmp_path, "first"), first)
+    assert result["success"], result["errors"]
+    assert first.calls["fix"] == ["api-endpoints"]
+    second = FakeStages(str(tmp_path / "second"), failing=["api-endpoints"])
+    result = _run(pipeline, _config(tmp_path, "second"), second)
+    assert result["success"], result["errors"]
+    assert second.calls["fix"] == []
+    modules = {m["name"]: m for m in result["modules"]}
+    assert modules["api-endpoints"]["code"].endswith("# fixed\n")
+    assert modules["api-endpoints"]["fix_attempts"] == 1
+
+def test_successful_run_publishes_its_workspace(pipeline, tmp_path):
+    config = _config(tmp_path, workspaces={"root": str(tmp_path / "ws")})
+    fake = FakeStages(config["output_dir"])
+    result = _run(pipeline, config, fake)
+    assert result["success"], result["errors"]
+    # Tests ran in the run's workspace, which then became the published tree
+    workspace = result["workspace"]
+    run_dir = os.path.abspath(os.path.join(tmp_path, "ws", "runs", result["run_id"]))
+    assert {cwd for _, cwd in fake.calls["test"]} == {run_dir}
+    assert os.path.islink(config["output_dir"])
+    assert os.path.realpath(config["output_dir"]) == os.path.realpath(workspace)
+    assert (tmp_path / "out" / "api-docs.py").exists()
+
+def test_distributed_steps_run_on_queue_workers(pipeline, worker, tmp_path):
+    config = _config(tmp_path, distributed={
+        "queue_path": str(tmp_path / "queue.db"),
+        "poll_interval": 0.01,
+        "snapshot_dir": str(tmp_path / "trees")
+    })
+    fake = FakeStages(config["output_dir"], failing=["database-models"])
+    runner = worker.QueueWorker(
+        worker.WorkQueue(config["distributed"]["queue_path"]), fake.pipeline_stages(pipeline),
+        worker_id="w", poll_interval=0.01
+    )
+    stop = threading.Event()
+    thread = threading.Thread(target=runner.run, args=(stop,))
+    thread.start()
+    try:
+        result = _run(pipeline, config, FakeStages(config["output_dir"]))
+    finally:
+        stop.set()
+        thread.join()
+    assert result["success"], result["errors"]
+    # Generate, test and fix steps all went through the queue
+    assert sorted(fake.calls["generate"]) == sorted(API_MODULES)
+    assert fake.calls["fix"] == ["database-models"]
+    assert runner.completed == 2 * len(API_MODULES) + 2
+    assert all(cwd.startswith(str(tmp_path / "trees")) for _, cwd in fake.calls["test"])
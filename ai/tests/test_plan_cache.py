@@ -0,0 +1,58 @@
+import json
+
+from ai.modules.plan_cache import PlanCache, spec_fingerprint
+from ai.modules.requirement_normalizer import normalize_requirement
+
+def _spec(title, **fields):
+    spec = {"title": title, "type": "web", "technologies": ["react", "typescript"], "normalized_at": "2024-01-01"}
+    spec.update(fields)
+    return spec
+
+def _save(plan, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(plan, f)
+
+def test_least_recently_used_plan_is_evicted():
+    cache = PlanCache(max_entries=2)
+    for title in ("a", "b"):
+        cache.put(_spec(title), "v1", {"title": title})
+    assert cache.get(_spec("a"), "v1")["title"] == "a"
+    cache.put(_spec("c"), "v1", {"title": "c"})
+    assert cache.get(_spec("b"), "v1") is None
+    assert cache.get(_spec("a"), "v1")["title"] == "a"
+    assert cache.get(_spec("c"), "v1")["title"] == "c"
+    assert (cache.hits, cache.misses) == (3, 1)
+
+def test_evicted_plans_are_reloaded_from_disk(tmp_path):
+    cache = PlanCache(str(tmp_path), max_entries=1, saver=_save)
+    cache.put(_spec("a"), "v1", {"title": "a"})
+    cache.put(_spec("b"), "v1", {"title": "b"})
+    assert cache.get(_spec("a"), "v1")["title"] == "a"
+
+def test_new_template_version_invalidates_cached_plans(tmp_path):
+    cache = PlanCache(str(tmp_path), saver=_save)
+    cache.put(_spec("a"), "v1", {"title": "a"})
+    assert cache.get(_spec("a"), "v2") is None
+    # Plans of the old version are gone from disk too
+    assert all(name.startswith("v2-") for name in (p.name for p in tmp_path.iterdir()))
+    assert cache.get(_spec("a"), "v1") is None
+
+def test_equivalent_specs_share_a_plan():
+    cache = PlanCache()
+    cache.put(_spec("a"), "v1", {"title": "a"})
+    reordered = _spec("a", technologies=["typescript", "react"], normalized_at="2024-06-30")
+    assert spec_fingerprint(reordered) == spec_fingerprint(_spec("a"))
+    assert cache.get(reordered, "v1")["title"] == "a"
+    assert cache.get(_spec("a", type="api"), "v1") is None
+
+def test_renormalized_requirement_hits():
+    cache = PlanCache()
+    requirement = "Build a web app with Next.js, user login and database storage"
+    cache.put(normalize_requirement(requirement), "v1", {"title": "web"})
+    assert cache.get(normalize_requirement(requirement), "v1")["title"] == "web"
+
+def test_cached_plans_are_private_copies():
+    cache = PlanCache()
+    cache.put(_spec("a"), "v1", {"modules": []})
+    cache.get(_spec("a"), "v1")["modules"].append("stray")
+    assert cache.get(_spec("a"), "v1")["modules"] == []
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from ai.modules.plan_store import (PlanFile, load_development_plan_binary, save_development_plan_binary,
+                                   scan_plan_archive)
+
+PLAN = {
+    "project_type": "web",
+    "modules": [
+        {"name": "frontend-setup", "description": "Set up the frontend", "type": "frontend",
+         "technologies": ["react"], "dependencies": [], "files": ["package.json"], "tests": ["setup.test.js"],
+         "created_at": "2026-01-01T00:00:00"},
+        {"name": "ui-components", "description": "Create components", "type": "frontend",
+         "technologies": ["react"], "dependencies": ["frontend-setup"], "files": [], "tests": [],
+         "created_at": "2026-01-01T00:00:00"}
+    ]
+}
+
+def test_round_trip_decodes_modules_lazily(tmp_path):
+    path = str(tmp_path / "latest.plan")
+    save_development_plan_binary(PLAN, path)
+    with load_development_plan_binary(path) as plan_file:
+        assert plan_file.module_names == ["frontend-setup", "ui-components"]
+        assert plan_file.metadata == {"project_type": "web"}
+        assert plan_file.module("ui-components").dependencies == ["frontend-setup"]
+        assert plan_file.module_dict("frontend-setup")["files"] == ["package.json"]
+
+@pytest.mark.parametrize("keep", [3, 20, 40])
+def test_truncated_file_raises_value_error(tmp_path, keep):
+    path = str(tmp_path / "truncated.plan")
+    save_development_plan_binary(PLAN, path)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:keep])
+    with pytest.raises(ValueError):
+        PlanFile(path)
+
+def test_scan_skips_truncated_and_foreign_files(tmp_path):
+    save_development_plan_binary(PLAN, str(tmp_path / "a.plan"))
+    with open(tmp_path / "a.plan", "rb") as f:
+        data = f.read()
+    with open(tmp_path / "b.plan", "wb") as f:
+        f.write(data[:len(data) - 10])
+    with open(tmp_path / "c.plan", "wb") as f:
+        f.write(b"not a plan at all")
+    (tmp_path / "d.plan").touch()
+
+    found = list(scan_plan_archive(str(tmp_path)))
+    assert found == [(os.path.join(str(tmp_path), "a.plan"), ["frontend-setup", "ui-components"])]
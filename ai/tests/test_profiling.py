@@ -0,0 +1,41 @@
+import logging
+import tracemalloc
+
+from ai.utils.profiling import RunProfiler
+
+def test_concurrent_profilers_share_the_process(tmp_path, caplog):
+    first = RunProfiler(sampling=False)
+    second = RunProfiler(sampling=False)
+    first.start()
+    with caplog.at_level(logging.WARNING, logger="ai.utils.profiling"):
+        second.start()
+    assert "runs without cProfile" in caplog.text
+    data = [bytearray(1024) for _ in range(100)]
+    first.close()
+    # The second run still traces allocations after the first one finished
+    assert tracemalloc.is_tracing()
+    second.close()
+    assert not tracemalloc.is_tracing()
+    del data
+
+    first_reports = first.write(str(tmp_path), "a")["run"]
+    second_reports = second.write(str(tmp_path), "b")["run"]
+    assert "cpu" in first_reports and "cpu" not in second_reports
+    assert "memory" in first_reports and "memory" in second_reports
+
+def test_cpu_profiling_is_available_again_after_a_run(tmp_path):
+    for run_id in ("a", "b"):
+        profiler = RunProfiler(sampling=False, memory=False)
+        profiler.start()
+        sum(range(1000))
+        assert "cpu" in profiler.write(str(tmp_path), run_id)["run"]
+
+def test_tracemalloc_started_elsewhere_is_left_running():
+    tracemalloc.start()
+    try:
+        profiler = RunProfiler(cpu=False, sampling=False)
+        profiler.start()
+        profiler.close()
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,72 @@
+from ai.modules.planner import DevelopmentModule, DevelopmentPlan
+from ai.modules.replanner import diff_plans, replan
+
+def _plan(*modules):
+    plan = DevelopmentPlan({"title": "app"})
+    for name, dependencies, description in modules:
+        plan.add_module(DevelopmentModule(name, description, "backend", dependencies=list(dependencies)))
+    plan.calculate_execution_order()
+    return plan
+
+# setup <- db <- api <- docs, setup <- ui
+BASE = [("setup", [], "Setup"), ("db", ["setup"], "Database"), ("api", ["db"], "API"),
+        ("docs", ["api"], "Docs"), ("ui", ["setup"], "UI")]
+
+def _replace(modules, name, dependencies=None, description=None):
+    return [
+        (n, dependencies if n == name and dependencies is not None else d,
+         description if n == name and description is not None else text)
+        for n, d, text in modules
+    ]
+
+def test_identical_plans_have_an_empty_diff():
+    diff = diff_plans(_plan(*BASE), _plan(*BASE))
+    assert diff.is_empty
+    assert diff.dirty == []
+    assert diff.clean == ["setup", "db", "ui", "api", "docs"]
+
+def test_changed_module_and_its_dependents_are_dirty():
+    diff = diff_plans(_plan(*BASE), _plan(*_replace(BASE, "db", description="Database with migrations")))
+    assert diff.changed == ["db"]
+    assert (diff.added, diff.removed) == ([], [])
+    assert diff.dirty == ["db", "api", "docs"]
+    assert diff.clean == ["setup", "ui"]
+    assert not diff.is_dirty("ui")
+
+def test_added_module_is_dirty_with_its_dependents():
+    current = _plan(*(BASE + [("cache", ["setup"], "Cache")]))
+    current.modules[2].dependencies.append("cache")
+    diff = diff_plans(_plan(*BASE), current)
+    assert diff.added == ["cache"]
+    assert diff.changed == ["api"]
+    assert diff.added_edges == [("cache", "api"), ("setup", "cache")]
+    assert set(diff.dirty) == {"cache", "api", "docs"}
+
+def test_removed_module_dirties_its_former_dependents():
+    current = _plan(*_replace([m for m in BASE if m[0] != "db"], "api", dependencies=["setup"]))
+    diff = diff_plans(_plan(*BASE), current)
+    assert diff.removed == ["db"]
+    assert diff.changed == ["api"]
+    assert diff.removed_edges == [("db", "api"), ("setup", "db")]
+    assert diff.dirty == ["api", "docs"]
+    assert "db" not in diff.clean
+
+def test_removed_dependency_dirties_dependents_with_unchanged_signatures():
+    # "ui" lists a dependency the new plan no longer has, yet is itself unchanged
+    previous = _plan(*(BASE + [("theme", [], "Theme")]))
+    previous.modules[4].dependencies.append("theme")
+    current = _plan(*BASE)
+    current.modules[4].dependencies.append("theme")
+    diff = diff_plans(previous, current)
+    assert diff.removed == ["theme"]
+    assert diff.is_dirty("ui")
+
+def test_replan_diffs_against_a_fresh_plan(tmp_path):
+    spec = {"title": "API", "description": "A REST API", "type": "api", "technologies": ["fastapi"]}
+    previous, _ = replan(_plan(*BASE), spec, cache_dir=str(tmp_path))
+    current, diff = replan(previous, spec, cache_dir=str(tmp_path))
+    assert diff.is_empty
+    assert diff.clean == current.execution_order
+    _, diff = replan(_plan(*BASE), spec, cache_dir=str(tmp_path))
+    assert set(diff.removed) == {"setup", "db", "api", "docs", "ui"}
+    assert diff.dirty == current.execution_order
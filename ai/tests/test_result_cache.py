@@ -0,0 +1,56 @@
+from ai.modules import result_cache
+
+# Imported under other names so pytest does not collect them
+ResultCache = result_cache.TestResultCache
+result_key = result_cache.test_result_key
+
+def test_key_follows_test_file_content(tmp_path):
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "tests" / "auth.test.ts").write_text("it('signs in')")
+    first = result_key("code", ["tests/*.test.ts"], root=str(tmp_path))
+    assert first is not None
+    (tmp_path / "tests" / "auth.test.ts").write_text("it('signs out')")
+    assert result_key("code", ["tests/*.test.ts"], root=str(tmp_path)) != first
+
+def test_key_changes_when_a_glob_matches_a_new_file(tmp_path):
+    (tmp_path / "a.test.ts").write_text("a")
+    first = result_key("code", ["*.test.ts"], root=str(tmp_path))
+    (tmp_path / "b.test.ts").write_text("b")
+    assert result_key("code", ["*.test.ts"], root=str(tmp_path)) != first
+
+def test_tests_without_files_are_not_cacheable(tmp_path):
+    assert result_key("code", ["Unit tests for auth"], root=str(tmp_path)) is None
+    assert result_key("code", ["tests/*.py"], root=str(tmp_path)) is None
+    assert result_key("code", [], root=str(tmp_path)) is not None
+
+def test_store_lookup_and_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path / "tests.db"), max_entries=1)
+    cache.store("a", False, "boom", 1.0, "auth")
+    cache.store("b", True)
+    assert cache.lookup("b") == (True, None)
+    assert cache.evict() == 1
+    assert cache.lookup("a") is None
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+def test_keys_of_a_pass_share_one_tree_index(tmp_path):
+    (tmp_path / "a.test.ts").write_text("a")
+    tree = result_cache.FileTreeIndex(str(tmp_path))
+    first = result_key("code", ["*.test.ts"], root=str(tmp_path), tree=tree)
+    # The index is not walked again, so a file added during the pass is not seen
+    (tmp_path / "b.test.ts").write_text("b")
+    assert result_key("code", ["*.test.ts"], root=str(tmp_path), tree=tree) == first
+    tree.invalidate()
+    assert result_key("code", ["*.test.ts"], root=str(tmp_path), tree=tree) != first
+
+def test_least_recently_used_entries_are_evicted_over_the_byte_budget(tmp_path):
+    path = str(tmp_path / "tests.db")
+    cache = ResultCache(path)
+    for key in ("a", "b", "c"):
+        cache.store(key, False, "x" * 1000)
+    cache.lookup("a")
+    assert 3000 < cache.size() < 3500
+    cache = ResultCache(path, max_bytes=2500)
+    assert cache.size() <= 2500
+    assert cache.lookup("b") is None
+    assert cache.lookup("a") == (False, "x" * 1000)
+    assert cache.lookup("c") == (False, "x" * 1000)
@@ -0,0 +1,75 @@
+import threading
+import time
+
+from ai.utils.scheduler import (RESOURCE_CPU, RESOURCE_LLM, DependencyFailed, JobFailed, ResourceScheduler, Step,
+                                current_cancel_token)
+
+def _job(log, name, resource=RESOURCE_CPU, delay=0.0, fail=False):
+    def steps():
+        yield Step(resource, time.sleep, delay, stage=name)
+        log.append(name)
+        if fail:
+            raise JobFailed(f"{name} failed")
+        return name
+    return steps
+
+def test_dependencies_run_first():
+    log = []
+    scheduler = ResourceScheduler()
+    scheduler.add_job("b", _job(log, "b"), dependencies=["a"])
+    scheduler.add_job("a", _job(log, "a", delay=0.02))
+    scheduler.add_job("c", _job(log, "c"), dependencies=["b"])
+    jobs = scheduler.run()
+    assert log == ["a", "b", "c"]
+    assert all(job.status == "completed" for job in jobs.values())
+
+def test_critical_path_is_dispatched_first():
+    log = []
+    scheduler = ResourceScheduler({RESOURCE_CPU: 1})
+    scheduler.add_job("short", _job(log, "short"), duration=1.0)
+    scheduler.add_job("head", _job(log, "head"), duration=1.0)
+    scheduler.add_job("tail", _job(log, "tail"), dependencies=["head"], duration=5.0)
+    scheduler.run()
+    assert scheduler.jobs["head"].priority == 6.0
+    assert log[0] == "head"
+
+def test_resource_limits_bound_concurrency():
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def work():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+
+    scheduler = ResourceScheduler({RESOURCE_LLM: 2})
+    for i in range(6):
+        scheduler.add_job(str(i), lambda: (yield Step(RESOURCE_LLM, work)))
+    scheduler.run()
+    assert peak[0] == 2
+
+def test_failed_job_blocks_its_dependents():
+    log = []
+    scheduler = ResourceScheduler()
+    scheduler.add_job("a", _job(log, "a", fail=True))
+    scheduler.add_job("b", _job(log, "b"), dependencies=["a"])
+    scheduler.add_job("c", _job(log, "c"))
+    jobs = scheduler.run()
+    assert (jobs["a"].status, jobs["b"].status, jobs["c"].status) == ("failed", "blocked", "completed")
+    assert isinstance(jobs["b"].error, DependencyFailed)
+
+def test_stage_timeout_cancels_the_step():
+    def slow():
+        token = current_cancel_token()
+        token.wait(5)
+        return token.cancelled
+
+    scheduler = ResourceScheduler(stage_timeouts={"slow": 0.05})
+    scheduler.add_job("a", lambda: (yield Step(RESOURCE_CPU, slow, stage="slow")))
+    started = time.monotonic()
+    jobs = scheduler.run()
+    assert time.monotonic() - started < 2
+    assert jobs["a"].status == "failed"
+    assert isinstance(jobs["a"].error, TimeoutError)
@@ -0,0 +1,29 @@
+def _reliable_profile(simulation):
+    return {stage: {"failure_rate": 0.0} for stage in simulation.DEFAULT_PROFILE}
+
+def test_every_project_type_succeeds_without_failures(simulation, tmp_path):
+    # Failures would come from the simulated code itself, e.g. failing the static check
+    for index, requirement in enumerate(simulation.DEFAULT_REQUIREMENTS):
+        report = simulation.run_simulation(
+            runs=1, concurrency=1, profile=_reliable_profile(simulation), time_scale=0.0001,
+            requirements=[requirement], root=str(tmp_path / f"type-{index}"), seed=index
+        )
+        assert report["outcomes"] == {"succeeded": 1, "failed": 0, "crashed": 0}, requirement
+
+def _simulate(simulation, root, test_failure_rate, runs=10):
+    profile = _reliable_profile(simulation)
+    profile["run_tests"] = {"failure_rate": test_failure_rate}
+    return simulation.run_simulation(
+        runs=runs, concurrency=5, profile=profile, time_scale=0.0001, root=str(root), seed=7
+    )
+
+def test_failures_rise_with_the_failure_rate(simulation, tmp_path):
+    reports = [_simulate(simulation, tmp_path / str(rate), rate) for rate in (0.0, 0.5, 1.0)]
+    assert reports[0]["outcomes"] == {"succeeded": 10, "failed": 0, "crashed": 0}
+    assert reports[0]["stage_calls"]["run_tests"]["failures"] == 0
+    failed = [report["outcomes"]["failed"] for report in reports]
+    assert failed[0] < failed[1] < failed[2] == 10
+    # Failed modules block their dependents, so compare the share of failed test calls
+    shares = [calls["failures"] / calls["calls"] for calls in (report["stage_calls"]["run_tests"] for report in reports)]
+    assert shares[0] == 0.0 < shares[1] < shares[2] == 1.0
+    assert all(report["outcomes"]["crashed"] == 0 for report in reports)
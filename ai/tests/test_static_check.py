@@ -0,0 +1,38 @@
+from ai.modules.static_check import StaticChecker, check_script, module_language
+
+PAGE = """import { Button } from "@/components/button";
+
+export default function Page({ user }: { user: string }) {
+  return <main className="p-4">Don't panic, {user}! <Button /></main>;
+}
+"""
+
+def test_language_from_name_technologies_then_files():
+    assert module_language("page.tsx") == "tsx"
+    assert module_language("ui-components", ["React", "typescript"]) == "tsx"
+    assert module_language("auth", ["nextauth", "prisma"]) == "typescript"
+    assert module_language("api-setup", ["fastapi", "python"]) == "python"
+    assert module_language("lib", [], ["src/lib/**/*.ts", "README.md"]) == "typescript"
+    assert module_language("styling", ["tailwind", "css"], ["src/**/*.css"]) is None
+
+def test_tsx_module_is_checked_as_tsx():
+    checker = StaticChecker(["src/components/button.tsx"])
+    language = module_language("pages", ["react", "nextjs"])
+    assert checker.check(PAGE, "pages.tsx", language) == []
+    problems = checker.check(PAGE.replace("</main>;", "</main>;\n  {"), "pages.tsx", language)
+    assert problems and "never closed" in problems[0].message
+
+def test_language_overrides_extension():
+    assert StaticChecker(check_imports=False).check("export const x = 1;\n", "x.py", "typescript") == []
+    assert StaticChecker(check_imports=False).check("export const x = 1;\n", "x.py")
+
+def test_script_scan_reports_position():
+    problems = check_script("const a = {\n  b: [1, 2);\n};\n", "a.ts")
+    assert (problems[0].line, problems[0].column) == (2, 11)
+    assert "expected ']' to close '[' at 2:6" in problems[0].message
+
+def test_unresolved_relative_import():
+    checker = StaticChecker(["src/lib/db.ts"])
+    assert checker.check('import { db } from "./lib/db";\n', "a.ts") == []
+    problems = checker.check('import { cache } from "./lib/cache";\n', "a.ts")
+    assert "cannot resolve import './lib/cache'" in problems[0].message
@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+import threading
+import time
+
+from ai.modules.merkle_tree import build_merkle_tree
+from ai.utils.scheduler import RESOURCE_CPU, Step
+from ai.utils.work_queue import RemoteStages, SharedTokenBucket, TASK_DONE, WorkQueue
+
+def _drain(queue_path, results):
+    queue = WorkQueue(queue_path)
+    worker = f"worker-{os.getpid()}"
+    while True:
+        task = queue.claim(worker, lease_seconds=30)
+        if task is None:
+            return
+        results.put(task.payload["n"])
+        queue.complete(task.id, worker, task.payload["n"] * 2)
+
+def _take(queue_path, count):
+    bucket = SharedTokenBucket(WorkQueue(queue_path), "model", rate=20.0, capacity=1.0)
+    for _ in range(count):
+        bucket.acquire()
+
+def test_each_task_runs_once_across_processes(tmp_path):
+    queue_path = str(tmp_path / "queue.db")
+    queue = WorkQueue(queue_path)
+    ids = [queue.submit("test", {"n": n}) for n in range(40)]
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_drain, args=(queue_path, results)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+    claimed = sorted(results.get(timeout=5) for _ in range(40))
+    assert claimed == list(range(40))
+    assert results.empty()
+    for n, task_id in enumerate(ids):
+        state = queue.status(task_id)
+        assert (state["status"], state["attempts"], state["result"]) == (TASK_DONE, 1, n * 2)
+
+def test_rate_limit_is_shared_by_processes(tmp_path):
+    queue_path = str(tmp_path / "queue.db")
+    WorkQueue(queue_path)
+    started = time.monotonic()
+    processes = [multiprocessing.Process(target=_take, args=(queue_path, 5)) for _ in range(2)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+    # Ten calls at 20/s with a burst of one take at least 9/20 s, whatever the process count
+    assert time.monotonic() - started >= 0.45
+
+def test_tasks_carry_the_calling_steps_priority(tmp_path):
+    remote = RemoteStages(WorkQueue(str(tmp_path / "queue.db")), task_timeout=0.05, poll_interval=0.01)
+    priorities = []
+    remote.queue.submit = lambda kind, payload, priority, attempts: priorities.append(priority) or "id"
+    remote.queue.wait = lambda task_id, timeout, poll_interval: "code"
+    step = Step(RESOURCE_CPU, remote.call, "generate", {})
+    step.priority = 12.5
+    assert step.run() == "code"
+    remote.call("generate", {})
+    assert priorities == [12.5, 0.0]
+
+def test_tests_run_against_a_verified_snapshot(tmp_path):
+    tree = tmp_path / "src"
+    (tree / "node_modules" / "dep").mkdir(parents=True)
+    (tree / "app.ts").write_text("export const app = 1;\n")
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    remote = RemoteStages(queue, poll_interval=0.01)
+    seen = {}
+
+    def worker():
+        task = None
+        while task is None:
+            task = queue.claim("worker")
+        snapshot = task.payload["tree"]
+        seen["files"] = sorted(os.listdir(snapshot["path"]))
+        seen["verified"] = build_merkle_tree(snapshot["path"]).root_hash == snapshot["hash"]
+        queue.complete(task.id, "worker", {"passed": False, "error": "1 failing"})
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    assert remote.run_tests(["app.test.ts"], cwd=str(tree)) is False
+    thread.join()
+    assert remote.get_last_error() == "1 failing"
+    assert seen == {"files": ["app.ts", "node_modules"], "verified": True}
+    assert os.listdir(remote.snapshot_dir) == []
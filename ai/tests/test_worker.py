@@ -0,0 +1,38 @@
+import copy
+import importlib
+
+import pytest
+
+@pytest.fixture
+def work_queue(worker):
+    # The queue module the worker itself imports, under the deployed package
+    return importlib.import_module("ai.core.utils.work_queue")
+
+def _stages(worker, seen):
+    stages = copy.copy(worker.PipelineStages())
+    stages.run_tests = lambda tests, cwd=None: seen.append((tests, cwd)) or True
+    stages.get_last_error = lambda: None
+    return stages
+
+def test_test_tasks_run_in_their_snapshot(worker, work_queue, tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "app.py").write_text("APP = 1\n")
+    queue = work_queue.WorkQueue(str(tmp_path / "queue.db"))
+    remote = work_queue.RemoteStages(queue)
+    seen = []
+    runner = worker.QueueWorker(queue, _stages(worker, seen), worker_id="w")
+    with remote._snapshot(str(tmp_path / "src")) as tree:
+        queue.submit("test", {"tests": ["test_app.py"], "tree": tree})
+        assert runner.run_task(queue.claim("w"))
+    assert seen == [(["test_app.py"], tree["path"])]
+
+def test_mismatched_snapshot_is_refused(worker, work_queue, tmp_path):
+    (tmp_path / "src").mkdir()
+    queue = work_queue.WorkQueue(str(tmp_path / "queue.db"))
+    seen = []
+    runner = worker.QueueWorker(queue, _stages(worker, seen), worker_id="w")
+    task_id = queue.submit("test", {"tests": [], "tree": {"path": str(tmp_path / "src"), "hash": "0" * 64}},
+                           max_attempts=1)
+    assert not runner.run_task(queue.claim("w"))
+    assert queue.status(task_id)["status"] == work_queue.TASK_FAILED
+    assert seen == []
@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+from ai.modules.workspace import PublishConflict, RunWorkspace, link_file
+
+def _publish(root, publish_dir, files, keep=3):
+    workspace = RunWorkspace(str(publish_dir), str(root)).create()
+    for path, content in files.items():
+        target = os.path.join(workspace.path, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "w") as f:
+            f.write(content)
+    workspace.promote(keep)
+    return workspace
+
+def test_repeated_promotion_keeps_shared_directories_reachable(tmp_path):
+    publish_dir = tmp_path / "src"
+    (publish_dir / "node_modules" / "dep").mkdir(parents=True)
+    (publish_dir / "node_modules" / "dep" / "index.js").write_text("dep")
+    (publish_dir / "app.ts").write_text("v0")
+    for version in range(1, 4):
+        _publish(tmp_path / "ws", publish_dir, {"app.ts": f"v{version}"})
+        # A link back through the published path would loop once it points at a release
+        assert (publish_dir / "node_modules" / "dep" / "index.js").read_text() == "dep"
+        assert (publish_dir / "app.ts").read_text() == f"v{version}"
+    assert os.path.islink(publish_dir)
+    assert not os.path.islink(os.readlink(publish_dir / "node_modules"))
+
+def test_old_releases_are_pruned(tmp_path):
+    publish_dir = tmp_path / "src"
+    for version in range(4):
+        _publish(tmp_path / "ws", publish_dir, {"app.ts": f"v{version}"}, keep=2)
+    releases_root = tmp_path / "ws" / "releases"
+    (releases,) = os.listdir(releases_root)
+    assert len(os.listdir(releases_root / releases)) == 2
+
+def test_outputs_sharing_a_root_keep_their_releases(tmp_path):
+    for version in range(3):
+        _publish(tmp_path / "ws", tmp_path / "a", {"a.ts": f"a{version}"}, keep=1)
+        _publish(tmp_path / "ws", tmp_path / "b", {"b.ts": f"b{version}"}, keep=1)
+    assert (tmp_path / "a" / "a.ts").read_text() == "a2"
+    assert (tmp_path / "b" / "b.ts").read_text() == "b2"
+
+def test_promote_refuses_a_changed_base(tmp_path):
+    publish_dir = tmp_path / "src"
+    publish_dir.mkdir()
+    first = RunWorkspace(str(publish_dir), str(tmp_path / "ws")).create()
+    second = RunWorkspace(str(publish_dir), str(tmp_path / "ws")).create()
+    first.promote()
+    with pytest.raises(PublishConflict):
+        second.promote()
+    assert not second.published
+    assert os.path.realpath(publish_dir) == os.path.realpath(first.path)
+
+def test_failed_workspaces_are_set_aside_and_pruned(tmp_path):
+    publish_dir = tmp_path / "src"
+    publish_dir.mkdir()
+    paths = []
+    for _ in range(3):
+        workspace = RunWorkspace(str(publish_dir), str(tmp_path / "ws")).create()
+        paths.append(workspace.fail(keep=2))
+    assert sorted(os.listdir(tmp_path / "ws" / "failed")) == sorted(os.path.basename(p) for p in paths[1:])
+    assert os.listdir(tmp_path / "ws" / "runs") == []
+
+def test_workspace_writes_never_reach_the_published_tree(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "app.ts").write_text("published")
+    workspace = RunWorkspace(str(tmp_path / "src"), str(tmp_path / "ws")).create()
+    with open(os.path.join(workspace.path, "app.ts"), "a") as f:
+        f.write(" and edited")
+    assert (tmp_path / "src" / "app.ts").read_text() == "published"
+
+def test_link_modes(tmp_path):
+    source = tmp_path / "a.txt"
+    source.write_text("a")
+    assert link_file(str(source), str(tmp_path / "copy.txt"), "copy") == "copy"
+    assert link_file(str(source), str(tmp_path / "hard.txt"), "hardlink") == "hardlink"
+    assert os.stat(tmp_path / "hard.txt").st_ino == os.stat(source).st_ino
+    # Reflinks fall back to copies, never to hardlinks sharing the inode
+    assert link_file(str(source), str(tmp_path / "ref.txt"), "reflink") in ("reflink", "copy")
+    assert os.stat(tmp_path / "ref.txt").st_ino != os.stat(source).st_ino
@@ -0,0 +1,236 @@
+"""
+AI Gateway Module
+
+This module sits in front of the code generation and fixing models. It
+coalesces identical in-flight requests into a single call and, when a rate
+is configured, keeps calls under a token-bucket rate limit. When the backend
+supports it, it also batches small generation requests together.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Fields of a module that determine the code generated for it
+REQUEST_FIELDS = ("name", "description", "type", "technologies", "dependencies", "files", "tests", "dependency_context")
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at ``rate`` tokens per second."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until ``tokens`` are available; return the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+def request_key(operation: str, module: Any, *extra: Any) -> str:
+    """Stable key identifying an AI request, used to coalesce duplicates."""
+    fields = {field: getattr(module, field, None) for field in REQUEST_FIELDS}
+    payload = json.dumps([operation, fields, extra], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class _Batcher:
+    """Collects small generation requests and sends them to the backend together."""
+
+    def __init__(self, gateway: 'AIGateway', batch_fn: Callable[[List[Any]], List[str]], max_size: int, window: float):
+        self.gateway = gateway
+        self.batch_fn = batch_fn
+        self.max_size = max_size
+        self.window = window
+        self._pending: List[Tuple[Any, Future]] = []
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, module: Any) -> Future:
+        future: Future = Future()
+        with self._condition:
+            self._pending.append((module, future))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._drain, name="ai-gateway-batcher", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return future
+
+    def _drain(self) -> None:
+        while True:
+            with self._condition:
+                if not self._pending:
+                    self._thread = None
+                    return
+                # Give concurrent callers a short window to join the batch
+                deadline = time.monotonic() + self.window
+                while len(self._pending) < self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch = self._pending[:self.max_size]
+                del self._pending[:self.max_size]
+
+            self.gateway.throttle()
+            try:
+                results = self.batch_fn([module for module, _ in batch])
+                if len(results) != len(batch):
+                    raise ValueError(f"Batch backend returned {len(results)} results for {len(batch)} requests")
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                with self.gateway._lock:
+                    self.gateway.stats["batches"] += 1
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+
+class AIGateway:
+    """Coalescing, rate-limited and batching front end for AI stage calls."""
+
+    def __init__(self,
+                 generate_fn: Callable[[Any], str],
+                 fix_fn: Callable[[Any, str], str],
+                 rate: Optional[float] = None,
+                 burst: Optional[float] = None,
+                 batch_generate_fn: Optional[Callable[[List[Any]], List[str]]] = None,
+                 batch_size: int = 8,
+                 batch_window: float = 0.05,
+                 batch_max_chars: int = 2000,
+                 bucket: Optional[Any] = None):
+        """
+        Args:
+            generate_fn: Backend for single code generation requests
+            fix_fn: Backend for code fixing requests
+            rate: Sustained model calls per second, unlimited when None
+            burst: Calls allowed back to back before rate limiting kicks in
+            batch_generate_fn: Optional backend generating code for several modules in one call
+            batch_size: Maximum requests per batch
+            batch_window: Seconds to wait for more requests before sending a batch
+            batch_max_chars: Requests with larger prompts are never batched
+            bucket: Rate limiter used instead of a local TokenBucket, e.g. one
+                shared by several processes; anything with ``acquire()``
+        """
+        self.generate_fn = generate_fn
+        self.fix_fn = fix_fn
+        self.bucket = bucket if bucket is not None else TokenBucket(rate, burst) if rate else None
+        self.batch_max_chars = batch_max_chars
+        self.batcher = _Batcher(self, batch_generate_fn, batch_size, batch_window) if batch_generate_fn else None
+        self.stats = {"requests": 0, "coalesced": 0, "calls": 0, "batches": 0}
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def throttle(self) -> None:
+        """Wait for the rate limit, if there is one."""
+        if self.bucket is not None:
+            self.bucket.acquire()
+
+    def _coalesce(self, key: str, call: Callable[[], Any]) -> Any:
+        """Run ``call`` once for every concurrent request sharing ``key``."""
+        with self._lock:
+            self.stats["requests"] += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                owner = False
+            else:
+                future = self._in_flight[key] = Future()
+                owner = True
+
+        if not owner:
+            return future.result()
+
+        try:
+            future.set_result(call())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+        return future.result()
+
+    def _is_small(self, module: Any) -> bool:
+        size = len(getattr(module, "description", "") or "") + len(getattr(module, "dependency_context", "") or "")
+        return size <= self.batch_max_chars
+
+    def _call_generate(self, module: Any) -> str:
+        if self.batcher is not None and self._is_small(module):
+            return self.batcher.submit(module).result()
+        self.throttle()
+        with self._lock:
+            self.stats["calls"] += 1
+        return self.generate_fn(module)
+
+    def _call_fix(self, module: Any, error: str) -> str:
+        self.throttle()
+        with self._lock:
+            self.stats["calls"] += 1
+        return self.fix_fn(module, error)
+
+    def generate(self, module: Any) -> str:
+        """Generate code for a module, sharing the result with identical concurrent requests."""
+        return self._coalesce(request_key("generate", module), lambda: self._call_generate(module))
+
+    def fix(self, module: Any, error: str) -> str:
+        """Fix a module's code, sharing the result with identical concurrent requests."""
+        code = getattr(module, "code", "")
+        return self._coalesce(request_key("fix", module, code, error), lambda: self._call_fix(module, error))
+
+# Gateways live as long as a pipeline holds them, so the registry never
+# outgrows the backends in use
+_gateways: 'weakref.WeakValueDictionary[Tuple[Any, ...], AIGateway]' = weakref.WeakValueDictionary()
+_gateways_lock = threading.Lock()
+
+def get_ai_gateway(generate_fn: Callable[[Any], str],
+                   fix_fn: Callable[[Any, str], str],
+                   config: Optional[Dict[str, Any]] = None,
+                   batch_generate_fn: Optional[Callable[[List[Any]], List[str]]] = None,
+                   bucket: Optional[Any] = None) -> AIGateway:
+    """
+    Return the process-wide gateway for a backend, so concurrent pipelines share it.
+
+    Args:
+        generate_fn: Backend for code generation
+        fix_fn: Backend for code fixing
+        config: Optional ``rate``, ``burst``, ``batch_size``, ``batch_window``
+            and ``batch_max_chars`` settings; without ``rate`` calls are not
+            rate limited
+        batch_generate_fn: Optional batch backend for code generation
+        bucket: Rate limiter replacing the one ``rate`` would create
+    """
+    config = config or {}
+    key = (generate_fn, fix_fn, batch_generate_fn, bucket, json.dumps(config, sort_keys=True, default=str))
+    with _gateways_lock:
+        gateway = _gateways.get(key)
+        if gateway is None:
+            gateway = _gateways[key] = AIGateway(
+                generate_fn,
+                fix_fn,
+                rate=config.get("rate"),
+                burst=config.get("burst"),
+                batch_generate_fn=batch_generate_fn,
+                batch_size=config.get("batch_size", 8),
+                batch_window=config.get("batch_window", 0.05),
+                batch_max_chars=config.get("batch_max_chars", 2000),
+                bucket=bucket
+            )
+        return gateway
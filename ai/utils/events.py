@@ -0,0 +1,206 @@
+"""
+Pipeline Events Module
+
+This module defines the typed progress events the pipeline emits while it
+runs: stage boundaries, module status changes, test results and errors.
+It also provides an event stream that can be consumed with a plain ``for``
+loop or with ``async for`` from an event loop, so live UIs can follow a run
+without polling or parsing logs.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Any, Optional, Callable, Iterator, AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+class PipelineEvent:
+    """Base class of all pipeline events."""
+
+    type = "event"
+
+    def __init__(self):
+        self.timestamp = time.time()
+
+    def payload(self) -> Dict[str, Any]:
+        return {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert event to dictionary, e.g. for sending over a websocket."""
+        data = {"type": self.type, "timestamp": self.timestamp}
+        data.update(self.payload())
+        return data
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.payload()})"
+
+class StageStarted(PipelineEvent):
+    """A pipeline stage began."""
+
+    type = "stage_started"
+
+    def __init__(self, stage: str):
+        super().__init__()
+        self.stage = stage
+
+    def payload(self) -> Dict[str, Any]:
+        return {"stage": self.stage}
+
+class StageFinished(PipelineEvent):
+    """A pipeline stage ended."""
+
+    type = "stage_finished"
+
+    def __init__(self, stage: str, success: bool, elapsed: float, data: Optional[Dict[str, Any]] = None):
+        super().__init__()
+        self.stage = stage
+        self.success = success
+        self.elapsed = elapsed
+        self.data = data or {}
+
+    def payload(self) -> Dict[str, Any]:
+        return {"stage": self.stage, "success": self.success, "elapsed": self.elapsed, "data": self.data}
+
+class ModuleStatusChanged(PipelineEvent):
+    """A module moved to a new status."""
+
+    type = "module_status"
+
+    def __init__(self, module: str, status: str, previous: Optional[str] = None):
+        super().__init__()
+        self.module = module
+        self.status = status
+        self.previous = previous
+
+    def payload(self) -> Dict[str, Any]:
+        return {"module": self.module, "status": self.status, "previous": self.previous}
+
+class StepCompleted(PipelineEvent):
+    """A scheduled step of a module finished or timed out."""
+
+    type = "step_completed"
+
+    def __init__(self, module: str, step: str, resource_class: str, elapsed: float, queue_delay: float, succeeded: bool):
+        super().__init__()
+        self.module = module
+        self.step = step
+        self.resource_class = resource_class
+        self.elapsed = elapsed
+        self.queue_delay = queue_delay
+        self.succeeded = succeeded
+
+    def payload(self) -> Dict[str, Any]:
+        return {
+            "module": self.module,
+            "step": self.step,
+            "resource_class": self.resource_class,
+            "elapsed": self.elapsed,
+            "queue_delay": self.queue_delay,
+            "succeeded": self.succeeded
+        }
+
+class TestResult(PipelineEvent):
+    """A module's tests or the end-to-end tests finished."""
+
+    type = "test_result"
+
+    def __init__(self, module: Optional[str], passed: Optional[bool], elapsed: float = 0.0,
+                 error: Optional[str] = None, details: Any = None):
+        super().__init__()
+        self.module = module
+        self.passed = passed
+        self.elapsed = elapsed
+        self.error = error
+        self.details = details
+
+    def payload(self) -> Dict[str, Any]:
+        return {
+            "module": self.module,
+            "passed": self.passed,
+            "elapsed": self.elapsed,
+            "error": self.error,
+            "details": self.details
+        }
+
+class PipelineError(PipelineEvent):
+    """An error was recorded in the pipeline result."""
+
+    type = "error"
+
+    def __init__(self, message: str, stage: Optional[str] = None):
+        super().__init__()
+        self.message = message
+        self.stage = stage
+
+    def payload(self) -> Dict[str, Any]:
+        return {"message": self.message, "stage": self.stage}
+
+class PipelineFinished(PipelineEvent):
+    """The run ended; always the last event of a stream."""
+
+    type = "pipeline_finished"
+
+    def __init__(self, result: Dict[str, Any]):
+        super().__init__()
+        self.result = result
+
+    def payload(self) -> Dict[str, Any]:
+        return {"success": self.result.get("success", False), "result": self.result}
+
+_DONE = object()
+
+class EventStream:
+    """
+    Iterable and async-iterable view of an event generator.
+
+    Iterating runs the generator in the caller's thread. Async iteration
+    runs it on a worker thread and hands events to the event loop as they
+    are produced; leaving the ``async for`` early stops the generator at its
+    next event.
+    """
+
+    def __init__(self, factory: Callable[[], Iterator[PipelineEvent]]):
+        self.factory = factory
+
+    def __iter__(self) -> Iterator[PipelineEvent]:
+        return self.factory()
+
+    async def __aiter__(self) -> AsyncIterator[PipelineEvent]:
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        stopped = threading.Event()
+
+        def deliver(item: Any) -> None:
+            try:
+                loop.call_soon_threadsafe(events.put_nowait, item)
+            except RuntimeError:
+                # The consumer's event loop has already closed
+                stopped.set()
+
+        def produce() -> None:
+            generator = self.factory()
+            try:
+                for event in generator:
+                    deliver(event)
+                    if stopped.is_set():
+                        break
+            except BaseException as e:
+                deliver(e)
+            finally:
+                generator.close()
+                deliver(_DONE)
+
+        thread = threading.Thread(target=produce, name="pipeline-events", daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = await events.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stopped.set()
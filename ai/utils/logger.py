@@ -0,0 +1,252 @@
+"""
+Logger Module
+
+This module configures logging for the ``ai`` package. Records are handed
+to a queue and written by a background listener thread, so pipeline
+threads never block on handler I/O. Output is one JSON object per line.
+Message arguments and structured fields are only rendered when their level
+is enabled, and high-frequency messages can be sampled.
+
+Entry points (the pipeline's command line, workers and simulations) call
+``configure_logging``; library use leaves handlers to the application.
+Settings come from ``configure_logging`` or from the environment:
+``AI_LOG_LEVEL``, ``AI_LOG_FORMAT`` (json or text), ``AI_LOG_FILE`` and
+``AI_LOG_SAMPLE`` (e.g. "Code saved to %s=0.1,module_stage=0.5").
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Any, Optional, Callable
+
+DEFAULT_QUEUE_SIZE = 10000
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class Lazy:
+    """Log argument computed only if the record is actually emitted."""
+
+    __slots__ = ("func", "_value")
+
+    def __init__(self, func: Callable[[], Any]):
+        self.func = func
+        self._value: Any = Lazy
+
+    def value(self) -> Any:
+        if self._value is Lazy:
+            self._value = self.func()
+        return self._value
+
+    def __str__(self) -> str:
+        return str(self.value())
+
+    def __repr__(self) -> str:
+        return repr(self.value())
+
+def lazy(func: Callable[[], Any]) -> Lazy:
+    """Wrap an expensive log argument, e.g. ``logger.debug("Spec: %s", lazy(lambda: dump(spec)))``."""
+    return Lazy(func)
+
+def log_event(logger: logging.Logger, level: int, event: str, **fields: Any) -> None:
+    """
+    Log a structured event.
+
+    Nothing is built when ``level`` is disabled. Field values may be Lazy or
+    zero-argument callables; they are resolved only when the record is emitted.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"event": event, "fields": fields}, stacklevel=2)
+
+def _resolve(value: Any) -> Any:
+    if isinstance(value, Lazy):
+        return value.value()
+    if callable(value):
+        return value()
+    return value
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single-line JSON objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key != "fields":
+                data[key] = value
+        data.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of high-frequency records.
+
+    Records are grouped by their ``event`` or, failing that, their message
+    template. A rate of 0.1 keeps the first record of a group and then
+    every tenth. Warnings and errors are never dropped.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = dict(rates)
+        self._counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        key = getattr(record, "event", None) or record.msg
+        rate = self.rates.get(key) if isinstance(key, str) else None
+        if rate is None or rate >= 1:
+            return True
+        with self._lock:
+            # A new group starts one record short of a keep, so the first
+            # record is kept and the rest are spaced 1 / rate apart
+            credit = self._counters.get(key, 1.0 - rate) + rate
+            keep = credit >= 1.0 - 1e-9
+            self._counters[key] = credit - 1.0 if keep else credit
+        if keep:
+            record.sample_rate = rate
+        return keep
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that renders arguments in the caller and never blocks.
+
+    The message and lazy fields are resolved before enqueueing, so later
+    mutation of logged objects cannot race with the listener. JSON encoding
+    and I/O happen on the listener thread. Records are dropped and counted
+    when the queue is full.
+    """
+
+    def __init__(self, log_queue: "queue.Queue"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        fields = getattr(record, "fields", None)
+        if fields:
+            record.fields = {key: _resolve(value) for key, value in fields.items()}
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[NonBlockingQueueHandler] = None
+_configure_lock = threading.Lock()
+
+def _parse_sample_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        key, _, rate = item.rpartition("=")
+        try:
+            rates[key] = float(rate)
+        except ValueError:
+            continue
+    return rates
+
+def configure_logging(level: Optional[str] = None,
+                      fmt: Optional[str] = None,
+                      filepath: Optional[str] = None,
+                      sample_rates: Optional[Dict[str, float]] = None,
+                      queue_size: int = DEFAULT_QUEUE_SIZE,
+                      logger_name: str = "ai") -> QueueListener:
+    """
+    Route a package's logging through a queue to a background writer.
+
+    Args:
+        level: Minimum level name, defaults to AI_LOG_LEVEL or INFO
+        fmt: "json" or "text", defaults to AI_LOG_FORMAT or json
+        filepath: Log file, defaults to AI_LOG_FILE or stderr
+        sample_rates: Fraction of records kept, by event or message template
+        queue_size: Records buffered before new ones are dropped
+        logger_name: Package logger to attach to
+
+    Returns:
+        The running QueueListener
+    """
+    global _listener, _handler
+    level = level or os.environ.get("AI_LOG_LEVEL", "INFO")
+    fmt = fmt or os.environ.get("AI_LOG_FORMAT", "json")
+    filepath = filepath or os.environ.get("AI_LOG_FILE")
+    if sample_rates is None:
+        sample_rates = _parse_sample_rates(os.environ.get("AI_LOG_SAMPLE", ""))
+
+    with _configure_lock:
+        package_logger = logging.getLogger(logger_name)
+        if _listener is not None:
+            _listener.stop()
+            package_logger.removeHandler(_handler)
+
+        if filepath:
+            directory = os.path.dirname(filepath)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            output: logging.Handler = logging.FileHandler(filepath, encoding="utf-8")
+        else:
+            output = logging.StreamHandler(sys.stderr)
+        if fmt == "json":
+            output.setFormatter(JsonFormatter())
+        else:
+            output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+        _handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+        if sample_rates:
+            _handler.addFilter(SamplingFilter(sample_rates))
+        _listener = QueueListener(_handler.queue, output, respect_handler_level=True)
+        _listener.start()
+
+        package_logger.addHandler(_handler)
+        package_logger.setLevel(level.upper())
+        package_logger.propagate = False
+        return _listener
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+atexit.register(shutdown_logging)
+
+def setup_logger(name: str) -> logging.Logger:
+    """
+    Return the logger for a module.
+
+    No handlers are installed here, so importing the pipeline leaves the
+    host application's logging alone. Entry points call ``configure_logging``;
+    until then records propagate to whatever the application configured.
+
+    Args:
+        name: Module name, usually ``__name__``
+
+    Returns:
+        The module's logger
+    """
+    return logging.getLogger(name)
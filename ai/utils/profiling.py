@@ -0,0 +1,280 @@
+"""
+Profiling Module
+
+This module captures CPU and memory profiles of a pipeline run on demand.
+A whole run, or only chosen stages, can be wrapped in ``cProfile`` for the
+orchestrating thread, a stack sampler covering every thread (scheduler
+steps run on their own threads), and a ``tracemalloc`` snapshot comparison.
+Reports are written next to the run's result file.
+
+cProfile and tracemalloc are process-wide. Only one scope in the process
+is CPU-profiled at a time; concurrent scopes, e.g. of other pipeline runs,
+go without and log a warning. tracemalloc is shared and stopped by the
+last scope using it, if a profiler started it.
+
+Profiling is enabled through the ``profiling`` config key or the
+``AI_PROFILE`` environment variable: "1" or "all" profiles the whole run,
+a comma-separated list of stage names profiles only those stages. When
+neither is set, the pipeline does not create a profiler at all.
+"""
+
+import collections
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLING_INTERVAL = 0.005
+DEFAULT_TOP = 30
+MAX_STACK_DEPTH = 64
+
+# Scope name used when the whole run is profiled
+RUN_SCOPE = "run"
+
+# Process-wide profiler state, shared by every RunProfiler
+_global_lock = threading.Lock()
+_cpu_scope: Optional["_Scope"] = None
+_tracemalloc_users = 0
+_started_tracemalloc = False
+
+def profiling_options(config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Return the profiling options of a run, or None when profiling is off.
+
+    ``AI_PROFILE`` overrides which stages are profiled; the ``profiling``
+    config key may be true or a dict of RunProfiler arguments.
+    """
+    setting = config.get("profiling")
+    options: Dict[str, Any] = dict(setting) if isinstance(setting, dict) else {}
+    enabled = bool(setting)
+    env = os.environ.get("AI_PROFILE", "").strip()
+    if env and env.lower() not in ("0", "false", "no", "off"):
+        enabled = True
+        if env.lower() not in ("1", "true", "yes", "on", "all"):
+            options["stages"] = [stage.strip() for stage in env.split(",") if stage.strip()]
+    return options if enabled else None
+
+class StackSampler:
+    """Samples the stacks of all threads at a fixed interval."""
+
+    def __init__(self, interval: float = DEFAULT_SAMPLING_INTERVAL):
+        self.interval = interval
+        self.stacks: collections.Counter = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                frames: List[str] = []
+                while frame is not None and len(frames) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                # Thread names like "step-12" collapse to their prefix
+                thread = names.get(ident, str(ident)).rstrip("0123456789").rstrip("-_") or "thread"
+                self.stacks[";".join([thread] + frames[::-1])] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        """Samples in the folded format read by flame graph tools."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+class _Scope:
+    """Profilers of one profiled scope."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+        self.cpu: Optional[cProfile.Profile] = None
+        self.sampler: Optional[StackSampler] = None
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self.memory_report: Optional[str] = None
+        self.peak_memory: Optional[int] = None
+        self.tracing = False
+
+def _acquire_tracemalloc(frames: int) -> None:
+    global _tracemalloc_users, _started_tracemalloc
+    with _global_lock:
+        if _tracemalloc_users == 0:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+                _started_tracemalloc = True
+            # Peaks are per process; they only describe a scope running alone
+            tracemalloc.reset_peak()
+        _tracemalloc_users += 1
+
+def _release_tracemalloc() -> None:
+    global _tracemalloc_users, _started_tracemalloc
+    with _global_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _started_tracemalloc:
+            tracemalloc.stop()
+            _started_tracemalloc = False
+
+def _acquire_cpu(scope: _Scope) -> bool:
+    """Make ``scope`` the process's CPU-profiled scope, unless another one is."""
+    global _cpu_scope
+    with _global_lock:
+        if _cpu_scope is not None:
+            logger.warning("Scope %s is already CPU-profiled in this process; %s runs without cProfile",
+                           _cpu_scope.name, scope.name)
+            return False
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # Another profiler, e.g. one started outside the pipeline, is active
+            logger.warning("Cannot CPU-profile %s: %s", scope.name, e)
+            return False
+        scope.cpu = profile
+        _cpu_scope = scope
+        return True
+
+def _release_cpu(scope: _Scope) -> None:
+    global _cpu_scope
+    with _global_lock:
+        if scope.cpu is not None:
+            scope.cpu.disable()
+        if _cpu_scope is scope:
+            _cpu_scope = None
+
+class RunProfiler:
+    """CPU and memory profiling of a pipeline run or of chosen stages."""
+
+    def __init__(self, stages: Optional[List[str]] = None,
+                 cpu: bool = True,
+                 sampling: bool = True,
+                 memory: bool = True,
+                 sampling_interval: float = DEFAULT_SAMPLING_INTERVAL,
+                 top: int = DEFAULT_TOP,
+                 memory_frames: int = 1):
+        """
+        Args:
+            stages: Stages to profile; the whole run when None
+            cpu: Run cProfile in the orchestrating thread
+            sampling: Sample the stacks of all threads
+            memory: Compare tracemalloc snapshots taken around each scope
+            sampling_interval: Seconds between stack samples
+            top: Entries in the text reports
+            memory_frames: Frames recorded per allocation
+        """
+        self.stages = set(stages) if stages else None
+        self.cpu = cpu
+        self.sampling = sampling
+        self.memory = memory
+        self.sampling_interval = sampling_interval
+        self.top = top
+        self.memory_frames = memory_frames
+        self._active: Dict[str, _Scope] = {}
+        self._finished: List[_Scope] = []
+
+    def wants(self, stage: str) -> bool:
+        """Whether a stage is profiled on its own."""
+        return self.stages is not None and stage in self.stages
+
+    def start(self, name: str = RUN_SCOPE) -> None:
+        """Start profiling a scope: the run or a stage."""
+        scope = _Scope(name)
+        if self.memory:
+            _acquire_tracemalloc(self.memory_frames)
+            scope.tracing = True
+            scope.snapshot = tracemalloc.take_snapshot()
+        if self.sampling:
+            scope.sampler = StackSampler(self.sampling_interval)
+            scope.sampler.start()
+        if self.cpu:
+            _acquire_cpu(scope)
+        scope.started = time.monotonic()
+        self._active[name] = scope
+
+    def stop(self, name: str = RUN_SCOPE) -> None:
+        """Stop profiling a scope and keep its results for ``write``."""
+        scope = self._active.pop(name, None)
+        if scope is None:
+            return
+        scope.elapsed = time.monotonic() - scope.started
+        _release_cpu(scope)
+        if scope.sampler is not None:
+            scope.sampler.stop()
+        if scope.snapshot is not None and tracemalloc.is_tracing():
+            ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*")]
+            after = tracemalloc.take_snapshot().filter_traces(ignore)
+            differences = after.compare_to(scope.snapshot.filter_traces(ignore), "lineno")
+            scope.peak_memory = tracemalloc.get_traced_memory()[1]
+            lines = [f"Top {self.top} allocation differences over {scope.elapsed:.2f}s "
+                     f"(peak traced memory {scope.peak_memory / 1048576:.1f} MiB)"]
+            lines.extend(str(difference) for difference in differences[:self.top])
+            scope.memory_report = "\n".join(lines) + "\n"
+            # Snapshots hold every traced allocation; drop it as soon as possible
+            scope.snapshot = None
+        if scope.tracing:
+            _release_tracemalloc()
+            scope.tracing = False
+        self._finished.append(scope)
+
+    def close(self) -> None:
+        """Stop every active scope; the last scope using tracemalloc stops it."""
+        for name in list(self._active):
+            self.stop(name)
+
+    def write(self, directory: str, run_id: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Write the reports of all finished scopes.
+
+        Files are named ``profile_<run_id>_<scope>`` with ``.prof`` (pstats),
+        ``.txt`` (top functions), ``.folded`` (stack samples) and
+        ``_memory.txt`` (allocation differences) suffixes.
+
+        Returns:
+            Report paths and totals by scope
+        """
+        self.close()
+        os.makedirs(directory, exist_ok=True)
+        reports: Dict[str, Dict[str, Any]] = {}
+        for scope in self._finished:
+            base = os.path.join(directory, f"profile_{run_id}_{scope.name}")
+            report: Dict[str, Any] = {"elapsed": scope.elapsed}
+            if scope.cpu is not None:
+                scope.cpu.dump_stats(base + ".prof")
+                text = io.StringIO()
+                stats = pstats.Stats(scope.cpu, stream=text).strip_dirs()
+                stats.sort_stats("cumulative").print_stats(self.top)
+                stats.sort_stats("tottime").print_stats(self.top)
+                with open(base + ".txt", "w", encoding="utf-8") as f:
+                    f.write(text.getvalue())
+                report.update(cpu=base + ".prof", cpu_report=base + ".txt")
+            if scope.sampler is not None:
+                with open(base + ".folded", "w", encoding="utf-8") as f:
+                    f.write(scope.sampler.folded())
+                report.update(samples=base + ".folded", sample_count=scope.sampler.samples)
+            if scope.memory_report is not None:
+                with open(base + "_memory.txt", "w", encoding="utf-8") as f:
+                    f.write(scope.memory_report)
+                report.update(memory=base + "_memory.txt", peak_memory=scope.peak_memory)
+            reports[scope.name] = report
+        logger.info("Wrote profiles of %s to %s", ', '.join(reports) or 'nothing', directory)
+        return reports
@@ -0,0 +1,448 @@
+"""
+Resource Scheduler Module
+
+This module runs pipeline work as jobs made of steps. Each step is tagged
+with the resource it draws on: the remote model, the CPU or the disk. Every
+resource class has its own concurrency limit, so tests keep the CPU busy
+while model calls are outstanding, and model calls stay within provider
+rate limits. Ready steps are dispatched by the critical-path priority of
+their job. Steps and jobs can have timeouts, and when a job fails its
+dependents are blocked rather than started.
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Any, Optional, Callable, Generator, Iterable, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+RESOURCE_LLM = "llm"
+RESOURCE_CPU = "cpu"
+RESOURCE_DISK = "disk"
+
+DEFAULT_LIMITS = {
+    RESOURCE_LLM: 4,
+    RESOURCE_CPU: os.cpu_count() or 2,
+    RESOURCE_DISK: 2
+}
+
+class Cancelled(Exception):
+    """Raised by cooperative work that noticed its cancellation token."""
+
+class StageTimeout(TimeoutError):
+    """A step ran longer than its stage timeout."""
+
+class JobTimeout(TimeoutError):
+    """A job ran longer than its module timeout."""
+
+class JobFailed(Exception):
+    """Raised by a job's steps to mark the job failed after handling the error itself."""
+
+class DependencyFailed(Exception):
+    """A job was not started because a job it depends on failed."""
+
+class CancelToken:
+    """Flag set when the work holding it should stop as soon as it can."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Sleep up to ``timeout`` seconds; return True early if cancelled."""
+        return self._event.wait(timeout)
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise Cancelled()
+
+_local = threading.local()
+
+def current_cancel_token() -> Optional[CancelToken]:
+    """Return the cancellation token of the step running in this thread, if any."""
+    return getattr(_local, "token", None)
+
+def current_priority() -> float:
+    """Return the critical-path priority of the step running in this thread, 0 outside steps."""
+    return getattr(_local, "priority", 0.0)
+
+class Step:
+    """One unit of work a job yields to the scheduler."""
+
+    def __init__(self, resource_class: str, func: Callable[..., Any], *args: Any,
+                 stage: Optional[str] = None, timeout: Optional[float] = None, **kwargs: Any):
+        """
+        Args:
+            resource_class: Resource the step draws on
+            func: Function to run; other positional and keyword arguments are passed to it
+            stage: Stage name used to look up the stage timeout, defaults to the function name
+            timeout: Seconds the step may run, overriding the stage timeout
+        """
+        self.resource_class = resource_class
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.name = stage or getattr(func, "__name__", "step")
+        self.timeout = timeout
+        self.token = CancelToken()
+        # Critical-path priority of the job, set when the step is queued
+        self.priority = 0.0
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.queued_at: Optional[float] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def run(self) -> Any:
+        self.started_at = time.monotonic()
+        _local.token = self.token
+        _local.priority = self.priority
+        try:
+            return self.func(*self.args, **self.kwargs)
+        finally:
+            _local.token = None
+            _local.priority = 0.0
+            self.finished_at = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds the step spent running."""
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+    @property
+    def queue_delay(self) -> float:
+        """Seconds the step waited for a free slot in its resource class."""
+        if self.queued_at is None or self.started_at is None:
+            return 0.0
+        return self.started_at - self.queued_at
+
+JobSteps = Generator[Step, Any, Any]
+
+def run_with_timeout(func: Callable[..., Any], timeout: Optional[float], *args: Any,
+                     stage: Optional[str] = None, **kwargs: Any) -> Any:
+    """
+    Run a function outside the scheduler, giving up after ``timeout`` seconds.
+
+    The function runs on a daemon thread with a cancellation token; on timeout
+    the token is cancelled and the thread is abandoned.
+
+    Raises:
+        StageTimeout: If the function did not return in time
+    """
+    step = Step(RESOURCE_CPU, func, *args, stage=stage, **kwargs)
+    if not timeout:
+        return step.run()
+
+    outcome: Dict[str, Any] = {}
+
+    def target() -> None:
+        try:
+            outcome["value"] = step.run()
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, name=f"timeout:{step.name}", daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        step.token.cancel()
+        raise StageTimeout(f"{step.name} timed out after {timeout}s")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome.get("value")
+
+class Job:
+    """A named sequence of steps with dependencies on other jobs."""
+
+    def __init__(self, name: str, steps: Callable[[], JobSteps], dependencies: Iterable[str] = (),
+                 duration: float = 0.0, timeout: Optional[float] = None):
+        self.name = name
+        self.steps = steps
+        self.dependencies = list(dependencies)
+        self.duration = duration
+        self.timeout = timeout
+        self.priority = duration
+        self.status = "pending"
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._generator: Optional[JobSteps] = None
+
+    @property
+    def deadline(self) -> Optional[float]:
+        if self.timeout is None or self.started_at is None:
+            return None
+        return self.started_at + self.timeout
+
+class ResourceScheduler:
+    """Dispatches job steps under per-resource-class concurrency limits."""
+
+    def __init__(self,
+                 limits: Optional[Dict[str, int]] = None,
+                 admission: Any = None,
+                 stage_timeouts: Optional[Dict[str, float]] = None,
+                 fail_fast: bool = True):
+        """
+        Args:
+            limits: Maximum concurrent steps per resource class
+            admission: Optional lock with try_acquire(name)/release(name) that must
+                admit a job before it starts (e.g. a WriteSetLock)
+            stage_timeouts: Seconds a step may run, by step name
+            fail_fast: Block the dependents of a failed job instead of running them
+        """
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits.update(limits or {})
+        self.admission = admission
+        self.stage_timeouts = dict(stage_timeouts or {})
+        self.fail_fast = fail_fast
+        self.jobs: Dict[str, Job] = {}
+        self._sequence = itertools.count()
+
+    def add_job(self, name: str, steps: Callable[[], JobSteps], dependencies: Iterable[str] = (),
+                duration: float = 0.0, timeout: Optional[float] = None) -> Job:
+        """
+        Register a job; ``steps`` is called once the job may start and must return a step generator.
+
+        A job fails when its generator raises, including ``JobFailed``. With
+        ``timeout`` set, the job is cancelled once it has run that many seconds.
+        """
+        job = Job(name, steps, dependencies, duration, timeout)
+        self.jobs[name] = job
+        return job
+
+    def _dependents(self) -> Dict[str, List[str]]:
+        dependents: Dict[str, List[str]] = {name: [] for name in self.jobs}
+        for job in self.jobs.values():
+            for dep in job.dependencies:
+                if dep in dependents:
+                    dependents[dep].append(job.name)
+        return dependents
+
+    def _compute_priorities(self) -> None:
+        """Priority is the longest expected duration from a job to the end of the plan."""
+        dependents = self._dependents()
+
+        memo: Dict[str, float] = {}
+        visiting = set()
+
+        def bottom_level(name: str) -> float:
+            if name in memo:
+                return memo[name]
+            if name in visiting:
+                # Cycle: ignore the back edge
+                return 0.0
+            visiting.add(name)
+            downstream = max((bottom_level(d) for d in dependents[name]), default=0.0)
+            visiting.discard(name)
+            memo[name] = self.jobs[name].duration + downstream
+            return memo[name]
+
+        for name, job in self.jobs.items():
+            job.priority = bottom_level(name)
+
+    def _dependencies_done(self, job: Job) -> bool:
+        return all(
+            self.jobs[dep].status in ("completed", "failed", "blocked")
+            for dep in job.dependencies if dep in self.jobs
+        )
+
+    def run(self) -> Dict[str, Job]:
+        """
+        Run every job to completion.
+
+        Returns:
+            The jobs by name, with status ``completed``, ``failed`` or ``blocked``
+        """
+        for _ in self.iter_run():
+            pass
+        return self.jobs
+
+    def iter_run(self) -> Iterator[Tuple[Job, Optional[Step]]]:
+        """
+        Run every job to completion, yielding progress as it happens.
+
+        Steps run on daemon threads, so a step abandoned after its timeout
+        cannot keep the run alive. Its cancellation token is set so that
+        cooperative work can stop early.
+
+        Yields:
+            ``(job, step)`` after a step finished or timed out, with the step's
+            ``result`` or ``error`` set, and ``(job, None)`` after a job was
+            cancelled for running past its timeout
+        """
+        self._compute_priorities()
+        dependents = self._dependents()
+        queues: Dict[str, List[Tuple[float, int, Job, Step]]] = {}
+        running: Dict[str, int] = {}
+        in_flight: Dict[Step, Tuple[Job, Optional[float]]] = {}
+        completions: "queue.Queue[Tuple[Step, Any, Optional[BaseException]]]" = queue.Queue()
+        pending = [job for job in self.jobs.values() if job.status == "pending"]
+
+        def advance(job: Job, value: Any = None, error: Optional[BaseException] = None) -> None:
+            """Resume a job's generator and queue its next step, or finish the job."""
+            try:
+                if error is not None:
+                    step = job._generator.throw(error)
+                else:
+                    step = job._generator.send(value)
+            except StopIteration as stop:
+                finish(job, "completed", result=stop.value)
+                return
+            except Exception as e:
+                finish(job, "failed", error=e)
+                return
+            step.queued_at = time.monotonic()
+            step.priority = job.priority
+            heapq.heappush(queues.setdefault(step.resource_class, []),
+                           (-job.priority, next(self._sequence), job, step))
+
+        def finish(job: Job, status: str, result: Any = None, error: Optional[BaseException] = None) -> None:
+            job.status = status
+            job.result = result
+            job.error = error
+            job.finished_at = time.monotonic()
+            if self.admission is not None:
+                self.admission.release(job.name)
+            if error is not None:
+                logger.error("Job %s failed: %s", job.name, error)
+            if status == "failed" and self.fail_fast:
+                block_dependents(job)
+
+        def block_dependents(failed: Job) -> None:
+            stack = [failed.name]
+            while stack:
+                for name in dependents[stack.pop()]:
+                    job = self.jobs[name]
+                    if job.status != "pending":
+                        continue
+                    pending.remove(job)
+                    job.status = "blocked"
+                    job.error = DependencyFailed(f"Dependency {failed.name} failed")
+                    job.finished_at = time.monotonic()
+                    logger.warning("Job %s blocked: dependency %s failed", name, failed.name)
+                    stack.append(name)
+
+        def abandon(step: Step) -> None:
+            """Stop waiting for an in-flight step and signal it to cancel."""
+            in_flight.pop(step)
+            running[step.resource_class] -= 1
+            step.token.cancel()
+
+        def cancel(job: Job, error: BaseException) -> None:
+            """Cancel a running job: abandon its steps and let its generator clean up."""
+            for step in [s for s, (owner, _) in in_flight.items() if owner is job]:
+                abandon(step)
+            try:
+                job._generator.throw(error)
+                job._generator.close()
+            except BaseException:
+                pass
+            # Queued steps of the job are dropped when they reach the front of their queue
+            finish(job, "failed", error=error)
+
+        def expire() -> List[Tuple[Job, Optional[Step]]]:
+            now = time.monotonic()
+            expired: List[Tuple[Job, Optional[Step]]] = []
+            for step, (job, deadline) in list(in_flight.items()):
+                if step in in_flight and deadline is not None and now >= deadline:
+                    abandon(step)
+                    step.error = StageTimeout(f"{step.name} for {job.name} timed out after {step.timeout}s")
+                    advance(job, error=step.error)
+                    expired.append((job, step))
+            for job in self.jobs.values():
+                if job.status == "running" and job.deadline is not None and now >= job.deadline:
+                    cancel(job, JobTimeout(f"Job {job.name} timed out after {job.timeout}s"))
+                    expired.append((job, None))
+            return expired
+
+        def next_deadline() -> Optional[float]:
+            deadlines = [deadline for _, deadline in in_flight.values() if deadline is not None]
+            deadlines.extend(job.deadline for job in self.jobs.values()
+                             if job.status == "running" and job.deadline is not None)
+            return min(deadlines, default=None)
+
+        def launch(job: Job, step: Step) -> None:
+            if step.timeout is None:
+                step.timeout = self.stage_timeouts.get(step.name)
+            deadline = time.monotonic() + step.timeout if step.timeout else None
+            in_flight[step] = (job, deadline)
+
+            def target() -> None:
+                try:
+                    completions.put((step, step.run(), None))
+                except BaseException as e:
+                    completions.put((step, None, e))
+
+            threading.Thread(target=target, name=f"{job.name}:{step.name}", daemon=True).start()
+
+        def start_ready_jobs(force: bool = False) -> None:
+            ready = [job for job in pending if force or self._dependencies_done(job)]
+            ready.sort(key=lambda j: -j.priority)
+            if force:
+                ready = ready[:1]
+                logger.warning("Unsatisfiable dependencies, starting %s anyway", ready[0].name)
+            for job in ready:
+                if job.status != "pending":
+                    # Blocked by a job that failed while starting this batch
+                    continue
+                if self.admission is not None and not self.admission.try_acquire(job.name):
+                    continue
+                pending.remove(job)
+                job.status = "running"
+                job.started_at = time.monotonic()
+                job._generator = job.steps()
+                advance(job)
+
+        while True:
+            start_ready_jobs()
+
+            for resource_class, ready_steps in queues.items():
+                limit = max(self.limits.get(resource_class, 1), 1)
+                while ready_steps and running.get(resource_class, 0) < limit:
+                    _, _, job, step = heapq.heappop(ready_steps)
+                    if job.status != "running":
+                        continue
+                    running[resource_class] = running.get(resource_class, 0) + 1
+                    launch(job, step)
+
+            if not in_flight:
+                if not pending:
+                    break
+                if not any(queues.values()):
+                    # Nothing can make progress: break the dependency cycle
+                    start_ready_jobs(force=True)
+                continue
+
+            deadline = next_deadline()
+            try:
+                step, value, error = completions.get(
+                    timeout=max(deadline - time.monotonic(), 0.0) if deadline is not None else None
+                )
+            except queue.Empty:
+                yield from expire()
+                continue
+
+            if step in in_flight:
+                job, _ = in_flight.pop(step)
+                running[step.resource_class] -= 1
+                step.result, step.error = value, error
+                if error is not None:
+                    advance(job, error=error)
+                else:
+                    advance(job, value)
+                yield job, step
+            yield from expire()
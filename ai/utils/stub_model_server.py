@@ -0,0 +1,155 @@
+"""
+Stub Model Server Module
+
+This module runs a local HTTP server that imitates the code generation
+model. It lets the AI gateway's coalescing, rate limiting and batching be
+exercised without calling a real provider. It also provides a small client
+whose methods plug into ``AIGateway`` as backends.
+"""
+
+import json
+import logging
+import random
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class StubModelServer:
+    """Local stand-in for the model provider with configurable latency and throttling."""
+
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 latency: float = 0.05,
+                 jitter: float = 0.0,
+                 failure_rate: float = 0.0,
+                 max_requests_per_second: Optional[float] = None):
+        """
+        Args:
+            host: Interface to bind
+            port: Port to bind, 0 for any free port
+            latency: Seconds every request takes
+            jitter: Extra uniformly distributed latency, in seconds
+            failure_rate: Fraction of requests answered with HTTP 500
+            max_requests_per_second: Answer HTTP 429 above this request rate
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.max_requests_per_second = max_requests_per_second
+        self.requests: Dict[str, int] = {"generate": 0, "fix": 0, "generate_batch": 0}
+        self.throttled = 0
+        self._recent: List[float] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'StubModelServer':
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-model-server", daemon=True)
+        self._thread.start()
+        logger.info("Stub model server listening on %s", self.url)
+        return self
+
+    def stop(self) -> None:
+        """Shut the server down."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'StubModelServer':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _admit(self, operation: str) -> int:
+        """Count a request and return the HTTP status it should get."""
+        with self._lock:
+            self.requests[operation] = self.requests.get(operation, 0) + 1
+            if self.max_requests_per_second:
+                now = time.monotonic()
+                self._recent = [t for t in self._recent if now - t < 1.0]
+                if len(self._recent) >= self.max_requests_per_second:
+                    self.throttled += 1
+                    return 429
+                self._recent.append(now)
+        if random.random() < self.failure_rate:
+            return 500
+        return 200
+
+    def _respond(self, operation: str, payload: Dict[str, Any]) -> Any:
+        if operation == "generate":
+            return {"code": f"// generated for {payload['module']['name']}\n"}
+        if operation == "fix":
+            return {"code": payload["module"].get("code", "") + f"\n// fixed: {payload['error'][:80]}\n"}
+        return {"codes": [f"// generated for {m['name']}\n" for m in payload["modules"]]}
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                operation = self.path.strip("/")
+                if operation not in stub.requests:
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+
+                status = stub._admit(operation)
+                time.sleep(stub.latency + random.uniform(0, stub.jitter))
+                if status != 200:
+                    self.send_error(status)
+                    return
+
+                body = json.dumps(stub._respond(operation, payload)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                logger.debug(format, *args)
+
+        return Handler
+
+def _module_payload(module: Any) -> Dict[str, Any]:
+    if hasattr(module, "to_dict"):
+        return module.to_dict()
+    return dict(module)
+
+class StubModelClient:
+    """HTTP client for StubModelServer exposing gateway-compatible backends."""
+
+    def __init__(self, url: str, timeout: float = 30.0):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _post(self, operation: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        request = urllib.request.Request(
+            f"{self.url}/{operation}",
+            data=json.dumps(payload, default=str).encode("utf-8"),
+            headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def generate(self, module: Any) -> str:
+        return self._post("generate", {"module": _module_payload(module)})["code"]
+
+    def fix(self, module: Any, error: str) -> str:
+        return self._post("fix", {"module": _module_payload(module), "error": error})["code"]
+
+    def generate_batch(self, modules: List[Any]) -> List[str]:
+        return self._post("generate_batch", {"modules": [_module_payload(m) for m in modules]})["codes"]
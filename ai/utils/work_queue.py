@@ -0,0 +1,438 @@
+"""
+Work Queue Module
+
+This module implements a durable task queue in a SQLite file, so module
+work can be spread over worker processes on several hosts sharing a
+volume. Workers claim tasks under a lease and extend it with heartbeats;
+a task whose lease runs out is handed to another worker, up to a maximum
+number of attempts. Results are written back to the queue, where the
+orchestrator waiting on the task picks them up.
+
+Test tasks run against a snapshot of the output tree the orchestrator
+writes next to the queue, named by its Merkle hash, which the worker checks
+before running anything. The queue file also holds token buckets shared by
+every worker, so a rate limit applies to the fleet, not to each worker.
+"""
+
+import json
+import logging
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Iterator
+
+from ..modules.merkle_tree import build_merkle_tree
+from ..modules.workspace import DEFAULT_LINK_MODE, materialize_tree
+from .scheduler import Cancelled, current_cancel_token, current_priority
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_PATH = "ai/data/work_queue.db"
+DEFAULT_LEASE_SECONDS = 30.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_POLL_INTERVAL = 0.5
+
+TASK_QUEUED = "queued"
+TASK_LEASED = "leased"
+TASK_DONE = "done"
+TASK_FAILED = "failed"
+TASK_CANCELLED = "cancelled"
+
+class TaskFailed(Exception):
+    """A task failed on its worker or ran out of attempts."""
+
+class LeaseLost(Exception):
+    """A worker no longer holds the lease of the task it is working on."""
+
+class Task:
+    """A unit of work claimed from the queue."""
+
+    def __init__(self, task_id: str, kind: str, payload: Dict[str, Any], attempts: int, lease_expires: float):
+        self.id = task_id
+        self.kind = kind
+        self.payload = payload
+        self.attempts = attempts
+        self.lease_expires = lease_expires
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "kind": self.kind, "payload": self.payload,
+                "attempts": self.attempts, "lease_expires": self.lease_expires}
+
+def default_worker_id() -> str:
+    """Identify a worker by host, process and a random suffix."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+class WorkQueue:
+    """SQLite-backed queue of tasks with leases."""
+
+    def __init__(self, filepath: str = DEFAULT_QUEUE_PATH):
+        self.filepath = filepath
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            # WAL needs shared memory, which network filesystems may not
+            # provide; fall back to the rollback journal there
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+            except sqlite3.OperationalError:
+                pass
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    priority REAL NOT NULL DEFAULT 0,
+                    worker TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (status, priority DESC, created_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_limits (
+                    name TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.filepath, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction taking the database lock up front."""
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def submit(self, kind: str, payload: Dict[str, Any], priority: float = 0.0,
+               max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> str:
+        """
+        Publish a task.
+
+        Args:
+            kind: Task type, e.g. "generate", "test" or "fix"
+            payload: JSON-serializable task input
+            priority: Higher priorities are claimed first
+            max_attempts: Leases handed out before the task is failed
+
+        Returns:
+            The task id
+        """
+        task_id = uuid.uuid4().hex
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO tasks (id, kind, payload, status, priority, max_attempts, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (task_id, kind, json.dumps(payload, default=str), TASK_QUEUED, priority, max_attempts, now, now)
+            )
+        return task_id
+
+    def _expire_leases(self, conn: sqlite3.Connection, now: float) -> int:
+        """Requeue tasks whose worker stopped heartbeating, or fail them when out of attempts."""
+        conn.execute(
+            "UPDATE tasks SET status = ?, worker = NULL, updated_at = ?, "
+            "error = 'lease expired after ' || attempts || ' attempts' "
+            "WHERE status = ? AND lease_expires < ? AND attempts >= max_attempts",
+            (TASK_FAILED, now, TASK_LEASED, now)
+        )
+        requeued = conn.execute(
+            "UPDATE tasks SET status = ?, worker = NULL, updated_at = ? WHERE status = ? AND lease_expires < ?",
+            (TASK_QUEUED, now, TASK_LEASED, now)
+        ).rowcount
+        if requeued:
+            logger.warning("Requeued %s tasks with expired leases", requeued)
+        return requeued
+
+    def requeue_expired(self) -> int:
+        """Requeue tasks with expired leases; returns how many were requeued."""
+        with self._transaction() as conn:
+            return self._expire_leases(conn, time.time())
+
+    def claim(self, worker: str, kinds: Optional[List[str]] = None,
+              lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[Task]:
+        """
+        Lease the highest-priority queued task.
+
+        Args:
+            worker: Id of the claiming worker
+            kinds: Task types this worker handles, all when None
+            lease_seconds: Lease length; extend it with ``heartbeat``
+
+        Returns:
+            The claimed Task, or None when nothing is queued
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            self._expire_leases(conn, now)
+            query = "SELECT id, kind, payload, attempts FROM tasks WHERE status = ?"
+            params: List[Any] = [TASK_QUEUED]
+            if kinds:
+                query += f" AND kind IN ({', '.join('?' for _ in kinds)})"
+                params.extend(kinds)
+            row = conn.execute(query + " ORDER BY priority DESC, created_at LIMIT 1", params).fetchone()
+            if row is None:
+                return None
+            task_id, kind, payload, attempts = row
+            expires = now + lease_seconds
+            conn.execute(
+                "UPDATE tasks SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE id = ?",
+                (TASK_LEASED, worker, expires, now, task_id)
+            )
+        return Task(task_id, kind, json.loads(payload), attempts + 1, expires)
+
+    def heartbeat(self, task_id: str, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """
+        Extend a lease.
+
+        Returns:
+            False when the worker no longer holds the task, e.g. because the
+            lease expired and it was requeued, or it was cancelled
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE tasks SET lease_expires = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = ?",
+                (now + lease_seconds, now, task_id, worker, TASK_LEASED)
+            ).rowcount
+        return updated == 1
+
+    def complete(self, task_id: str, worker: str, result: Any) -> bool:
+        """Record a task's result; False if the worker had lost the lease."""
+        return self._finish(task_id, worker, TASK_DONE, result=json.dumps(result, default=str))
+
+    def fail(self, task_id: str, worker: str, error: str) -> bool:
+        """Record that a task failed; False if the worker had lost the lease."""
+        return self._finish(task_id, worker, TASK_FAILED, error=error)
+
+    def _finish(self, task_id: str, worker: str, status: str,
+                result: Optional[str] = None, error: Optional[str] = None) -> bool:
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE tasks SET status = ?, result = ?, error = ?, lease_expires = NULL, updated_at = ? "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                (status, result, error, time.time(), task_id, worker, TASK_LEASED)
+            ).rowcount
+        if not updated:
+            logger.warning("Worker %s lost task %s before finishing it", worker, task_id)
+        return updated == 1
+
+    def cancel(self, task_id: str) -> None:
+        """Withdraw a task that is queued or being worked on."""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = ?, updated_at = ? WHERE id = ? AND status IN (?, ?)",
+                (TASK_CANCELLED, time.time(), task_id, TASK_QUEUED, TASK_LEASED)
+            )
+
+    def status(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Return a task's status, attempts, result and error."""
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT status, attempts, worker, result, error FROM tasks WHERE id = ?", (task_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        status, attempts, worker, result, error = row
+        return {"status": status, "attempts": attempts, "worker": worker,
+                "result": json.loads(result) if result is not None else None, "error": error}
+
+    def wait(self, task_id: str, timeout: Optional[float] = None,
+             poll_interval: float = DEFAULT_POLL_INTERVAL) -> Any:
+        """
+        Block until a task finishes and return its result.
+
+        Polling stops early when the calling step's cancellation token is
+        set, in which case the task is cancelled too.
+
+        Raises:
+            TaskFailed: If the task failed or was cancelled
+            TimeoutError: If ``timeout`` elapsed first
+            Cancelled: If the caller was cancelled
+        """
+        token = current_cancel_token()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            state = self.status(task_id)
+            if state is None:
+                raise TaskFailed(f"Task {task_id} does not exist")
+            if state["status"] == TASK_DONE:
+                return state["result"]
+            if state["status"] in (TASK_FAILED, TASK_CANCELLED):
+                raise TaskFailed(state["error"] or f"Task {task_id} {state['status']}")
+            if deadline is not None and time.monotonic() >= deadline:
+                self.cancel(task_id)
+                raise TimeoutError(f"Task {task_id} did not finish within {timeout}s")
+            if token is not None and token.wait(poll_interval):
+                self.cancel(task_id)
+                raise Cancelled(f"Task {task_id} cancelled")
+            elif token is None:
+                time.sleep(poll_interval)
+
+    def take_tokens(self, name: str, rate: float, capacity: float, tokens: float = 1.0) -> float:
+        """
+        Take tokens from a bucket shared through the queue file.
+
+        Returns:
+            0 when the tokens were taken, otherwise the seconds until they
+            will be available
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT tokens, updated_at FROM rate_limits WHERE name = ?", (name,)).fetchone()
+            available = capacity if row is None else min(capacity, row[0] + max(now - row[1], 0.0) * rate)
+            delay = 0.0
+            if available >= tokens:
+                available -= tokens
+            else:
+                delay = (tokens - available) / rate
+            conn.execute("INSERT OR REPLACE INTO rate_limits (name, tokens, updated_at) VALUES (?, ?, ?)",
+                         (name, available, now))
+        return delay
+
+    def counts(self) -> Dict[str, int]:
+        """Number of tasks in each status."""
+        with self._connection() as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+
+    def purge(self, older_than: float = 86400.0) -> int:
+        """Delete finished tasks last updated more than ``older_than`` seconds ago."""
+        with self._transaction() as conn:
+            return conn.execute(
+                "DELETE FROM tasks WHERE status IN (?, ?, ?) AND updated_at < ?",
+                (TASK_DONE, TASK_FAILED, TASK_CANCELLED, time.time() - older_than)
+            ).rowcount
+
+class SharedTokenBucket:
+    """Token bucket kept in a work queue file, shared by every process using it."""
+
+    def __init__(self, work_queue: WorkQueue, name: str, rate: float, capacity: Optional[float] = None):
+        self.queue = work_queue
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until ``tokens`` are available; return the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            delay = self.queue.take_tokens(self.name, self.rate, self.capacity, tokens)
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+class RemoteStages:
+    """
+    Runs module generate, test and fix steps on queue workers.
+
+    Exposes ``generate``/``fix`` like the AI gateway and ``run_tests``/
+    ``get_last_error`` like the test runner, so the pipeline can use it in
+    their place. Each call publishes a task at the calling step's
+    critical-path priority and waits for its result. Test tasks carry a
+    snapshot of the tree to test, kept until the task finishes.
+    """
+
+    def __init__(self, work_queue: WorkQueue,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 task_timeout: Optional[float] = None,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 snapshot_dir: Optional[str] = None,
+                 link_mode: str = DEFAULT_LINK_MODE):
+        """
+        Args:
+            work_queue: Queue to publish tasks on
+            poll_interval: Seconds between checks for a task's result
+            task_timeout: Seconds to wait for a task, unlimited when None
+            max_attempts: Leases handed out before a task is failed
+            snapshot_dir: Directory on the shared volume for tree snapshots,
+                ``trees`` next to the queue file by default
+            link_mode: How snapshots are materialized, see ``materialize_tree``
+        """
+        self.queue = work_queue
+        self.poll_interval = poll_interval
+        self.task_timeout = task_timeout
+        self.max_attempts = max_attempts
+        # Each instance removes its own snapshots, so they never share a directory
+        base = snapshot_dir or os.path.join(os.path.dirname(os.path.abspath(work_queue.filepath)), "trees")
+        self.snapshot_dir = os.path.join(base, uuid.uuid4().hex[:12])
+        self.link_mode = link_mode
+        self._local = threading.local()
+        self._snapshots: Dict[str, int] = {}
+        self._snapshots_lock = threading.Lock()
+
+    def call(self, kind: str, payload: Dict[str, Any], priority: Optional[float] = None) -> Any:
+        """Publish a task and wait for its result; priority defaults to the calling step's."""
+        if priority is None:
+            priority = current_priority()
+        task_id = self.queue.submit(kind, payload, priority, self.max_attempts)
+        logger.debug("Published %s task %s", kind, task_id)
+        return self.queue.wait(task_id, self.task_timeout, self.poll_interval)
+
+    @staticmethod
+    def _module_payload(module: Any) -> Dict[str, Any]:
+        return {"module": module.to_dict(), "dependency_context": getattr(module, "dependency_context", "")}
+
+    def generate(self, module: Any) -> str:
+        return self.call("generate", self._module_payload(module))
+
+    def fix(self, module: Any, error: str) -> str:
+        return self.call("fix", dict(self._module_payload(module), error=error))
+
+    @contextmanager
+    def _snapshot(self, root: str) -> Iterator[Dict[str, str]]:
+        """Snapshot ``root`` on the shared volume under its Merkle hash while in use."""
+        staging = os.path.join(self.snapshot_dir, f".{uuid.uuid4().hex}")
+        materialize_tree(root, staging, self.link_mode)
+        digest = build_merkle_tree(staging).root_hash
+        path = os.path.join(self.snapshot_dir, digest)
+        with self._snapshots_lock:
+            if self._snapshots.get(digest):
+                shutil.rmtree(staging, ignore_errors=True)
+            else:
+                os.rename(staging, path)
+            self._snapshots[digest] = self._snapshots.get(digest, 0) + 1
+        try:
+            yield {"path": path, "hash": digest}
+        finally:
+            with self._snapshots_lock:
+                self._snapshots[digest] -= 1
+                if not self._snapshots[digest]:
+                    del self._snapshots[digest]
+                    shutil.rmtree(path, ignore_errors=True)
+
+    def run_tests(self, tests: List[str], cwd: Optional[str] = None) -> bool:
+        """Run tests on a worker against a snapshot of ``cwd``, the current directory by default."""
+        with self._snapshot(cwd or os.getcwd()) as tree:
+            result = self.call("test", {"tests": tests, "tree": tree})
+        self._local.last_error = result.get("error")
+        return bool(result.get("passed"))
+
+    def get_last_error(self) -> Optional[str]:
+        """Failure output of the last test task run by the calling thread."""
+        return getattr(self._local, "last_error", None)